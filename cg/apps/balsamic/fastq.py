@@ -6,6 +6,8 @@ Classes:
     FastqFileConcatenator: Handles file concatenation
     FastqHandler: Handles fastq file linking
 """
+import concurrent.futures
+import errno
 import logging
 import os
 import shutil
@@ -16,28 +18,93 @@ from cg.apps.pipelines.fastqhandler import BaseFastqHandler
 
 LOGGER = logging.getLogger(__name__)
 
+# bytes per copy_file_range/sendfile call and buffer size when copying through user space
+COPY_CHUNK_SIZE = 1024 ** 3
+COPY_BUFFER_SIZE = 1024 ** 2
+# errors of a kernel copy that is not supported for the files, the copy falls back
+UNSUPPORTED_COPY_ERRORS = (
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTSOCK,
+)
+
 
 class FastqFileConcatenator:
     """Concatenates a list of files into one"""
 
     @staticmethod
     def concatenate(files: List, concat_file):
-        """Concatenates a list of fastq files"""
+        """Concatenates a list of fastq files, raises OSError when a file is not copied whole"""
         LOGGER.info(FastqFileConcatenator.display_files(files, concat_file))
 
-        with open(concat_file, "wb") as wfd:
+        size_before = 0
+        with open(concat_file, "wb", buffering=0) as wfd:
             for fil in files:
-                with open(fil, "rb") as file_descriptor:
-                    shutil.copyfileobj(file_descriptor, wfd)
-
-        size_before = FastqFileConcatenator().size_before(files)
-        size_after = FastqFileConcatenator().size_after(concat_file)
+                with open(fil, "rb", buffering=0) as file_descriptor:
+                    file_size = os.fstat(file_descriptor.fileno()).st_size
+                    copied = FastqFileConcatenator.copy_file(file_descriptor, wfd)
+                if copied != file_size:
+                    raise OSError(errno.EIO, f"Copied {copied} of {file_size} bytes", fil)
+                size_before += file_size
+            size_after = os.fstat(wfd.fileno()).st_size
 
         try:
             FastqFileConcatenator().assert_file_sizes(size_before, size_after)
         except AssertionError as error:
             LOGGER.warning(error)
 
+    @staticmethod
+    def copy_file(source, target) -> int:
+        """Append an open file to an open target file, returns the number of bytes copied.
+
+        The data is copied in the kernel, with copy_file_range when both files are on the same
+        filesystem and otherwise with sendfile. It is copied through user space when neither is
+        supported.
+        """
+        same_filesystem = os.fstat(source.fileno()).st_dev == os.fstat(target.fileno()).st_dev
+        if same_filesystem and hasattr(os, "copy_file_range"):
+            copied = FastqFileConcatenator._kernel_copy(source, target, os.copy_file_range)
+            if copied is not None:
+                return copied
+        copied = FastqFileConcatenator._kernel_copy(source, target, FastqFileConcatenator._sendfile)
+        if copied is not None:
+            return copied
+        start = target.tell()
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+        return target.tell() - start
+
+    @staticmethod
+    def _sendfile(source_fd: int, target_fd: int, count: int) -> int:
+        """Copy from the position of the source like copy_file_range, with sendfile"""
+        offset = os.lseek(source_fd, 0, os.SEEK_CUR)
+        sent = os.sendfile(target_fd, source_fd, offset, count)
+        os.lseek(source_fd, offset + sent, os.SEEK_SET)
+        return sent
+
+    @staticmethod
+    def _kernel_copy(source, target, copy_range) -> int:
+        """Copy a file to the end with a kernel copy function, None when it is not supported.
+
+        Like in shutil, a first call that copies nothing from a file that is not empty means the
+        copy function does not work for the file, e.g. on some network and virtual filesystems.
+        """
+        copied = 0
+        remaining = os.fstat(source.fileno()).st_size - source.tell()
+        while True:
+            try:
+                chunk = copy_range(source.fileno(), target.fileno(), COPY_CHUNK_SIZE)
+            except OSError as error:
+                if copied == 0 and error.errno in UNSUPPORTED_COPY_ERRORS:
+                    return None
+                raise
+            if chunk == 0:
+                if copied == 0 and remaining > 0:
+                    return None
+                return copied
+            copied += chunk
+
     @staticmethod
     def size_before(files: List):
         """returns the total size of the linked fastq files before concatenation"""
@@ -141,8 +208,19 @@ class FastqHandler(BaseFastqHandler):
                 LOGGER.debug("destination path already exists: %s", linked_fastq_path)
 
         LOGGER.info("Concatenation in progress for sample %s.", sample)
+        # the reads are concatenated at the same time, the copies mostly wait for the disks
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(linked_reads_paths)) as pool:
+            concatenations = [
+                pool.submit(
+                    FastqFileConcatenator().concatenate,
+                    linked_reads_paths[read],
+                    concatenated_paths[read],
+                )
+                for read in linked_reads_paths
+            ]
+            for concatenation in concatenations:
+                concatenation.result()
         for read in linked_reads_paths:
-            FastqFileConcatenator().concatenate(linked_reads_paths[read], concatenated_paths[read])
             self._remove_files(linked_reads_paths[read])
 
     @staticmethod
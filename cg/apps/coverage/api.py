@@ -1,14 +1,24 @@
 """Chanjo API"""
-from typing import List
+from typing import Dict, List, Optional
+import hashlib
 import logging
 import io
 import json
 import tempfile
+import threading
 from pathlib import Path
 
 from cg.utils import Process
 
 LOG = logging.getLogger(__name__)
+# gene set key of the coverage of the OMIM genes
+OMIM_GENES = "omim"
+
+
+def genes_key(panel_genes: list) -> str:
+    """Return a key of a set of genes that does not depend on their order."""
+    genes = "\n".join(sorted({str(gene) for gene in panel_genes}))
+    return hashlib.sha1(genes.encode()).hexdigest()
 
 
 class ChanjoAPI:
@@ -20,6 +30,21 @@ class ChanjoAPI:
         self.chanjo_config = config["chanjo"]["config_path"]
         self.chanjo_binary = config["chanjo"]["binary_path"]
         self.process = Process(self.chanjo_binary, self.chanjo_config)
+        # coverage by sample and gene set, for the lifetime of the api
+        self._coverage: Dict[tuple, Optional[dict]] = {}
+        # the process keeps the output of the last command, run one command at a time
+        self._lock = threading.Lock()
+
+    def _run_command(self, parameters: list) -> str:
+        """Run a chanjo command and return its output."""
+        with self._lock:
+            self.process.run_command(parameters)
+            return self.process.stdout
+
+    def _forget(self, sample_id: str):
+        """Drop the cached coverage of a sample."""
+        for key in [key for key in self._coverage if key[0] == sample_id]:
+            del self._coverage[key]
 
     def upload(
         self, sample_id: str, sample_name: str, group_id: str, group_name: str, bed_file: str,
@@ -41,14 +66,14 @@ class ChanjoAPI:
             bed_file,
         ]
 
-        self.process.run_command(load_parameters)
+        self._run_command(load_parameters)
+        self._forget(sample_id)
 
     def sample(self, sample_id: str) -> dict:
         """Fetch sample from the database."""
 
         sample_parameters = ["db", "samples", "-s", sample_id]
-        self.process.run_command(sample_parameters)
-        samples = json.loads(self.process.stdout)
+        samples = json.loads(self._run_command(sample_parameters))
 
         for sample in samples:
             if sample["id"] == sample_id:
@@ -59,32 +84,48 @@ class ChanjoAPI:
     def delete_sample(self, sample_id: str):
         """Delete sample from database."""
         delete_parameters = ["db", "remove", sample_id]
-        self.process.run_command(delete_parameters)
-
-    def omim_coverage(self, samples: List[str]) -> dict:
+        self._run_command(delete_parameters)
+        self._forget(sample_id)
+
+    def _samples_coverage(
+        self, sample_ids: List[str], key: str, parameters: List[str]
+    ) -> Dict[str, Optional[dict]]:
+        """Calculate the coverage of the samples that are not cached in one chanjo call."""
+        missing = [sample_id for sample_id in sample_ids if (sample_id, key) not in self._coverage]
+        if missing:
+            coverage_parameters = ["calculate", "coverage"]
+            for sample_id in missing:
+                coverage_parameters.extend(["-s", sample_id])
+            data = json.loads(self._run_command(coverage_parameters + parameters))
+            for sample_id in missing:
+                self._coverage[(sample_id, key)] = data.get(sample_id)
+        return {sample_id: self._coverage[(sample_id, key)] for sample_id in sample_ids}
+
+    def omim_coverage(self, samples: List[dict]) -> dict:
         """Calculate omim coverage for samples"""
 
-        omim_parameters = ["calculate", "coverage", "--omim"]
-        for sample in samples:
-            omim_parameters.extend(["-s", sample["id"]])
-        self.process.run_command(omim_parameters)
-        data = json.loads(self.process.stdout)
-        return data
+        sample_ids = [sample["id"] for sample in samples]
+        coverage = self._samples_coverage(sample_ids, OMIM_GENES, ["--omim"])
+        return {sample_id: data for sample_id, data in coverage.items() if data is not None}
 
-    def sample_coverage(self, sample_id: str, panel_genes: list) -> dict:
-        """Calculate coverage for samples."""
+    def samples_coverage(
+        self, sample_ids: List[str], panel_genes: list
+    ) -> Dict[str, Optional[dict]]:
+        """Calculate coverage of the panel genes for samples in one chanjo call.
 
+        The coverage is cached per sample and set of genes, uploading or deleting a sample drops
+        its cached coverage. Samples without coverage are None.
+        """
+
+        key = genes_key(panel_genes)
+        if all((sample_id, key) in self._coverage for sample_id in sample_ids):
+            return self._samples_coverage(sample_ids, key, [])
         with tempfile.NamedTemporaryFile(mode="w+t") as tmp_gene_file:
             tmp_gene_file.write("\n".join([str(gene) for gene in panel_genes]))
             tmp_gene_file.flush()
-            coverage_parameters = [
-                "calculate",
-                "coverage",
-                "-s",
-                sample_id,
-                "-f",
-                tmp_gene_file.name,
-            ]
-            self.process.run_command(coverage_parameters)
-        data = json.loads(self.process.stdout).get(sample_id)
-        return data
+            return self._samples_coverage(sample_ids, key, ["-f", tmp_gene_file.name])
+
+    def sample_coverage(self, sample_id: str, panel_genes: list) -> dict:
+        """Calculate coverage for samples."""
+
+        return self.samples_coverage([sample_id], panel_genes)[sample_id]
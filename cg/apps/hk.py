@@ -3,13 +3,16 @@ import datetime as dt
 import logging
 import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Set, Tuple
 
 from housekeeper.include import checksum as hk_checksum
 from housekeeper.include import include_version
 from housekeeper.store import Store, models
+from sqlalchemy import orm
 
 LOG = logging.getLogger(__name__)
+# paths per IN query when looking up files
+PATHS_PER_QUERY = 1000
 
 
 class HousekeeperAPI:
@@ -39,6 +42,13 @@ class HousekeeperAPI:
         """ Fetch bundles """
         return self._store.bundles()
 
+    def bundles_by_name(self, names: List[str]) -> Dict[str, models.Bundle]:
+        """ Fetch the bundles with the given names, with their versions """
+        query = self._store.Bundle.query.filter(models.Bundle.name.in_(names)).options(
+            orm.selectinload(models.Bundle.versions)
+        )
+        return {bundle_obj.name: bundle_obj for bundle_obj in query}
+
     def new_file(
         self, path: str, checksum: str = None, to_archive: bool = False, tags: list = None,
     ) -> models.File:
@@ -70,6 +80,44 @@ class HousekeeperAPI:
         """ Fetch files """
         return self._store.files(bundle=bundle, tags=tags, version=version, path=path)
 
+    def existing_paths(self, paths: List[str]) -> Set[str]:
+        """ Return the paths that are already stored as files """
+        existing = set()
+        for start in range(0, len(paths), PATHS_PER_QUERY):
+            chunk = paths[start : start + PATHS_PER_QUERY]
+            query = self._store.session.query(models.File.path).filter(models.File.path.in_(chunk))
+            existing.update(path for (path,) in query)
+        return existing
+
+    def add_files_bulk(self, version_paths: List[Tuple[models.Version, str]], tags: list):
+        """Insert files in versions, all with the same tags, without building file objects.
+
+        The files and their tags are inserted with one statement each and are not committed.
+        """
+        if not version_paths:
+            return
+        session = self._store.session
+        # new versions get their ids
+        session.flush()
+        session.execute(
+            models.File.__table__.insert(),
+            [{"path": path, "version_id": version_obj.id} for version_obj, path in version_paths],
+        )
+        paths = [path for _, path in version_paths]
+        file_ids = []
+        for start in range(0, len(paths), PATHS_PER_QUERY):
+            chunk = paths[start : start + PATHS_PER_QUERY]
+            query = session.query(models.File.id).filter(models.File.path.in_(chunk))
+            file_ids.extend(file_id for (file_id,) in query)
+        session.execute(
+            models.file_tag_link.insert(),
+            [
+                {"file_id": file_id, "tag_id": tag_obj.id}
+                for file_id in file_ids
+                for tag_obj in tags
+            ],
+        )
+
     def rollback(self):
         """ Wrap method in Housekeeper Store """
         return self._store.rollback()
@@ -152,6 +200,10 @@ class HousekeeperAPI:
         include_version(self.get_root_dir(), version_obj)
         version_obj.included_at = dt.datetime.now()
 
+    def add(self, *args, **kwargs):
+        """ Wrap method in Housekeeper Store """
+        return self._store.add(*args, **kwargs)
+
     def add_commit(self, *args, **kwargs):
         """ Wrap method in Housekeeper Store """
         return self._store.add_commit(*args, **kwargs)
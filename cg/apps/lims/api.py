@@ -1,22 +1,22 @@
 """Contains API to communicate with LIMS"""
 import datetime as dt
 import logging
-from typing import Generator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Generator, Iterable, List, Set
+from urllib.parse import urlencode
+from xml.etree import ElementTree
 
-# fixes https://github.com/Clinical-Genomics/servers/issues/30
-import requests_cache
 from dateutil.parser import parse as parse_date
-from genologics.entities import Process, Project, Sample
+from genologics.entities import Artifact, Process, Project, Sample
 from genologics.lims import Lims
 from requests.exceptions import HTTPError
 
 from cg.exc import LimsDataError
 
+from .cache import DEFAULT_CACHE_SIZE, LimsCache
 from .constants import MASTER_STEPS_UDFS, PROP2UDF
 from .order import OrderHandler
 
-requests_cache.install_cache(backend="memory")
-
 SEX_MAP = {"F": "female", "M": "male", "Unknown": "unknown", "unknown": "unknown"}
 REV_SEX_MAP = {value: key for key, value in SEX_MAP.items()}
 AM_METHODS = {
@@ -33,6 +33,15 @@ AM_METHODS = {
     "1830": "NovaSeq 6000 Sequencing method",
 }
 METHOD_INDEX, METHOD_NUMBER_INDEX, METHOD_VERSION_INDEX = 0, 1, 2
+SAMPLE_DATE_UDFS = {
+    "received": "Received at",
+    "prepared": "Library Prep Finished",
+    "sequenced": "Sequencing Finished",
+    "delivered": "Delivered at",
+}
+BATCH_SIZE = 500
+MAX_WORKERS = 8
+LAST_MODIFIED_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 LOG = logging.getLogger(__name__)
 
@@ -43,6 +52,23 @@ class LimsAPI(Lims, OrderHandler):
     def __init__(self, config):
         lconf = config["lims"]
         super(LimsAPI, self).__init__(lconf["host"], lconf["username"], lconf["password"])
+        # genologics registers every entity it builds in the cache, keep it bounded
+        self.cache = LimsCache(max_size=lconf.get("cache_size", DEFAULT_CACHE_SIZE))
+
+    def get(self, uri, params=dict()):
+        """GET data from the URI, reusing a cached response until it expires.
+
+        The response is cached serialized and parsed again for every caller, entities change
+        their XML when their udfs are set and must not change the cached response.
+        """
+        cache_key = (uri, urlencode(sorted(params.items()), doseq=True))
+        try:
+            return ElementTree.fromstring(self.cache[cache_key])
+        except KeyError:
+            pass
+        root = super(LimsAPI, self).get(uri, params=params)
+        self.cache[cache_key] = ElementTree.tostring(root)
+        return root
 
     def sample(self, lims_id: str):
         """Fetch a sample from the LIMS database."""
@@ -50,6 +76,107 @@ class LimsAPI(Lims, OrderHandler):
         data = self._export_sample(lims_sample)
         return data
 
+    def samples_bulk(
+        self, lims_ids: Iterable[str], methods: bool = False, max_workers: int = MAX_WORKERS
+    ) -> Dict[str, dict]:
+        """Fetch several samples from LIMS with batch requests.
+
+        Returns the exported data of the samples by LIMS id, including all sample dates. Samples
+        missing in LIMS are left out. The projects of the samples, and with methods the prep,
+        sequencing and delivery methods, are fetched concurrently by a bounded pool of threads.
+        """
+        lims_ids = list(dict.fromkeys(lims_ids))
+        chunks = [
+            lims_ids[start : start + BATCH_SIZE] for start in range(0, len(lims_ids), BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            lims_samples = [
+                lims_sample
+                for chunk_samples in executor.map(self._batch_samples, chunks)
+                for lims_sample in chunk_samples
+            ]
+            # controls have no project
+            projects = {
+                lims_sample.project.uri: lims_sample.project
+                for lims_sample in lims_samples
+                if lims_sample.project
+            }
+            list(executor.map(lambda lims_project: lims_project.get(), projects.values()))
+            samples_data = {
+                lims_sample.id: self._export_sample(lims_sample) for lims_sample in lims_samples
+            }
+            if methods:
+                sample_methods = executor.map(self._sample_methods, samples_data)
+                for sample_data, methods_data in zip(samples_data.values(), sample_methods):
+                    sample_data.update(methods_data)
+        return samples_data
+
+    def _batch_samples(self, lims_ids: List[str]) -> List[Sample]:
+        """Fetch samples in one batch request, one by one if the batch is rejected."""
+        lims_samples = [Sample(self, id=lims_id) for lims_id in lims_ids]
+        try:
+            return [
+                lims_sample
+                for lims_sample in self.get_batch(lims_samples)
+                if lims_sample.root is not None
+            ]
+        except HTTPError as error:
+            LOG.warning("batch of %s samples failed, fetching one by one: %s", len(lims_ids), error)
+
+        found_samples = []
+        for lims_sample in lims_samples:
+            try:
+                lims_sample.get()
+            except HTTPError:
+                LOG.warning("sample %s not found in LIMS", lims_sample.id)
+                continue
+            found_samples.append(lims_sample)
+        return found_samples
+
+    def _sample_methods(self, lims_id: str) -> dict:
+        """Get the prep, sequencing and delivery methods of a sample."""
+        return {
+            "prep_method": self.get_prep_method(lims_id),
+            "sequencing_method": self.get_sequencing_method(lims_id),
+            "delivery_method": self.get_delivery_method(lims_id),
+        }
+
+    def samples_modified_since(
+        self, since: dt.datetime, max_workers: int = MAX_WORKERS
+    ) -> Set[str]:
+        """Get the ids of the samples in processes modified in LIMS since a UTC point in time.
+
+        The sample dates are set by the lab steps, so a sample whose dates changed is an input of
+        a process modified since then. Changes made to the samples by hand are not found.
+        """
+        lims_processes = self.get_processes(last_modified=since.strftime(LAST_MODIFIED_FORMAT))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda lims_process: lims_process.get(), lims_processes))
+            artifact_ids = sorted(
+                {
+                    input_output[0]["limsid"]
+                    for lims_process in lims_processes
+                    for input_output in lims_process.input_output_maps
+                }
+            )
+            chunks = [
+                [
+                    Artifact(self, id=artifact_id)
+                    for artifact_id in artifact_ids[start : start + BATCH_SIZE]
+                ]
+                for start in range(0, len(artifact_ids), BATCH_SIZE)
+            ]
+            lims_artifacts = [
+                lims_artifact
+                for chunk_artifacts in executor.map(self.get_batch, chunks)
+                for lims_artifact in chunk_artifacts
+            ]
+        return {
+            lims_sample.id
+            for lims_artifact in lims_artifacts
+            for lims_sample in lims_artifact.samples
+        }
+
     def samples_in_pools(self, pool_name, projectname):
         """Fetch all samples from a pool"""
         return self.get_samples(udf={"pool name": str(pool_name)}, projectname=projectname)
@@ -69,7 +196,7 @@ class LimsAPI(Lims, OrderHandler):
         data = {
             "id": lims_sample.id,
             "name": lims_sample.name,
-            "project": self._export_project(lims_sample.project),
+            "project": (self._export_project(lims_sample.project) if lims_sample.project else None),
             "family": udfs.get("familyID"),
             "customer": udfs.get("customer"),
             "sex": SEX_MAP.get(udfs.get("Gender"), None),
@@ -79,7 +206,6 @@ class LimsAPI(Lims, OrderHandler):
             "status": udfs.get("Status"),
             "panels": udfs.get("Gene List").split(";") if udfs.get("Gene List") else None,
             "priority": udfs.get("priority"),
-            "received": self.get_received_date(lims_sample.id),
             "application": udfs.get("Sequencing Analysis"),
             "application_version": (
                 int(udfs["Application Tag Version"])
@@ -88,6 +214,7 @@ class LimsAPI(Lims, OrderHandler):
             ),
             "comment": udfs.get("comment"),
         }
+        data.update({key: udfs.get(udf_key) for key, udf_key in SAMPLE_DATE_UDFS.items()})
         return data
 
     @staticmethod
@@ -219,33 +346,42 @@ class LimsAPI(Lims, OrderHandler):
     def update_sample(
         self, lims_id: str, sex=None, target_reads: int = None, name: str = None, **kwargs,
     ):
-        """Update information about a sample."""
-        lims_sample = Sample(self, id=lims_id)
+        """Update information about a sample.
 
-        if sex:
-            lims_gender = REV_SEX_MAP.get(sex)
-            if lims_gender:
-                lims_sample.udf[PROP2UDF["sex"]] = lims_gender
-        if name:
-            lims_sample.name = name
-        if isinstance(target_reads, int):
-            lims_sample.udf[PROP2UDF["target_reads"]] = target_reads
-
-        for key, value in kwargs.items():
-            if not PROP2UDF.get(key):
-                raise LimsDataError(
-                    f"Unknown how to set {key} in LIMS since it is not defined in" f" {PROP2UDF}"
-                )
-            lims_sample.udf[PROP2UDF[key]] = value
+        The cached sample is dropped also when the update fails, it could keep the changed udfs.
+        """
+        lims_sample = Sample(self, id=lims_id)
+        try:
+            if sex:
+                lims_gender = REV_SEX_MAP.get(sex)
+                if lims_gender:
+                    lims_sample.udf[PROP2UDF["sex"]] = lims_gender
+            if name:
+                lims_sample.name = name
+            if isinstance(target_reads, int):
+                lims_sample.udf[PROP2UDF["target_reads"]] = target_reads
+
+            for key, value in kwargs.items():
+                if not PROP2UDF.get(key):
+                    raise LimsDataError(
+                        f"Unknown how to set {key} in LIMS since it is not defined in"
+                        f" {PROP2UDF}"
+                    )
+                lims_sample.udf[PROP2UDF[key]] = value
 
-        lims_sample.put()
+            lims_sample.put()
+        finally:
+            self.cache.invalidate(lims_sample.uri)
 
     def update_project(self, lims_id: str, name=None):
         """Update information about a project."""
         lims_project = Project(self, id=lims_id)
         if name:
-            lims_project.name = name
-            lims_project.put()
+            try:
+                lims_project.name = name
+                lims_project.put()
+            finally:
+                self.cache.invalidate(lims_project.uri)
 
     def get_prep_method(self, lims_id: str) -> str:
         """Get the library preparation method."""
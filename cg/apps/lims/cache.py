@@ -0,0 +1,108 @@
+"""Bounded cache of LIMS entities and responses"""
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Hashable
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_TTL = 300
+# seconds to keep an entity type, types that change in the lab expire sooner
+ENTITY_TTLS = {
+    "samples": 300,
+    "artifacts": 300,
+    "processes": 3600,
+    "projects": 3600,
+    "containers": 3600,
+    "processtypes": 86400,
+    "containertypes": 86400,
+    "researchers": 86400,
+}
+
+
+def entity_type(uri: str) -> str:
+    """Return the entity type of a LIMS uri, e.g. "samples" for .../api/v2/samples/ACC1."""
+    segments = urlsplit(uri).path.strip("/").split("/")
+    return segments[2] if len(segments) > 2 and segments[0] == "api" else ""
+
+
+class LimsCache(MutableMapping):
+    """LRU cache with a time to live per LIMS entity type.
+
+    Keys are entity uris, as used by genologics for its entity registry, or tuples starting with
+    the uri, as used for cached responses. Expired entries are dropped when they are looked up and
+    the least recently used entries are evicted when the cache is full.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        ttls: Dict[str, int] = None,
+        default_ttl: int = DEFAULT_TTL,
+    ):
+        self.max_size = max_size
+        self.ttls = ENTITY_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _uri(key: Hashable) -> str:
+        return key[0] if isinstance(key, tuple) else key
+
+    def ttl(self, key: Hashable) -> int:
+        """Return the time to live of a key in seconds."""
+        return self.ttls.get(entity_type(self._uri(key)), self.default_ttl)
+
+    def __getitem__(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() > entry[0]:
+                self._entries.pop(key, None)
+                self.misses += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __setitem__(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl(key), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._entries[key]
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, uri: str):
+        """Drop an entity and every cached response of its entity type.
+
+        Responses to queries, like samples filtered on a udf, may include the changed entity so
+        they are dropped too.
+        """
+        collection = uri.rsplit("/", 1)[0]
+        with self._lock:
+            for key in list(self._entries):
+                key_uri = self._uri(key)
+                if key_uri == uri or (isinstance(key, tuple) and key_uri.startswith(collection)):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the number of hits, misses and cached entries."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
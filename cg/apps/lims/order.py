@@ -36,11 +36,12 @@ class OrderHandler:
         sample_uri = f"{self.get_uri()}/samples/batch/create"
         results = self.save_xml(sample_uri, sample_details)
         if map_samples:
-            sample_map = {}
-            for link in results.findall("link"):
-                lims_sample = Sample(self, uri=link.attrib["uri"])
-                sample_map[lims_sample.name] = lims_sample
-            return sample_map
+            lims_samples = [
+                Sample(self, uri=link.attrib["uri"]) for link in results.findall("link")
+            ]
+            # fetch the names of all new samples in one request instead of one per sample
+            self.get_batch(lims_samples)
+            return {lims_sample.name: lims_sample for lims_sample in lims_samples}
         return results
 
     def update_artifacts(self, artifact_details: ObjectifiedElement):
@@ -50,7 +51,7 @@ class OrderHandler:
         return results
 
     def submit_project(self, project_name: str, samples: List[dict], researcher_id: str = "3"):
-        """Parse Scout project."""
+        """Parse Scout project, return the project with the LIMS ids of the samples by name."""
         containers = self.prepare(samples)
 
         lims_project = Project.create(
@@ -90,7 +91,7 @@ class OrderHandler:
                 samples_data.append(sample_data)
         sample_details = batch.build_sample_batch(samples_data)
         process_reagentlabels = len(reagentlabel_samples) > 0
-        sample_map = self.save_samples(sample_details, map_samples=process_reagentlabels)
+        sample_map = self.save_samples(sample_details, map_samples=True)
 
         if process_reagentlabels:
             artifacts_data = [
@@ -104,6 +105,9 @@ class OrderHandler:
             self.update_artifacts(artifact_details)
 
         lims_project_data = self._export_project(lims_project)
+        lims_project_data["samples"] = {
+            name: lims_sample.id for name, lims_sample in sample_map.items()
+        }
         return lims_project_data
 
     @classmethod
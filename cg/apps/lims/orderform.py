@@ -1,6 +1,11 @@
-from typing import List
+import datetime as dt
+import re
+from typing import Iterable, Iterator, List
+
+import openpyxl
+from openpyxl.workbook.workbook import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
 
-import xlrd
 from cg.constants import METAGENOME_SOURCES, ANALYSIS_SOURCES
 
 from cg.exc import OrderFormError
@@ -17,37 +22,77 @@ VALID_ORDERFORMS = [
     "1605:8",  # Microbial metagenomes
 ]
 CASE_PROJECT_TYPES = ["mip", "external", "balsamic", "mip_balsamic", "mip_rna"]
+# sample values that are copied to the cases when they are set
+CASE_SAMPLE_KEYS = (
+    "capture_kit",
+    "comment",
+    "container_name",
+    "data_analysis",
+    "elution_buffer",
+    "formalin_fixation_time",
+    "from_sample",
+    "post_formalin_fixation_time",
+    "quantity",
+    "status",
+    "time_point",
+    "tissue_block_size",
+    "tumour",
+    "tumour_purity",
+    "well_position",
+    "mother",
+    "father",
+)
+VALID_ORDERFORM_PATTERN = re.compile("|".join(re.escape(valid) for valid in VALID_ORDERFORMS))
+# cell values as text, numbers are decimals like "1.0" that are trimmed when samples are parsed
+CELL_TEXT = {
+    type(None): lambda value: "",
+    str: lambda value: value,
+    bool: lambda value: str(int(value)),
+    int: lambda value: str(float(value)),
+    float: str,
+}
 
 
 def check_orderform_version(document_title):
     """Raise an error if the orderform is too new or too old for the order portal."""
-    for valid_orderform in VALID_ORDERFORMS:
-        if valid_orderform in document_title:
-            return
-    raise OrderFormError(f"Unsupported orderform: {document_title}")
+    if VALID_ORDERFORM_PATTERN.search(document_title) is None:
+        raise OrderFormError(f"Unsupported orderform: {document_title}")
 
 
-def parse_orderform(excel_path: str) -> dict:
-    """Parse out information from an order form."""
-    workbook = xlrd.open_workbook(excel_path)
-
-    sheet_name = None
-    sheet_names = workbook.sheet_names()
-    for name in ["orderform", "order form"]:
-        if name in sheet_names:
-            sheet_name = name
-            break
-    if sheet_name is None:
-        raise OrderFormError("'orderform' sheet not found in Excel file")
-    orderform_sheet = workbook.sheet_by_name(sheet_name)
+def cell_text(value) -> str:
+    """Convert the value of a cell to text."""
+    to_text = CELL_TEXT.get(type(value))
+    if to_text is None:
+        return value.isoformat() if isinstance(value, (dt.date, dt.time)) else str(value)
+    return to_text(value)
 
-    document_title = get_document_title(workbook, orderform_sheet)
-    check_orderform_version(document_title)
 
-    raw_samples = relevant_rows(orderform_sheet)
-    if len(raw_samples) == 0:
+def parse_orderform(excel_path: str) -> dict:
+    """Parse out information from an order form.
+
+    The workbook is opened read-only and the sample rows are parsed as they are read from the
+    file, the order form is never loaded as a whole.
+    """
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        sheet_name = None
+        for name in ["orderform", "order form"]:
+            if name in workbook.sheetnames:
+                sheet_name = name
+                break
+        if sheet_name is None:
+            raise OrderFormError("'orderform' sheet not found in Excel file")
+        orderform_sheet = workbook[sheet_name]
+
+        document_title = get_document_title(workbook, orderform_sheet)
+        check_orderform_version(document_title)
+
+        rows = orderform_sheet.iter_rows(values_only=True)
+        parsed_samples = [parse_sample(raw_sample) for raw_sample in relevant_rows(rows)]
+    finally:
+        workbook.close()
+    if len(parsed_samples) == 0:
         raise OrderFormError("orderform doesn't contain any samples")
-    parsed_samples = [parse_sample(raw_sample) for raw_sample in raw_samples]
 
     project_type = get_project_type(document_title, parsed_samples)
 
@@ -74,15 +119,19 @@ def parse_orderform(excel_path: str) -> dict:
     return data
 
 
-def get_document_title(workbook: xlrd.book.Book, orderform_sheet: xlrd.sheet.Sheet) -> str:
+def first_row(sheet: Worksheet) -> tuple:
+    """Read the values of the first row of a sheet."""
+    return next(sheet.iter_rows(max_row=1, values_only=True), ())
+
+
+def get_document_title(workbook: Workbook, orderform_sheet: Worksheet) -> str:
     """Get the document title for the order form."""
-    if "information" in workbook.sheet_names():
-        information_sheet = workbook.sheet_by_name("information")
-        document_title = information_sheet.row(0)[2].value
-        return document_title
+    if "information" in workbook.sheetnames:
+        document_title = first_row(workbook["information"])[2]
+        return cell_text(document_title)
 
-    document_title = orderform_sheet.row(0)[1].value
-    return document_title
+    document_title = first_row(orderform_sheet)[1]
+    return cell_text(document_title)
 
 
 def get_project_type(document_title: str, parsed_samples: List) -> str:
@@ -111,23 +160,14 @@ def get_project_type(document_title: str, parsed_samples: List) -> str:
 def expand_case(case_id, parsed_case):
     """Fill-in information about families."""
     new_case = {"name": case_id, "samples": []}
-    samples = parsed_case["samples"]
-
-    require_qcoks = set(raw_sample["require_qcok"] for raw_sample in samples)
-    new_case["require_qcok"] = True in require_qcoks
-
-    priorities = set(raw_sample["priority"] for raw_sample in samples)
-    if len(priorities) == 1:
-        new_case["priority"] = priorities.pop()
-    else:
-        raise OrderFormError(f"multiple values for 'Priority' for case: {case_id}")
-
-    customers = set(raw_sample["customer"] for raw_sample in samples)
-    if len(customers) != 1:
-        raise OrderFormError("Invalid customer information: {}".format(customers))
-    customer = customers.pop()
+    require_qcok = False
+    priorities = set()
+    customers = set()
     gene_panels = set()
-    for raw_sample in samples:
+    for raw_sample in parsed_case["samples"]:
+        require_qcok = require_qcok or raw_sample["require_qcok"] is True
+        priorities.add(raw_sample["priority"])
+        customers.add(raw_sample["customer"])
         if raw_sample["panels"]:
             gene_panels.update(raw_sample["panels"])
         new_sample = {
@@ -139,31 +179,20 @@ def expand_case(case_id, parsed_case):
         if raw_sample.get("container") in CONTAINER_TYPES:
             new_sample["container"] = raw_sample["container"]
 
-        for key in (
-            "capture_kit",
-            "comment",
-            "container_name",
-            "data_analysis",
-            "elution_buffer",
-            "formalin_fixation_time",
-            "from_sample",
-            "post_formalin_fixation_time",
-            "quantity",
-            "status",
-            "time_point",
-            "tissue_block_size",
-            "tumour",
-            "tumour_purity",
-            "well_position",
-        ):
+        for key in CASE_SAMPLE_KEYS:
             if raw_sample.get(key):
                 new_sample[key] = raw_sample[key]
-
-        for parent_id in ("mother", "father"):
-            if raw_sample[parent_id]:
-                new_sample[parent_id] = raw_sample[parent_id]
         new_case["samples"].append(new_sample)
 
+    new_case["require_qcok"] = require_qcok
+    if len(priorities) == 1:
+        new_case["priority"] = priorities.pop()
+    else:
+        raise OrderFormError(f"multiple values for 'Priority' for case: {case_id}")
+
+    if len(customers) != 1:
+        raise OrderFormError("Invalid customer information: {}".format(customers))
+    customer = customers.pop()
     new_case["panels"] = list(gene_panels)
 
     return customer, new_case
@@ -265,37 +294,39 @@ def parse_sample(raw_sample):
     return sample
 
 
-def relevant_rows(orderform_sheet):
-    """Get the relevant rows from an order form sheet."""
-    raw_samples = []
+def relevant_rows(rows: Iterable[tuple]) -> Iterator[dict]:
+    """Get the relevant rows from the cell values of an order form sheet, one row at a time."""
     current_row = None
     empty_row_found = False
-    for row in orderform_sheet.get_rows():
-        if row[0].value == "</SAMPLE ENTRIES>":
+    for row in rows:
+        first_value = row[0] if row else None
+        if first_value == "</SAMPLE ENTRIES>":
             break
 
         if current_row == "header":
-            header_row = [cell.value for cell in row]
+            header_row = [cell_text(value) for value in row]
+            # the sheets are much wider than the header, only the named columns are read
+            while header_row and not header_row[-1]:
+                header_row.pop()
             current_row = None
         elif current_row == "samples":
-            values = [str(cell.value) for cell in row]
+            values = [cell_text(value) for value in row[: len(header_row)]]
+            # rows without trailing values are as wide as the header
+            values.extend([""] * (len(header_row) - len(values)))
 
             # skip empty rows
-            if values[0]:
+            if values and values[0]:
                 if empty_row_found:
                     raise OrderFormError(
                         f"Found data after empty lines. Please delete any "
                         f"non-sample data rows in between the samples"
                     )
 
-                sample_dict = dict(zip(header_row, values))
-
-                raw_samples.append(sample_dict)
+                yield dict(zip(header_row, values))
             else:
                 empty_row_found = True
 
-        if row[0].value == "<TABLE HEADER>":
+        if first_value == "<TABLE HEADER>":
             current_row = "header"
-        elif row[0].value == "<SAMPLE ENTRIES>":
+        elif first_value == "<SAMPLE ENTRIES>":
             current_row = "samples"
-    return raw_samples
@@ -1,6 +1,8 @@
 import logging
+import os
+from collections import defaultdict
 from pathlib import Path
-from typing import Iterator
+from typing import Dict, Iterable, Iterator, List
 
 import alchy
 import sqlalchemy as sqa
@@ -35,29 +37,33 @@ class StatsAPI(alchy.Manager):
             "date": record.time,
             "samples": [],
         }
-        for sample_obj in self.flowcell_samples(record):
-            raw_samplename = sample_obj.samplename.split("_", 1)[0]
+        samples = {}
+        fastq_indexes = {}
+        for fc_data in self.flowcell_sample_reads(record):
+            raw_samplename = fc_data.samplename.split("_", 1)[0]
             curated_samplename = raw_samplename.rstrip("AB")
-            sample_data = {"name": curated_samplename, "reads": 0, "fastqs": []}
-            for fc_data in self.sample_reads(sample_obj):
-                if fc_data.type == "hiseqga" and fc_data.q30 >= 80:
-                    sample_data["reads"] += fc_data.reads
-                elif fc_data.type == "hiseqx" and fc_data.q30 >= 75:
-                    sample_data["reads"] += fc_data.reads
-                elif fc_data.type == "novaseq" and fc_data.q30 >= 75:
-                    sample_data["reads"] += fc_data.reads
-                else:
-                    LOG.warning(
-                        f"q30 too low for {curated_samplename} on {fc_data.name}:"
-                        f"{fc_data.q30} < {80 if fc_data.type == 'hiseqga' else 75}%"
-                    )
+            sample_data = samples.setdefault(
+                fc_data.sample_id, {"name": curated_samplename, "reads": 0, "fastqs": []}
+            )
+            if fc_data.type == "hiseqga" and fc_data.q30 >= 80:
+                sample_data["reads"] += fc_data.reads
+            elif fc_data.type == "hiseqx" and fc_data.q30 >= 75:
+                sample_data["reads"] += fc_data.reads
+            elif fc_data.type == "novaseq" and fc_data.q30 >= 75:
+                sample_data["reads"] += fc_data.reads
+            else:
+                LOG.warning(
+                    f"q30 too low for {curated_samplename} on {fc_data.name}:"
+                    f"{fc_data.q30} < {80 if fc_data.type == 'hiseqga' else 75}%"
+                )
+                continue
+            if fc_data.name not in fastq_indexes:
+                fastq_indexes[fc_data.name] = self.fastq_index(fc_data.name)
+            for fastq_path in fastq_indexes[fc_data.name].get(fc_data.samplename, []):
+                if fc_data.pooled and "Undetermined" in str(fastq_path):
                     continue
-                for fastq_path in self.fastqs(fc_data.name, sample_obj):
-                    if self.is_lane_pooled(flowcell_obj=record, lane=fc_data.lane):
-                        if "Undetermined" in str(fastq_path):
-                            continue
-                    sample_data["fastqs"].append(str(fastq_path))
-            data["samples"].append(sample_data)
+                sample_data["fastqs"].append(str(fastq_path))
+        data["samples"] = list(samples.values())
 
         return data
 
@@ -67,6 +73,60 @@ class StatsAPI(alchy.Manager):
             models.Demux.flowcell == flowcell_obj
         )
 
+    def flowcell_sample_reads(self, flowcell_obj: models.Flowcell) -> Iterator:
+        """Calculate reads per flowcell for all the samples on a flowcell in one query.
+
+        Each row holds the reads and lowest q30 of a sample on one of its flowcells, like
+        sample_reads, and whether the lane of the row is pooled on the given flowcell, like
+        is_lane_pooled.
+        """
+        on_flowcell = models.Demux.flowcell_id == flowcell_obj.flowcell_id
+        lane_samples = (
+            self.session.query(
+                models.Unaligned.lane.label("lane"),
+                sqa.func.count(models.Unaligned.sample_id).label("sample_count"),
+            )
+            .join(models.Unaligned.demux)
+            .filter(on_flowcell)
+            .group_by(models.Unaligned.lane)
+            .subquery()
+        )
+        flowcell_sample_ids = (
+            self.session.query(models.Unaligned.sample_id)
+            .join(models.Unaligned.demux)
+            .filter(on_flowcell)
+        )
+        sample_reads = (
+            self.session.query(
+                models.Unaligned.sample_id.label("sample_id"),
+                models.Sample.samplename.label("samplename"),
+                models.Flowcell.flowcellname.label("name"),
+                models.Flowcell.hiseqtype.label("type"),
+                sqa.func.min(models.Unaligned.lane).label("lane"),
+                sqa.func.sum(models.Unaligned.readcounts).label("reads"),
+                sqa.func.min(models.Unaligned.q30_bases_pct).label("q30"),
+            )
+            .select_from(models.Flowcell)
+            .join(models.Flowcell.demux, models.Demux.unaligned, models.Unaligned.sample)
+            .filter(models.Unaligned.sample_id.in_(flowcell_sample_ids.subquery()))
+            .group_by(
+                models.Unaligned.sample_id,
+                models.Sample.samplename,
+                models.Flowcell.flowcellname,
+                models.Flowcell.hiseqtype,
+            )
+            .subquery()
+        )
+        query = (
+            self.session.query(
+                sample_reads,
+                (sqa.func.coalesce(lane_samples.c.sample_count, 0) > 1).label("pooled"),
+            )
+            .outerjoin(lane_samples, lane_samples.c.lane == sample_reads.c.lane)
+            .order_by(sample_reads.c.sample_id, sample_reads.c.name)
+        )
+        return query
+
     def is_lane_pooled(self, flowcell_obj: models.Flowcell, lane: str) -> bool:
         """Check whether a lane is pooled or not."""
         query = (
@@ -105,3 +165,43 @@ class StatsAPI(alchy.Manager):
             pattern = fastq_pattern.format(flowcell, sample_obj.samplename)
             files = self.root_dir.glob(pattern)
             yield from files
+
+    @staticmethod
+    def _subdirs(paths: Iterable[str], prefix: str = "", suffix: str = "") -> Iterator[os.DirEntry]:
+        """Scan directories for subdirectories with a name matching prefix*suffix."""
+        for path in paths:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if (
+                        entry.name.startswith(prefix)
+                        and entry.name.endswith(suffix)
+                        and entry.is_dir()
+                    ):
+                        yield entry
+
+    def fastq_index(self, flowcell: str) -> Dict[str, List[Path]]:
+        """Index the FASTQ files of a flowcell by sample name in one pass over the demux root.
+
+        A sample gets the files in Sample_<name> followed by the files in Sample_<name>_*, the
+        same files as fastqs finds with two globs per sample.
+        """
+        if not self.root_dir.is_dir():
+            return {}
+        base_files, alt_files = defaultdict(list), defaultdict(list)
+        flowcell_dirs = (
+            entry.path for entry in self._subdirs([str(self.root_dir)], suffix=flowcell)
+        )
+        unaligned_dirs = (entry.path for entry in self._subdirs(flowcell_dirs, prefix="Unaligned"))
+        project_dirs = (entry.path for entry in self._subdirs(unaligned_dirs, prefix="Project_"))
+        for sample_dir in self._subdirs(project_dirs, prefix="Sample_"):
+            with os.scandir(sample_dir.path) as entries:
+                fastqs = [Path(entry.path) for entry in entries if entry.name.endswith(".fastq.gz")]
+            dir_samplename = sample_dir.name[len("Sample_") :]
+            base_files[dir_samplename].extend(fastqs)
+            name_parts = dir_samplename.split("_")
+            for end in range(1, len(name_parts)):
+                alt_files["_".join(name_parts[:end])].extend(fastqs)
+        return {
+            samplename: base_files.get(samplename, []) + alt_files.get(samplename, [])
+            for samplename in set(base_files) | set(alt_files)
+        }
@@ -51,3 +51,4 @@ def fetch_flowcell(context: click.Context, dry_run: bool, flowcell: str):
         LOG.info(f"{flowcell}: updating flowcell status to requested")
         flowcell_obj.status = "requested"
         status_api.commit()
+        status_api.refresh_flowcells_case_status([flowcell_obj])
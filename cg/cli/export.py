@@ -1,16 +1,41 @@
 """Functionality to export data from the database"""
+import csv
+import datetime as dt
+import decimal
+import json
 import logging
+from itertools import islice
+from typing import Iterator, List
+
 import click
+from sqlalchemy import Column
+
+from cg.exc import CgError
 from cg.store import Store
+from cg.store.api.export import EXPORT_BATCH_SIZE, EXPORT_TABLES
 
 LOG = logging.getLogger(__name__)
 
 
-@click.group(invoke_without_command=True)
+class ExportGroup(click.Group):
+    """Export commands, a table and an identifier that is not a command exports one record"""
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and not args[0].startswith("-"):
+            args = ["record"] + args
+        return super(ExportGroup, self).parse_args(ctx, args)
+
+
+@click.group(cls=ExportGroup)
+def export():
+    """Export records from the store, `cg export TABLE IDENTIFIER` exports one record."""
+
+
+@export.command()
 @click.argument("table")
 @click.argument("identifier")
 @click.pass_context
-def export(context: click.Context, table: str, identifier: str):
+def record(context: click.Context, table: str, identifier: str):
     """Get information about almost anything in the store."""
 
     db_func = getattr(Store(context.obj["database"]), f"{table}")
@@ -21,3 +46,97 @@ def export(context: click.Context, table: str, identifier: str):
         context.abort()
 
     click.echo(db_obj.to_dict())
+
+
+def _json_value(value):
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return str(value)
+
+
+def write_csv(columns: List[Column], rows: Iterator[tuple], handle):
+    writer = csv.writer(handle)
+    writer.writerow([column.name for column in columns])
+    writer.writerows(rows)
+
+
+def write_jsonl(columns: List[Column], rows: Iterator[tuple], handle):
+    names = [column.name for column in columns]
+    for row in rows:
+        handle.write(json.dumps(dict(zip(names, row)), default=_json_value) + "\n")
+
+
+def write_parquet(columns: List[Column], rows: Iterator[tuple], path: str):
+    """Write the rows to a parquet file, one row group per batch of rows."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise CgError("pyarrow is needed to export parquet, install it with: pip install pyarrow")
+
+    arrow_types = {
+        bool: pyarrow.bool_(),
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        decimal.Decimal: pyarrow.float64(),
+        dt.datetime: pyarrow.timestamp("us"),
+        dt.date: pyarrow.date32(),
+    }
+
+    def arrow_type(column: Column):
+        try:
+            return arrow_types.get(column.type.python_type, pyarrow.string())
+        except NotImplementedError:
+            return pyarrow.string()
+
+    def arrow_array(field, values: tuple):
+        if field.type == pyarrow.string():
+            values = [None if value is None else str(value) for value in values]
+        elif field.type == pyarrow.float64():
+            values = [None if value is None else float(value) for value in values]
+        return pyarrow.array(values, type=field.type)
+
+    schema = pyarrow.schema([(column.name, arrow_type(column)) for column in columns])
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        while True:
+            batch = list(islice(rows, EXPORT_BATCH_SIZE))
+            if not batch:
+                break
+            arrays = [arrow_array(field, values) for field, values in zip(schema, zip(*batch))]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+
+
+@export.command()
+@click.option("-t", "--table", type=click.Choice(sorted(EXPORT_TABLES)), required=True)
+@click.option(
+    "-f",
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "jsonl", "parquet"]),
+    default="csv",
+    show_default=True,
+)
+@click.option("-c", "--columns", help="comma separated columns to export, default all")
+@click.option("-w", "--where", "filters", multiple=True, help="filter like received_at>=2020-01-01")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="file, default stdout")
+@click.pass_context
+def bulk(context: click.Context, table, file_format, columns, filters, output):
+    """Stream a whole table, the rows are fetched a batch at a time."""
+    store = Store(context.obj["database"])
+    try:
+        selected, rows = store.export_rows(
+            table, columns=columns.split(",") if columns else None, filters=filters
+        )
+        if file_format == "parquet":
+            if output is None:
+                raise CgError("parquet is exported to a file, use --output")
+            write_parquet(selected, rows, output)
+        else:
+            writer = write_csv if file_format == "csv" else write_jsonl
+            with click.open_file(output or "-", "w") as handle:
+                writer(selected, rows, handle)
+    except CgError as error:
+        LOG.error(error.message)
+        context.abort()
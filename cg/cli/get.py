@@ -40,9 +40,10 @@ def get(context: click.Context, identifier: str):
 @click.pass_context
 def sample(context: click.Context, families: bool, flowcells: bool, sample_ids: List[str]):
     """Get information about a sample."""
+    profile = "sample_full" if families or flowcells else "sample_with_app"
     for sample_id in sample_ids:
         LOG.debug("{sample_id}: get info about sample")
-        sample_obj = context.obj["status"].sample(sample_id)
+        sample_obj = context.obj["status"].sample(sample_id, profile=profile)
         if sample_obj is None:
             LOG.warning(f"{sample_id}: sample doesn't exist")
             continue
@@ -71,7 +72,7 @@ def sample(context: click.Context, families: bool, flowcells: bool, sample_ids:
 def relations(context: click.Context, family_id: str):
     """Get information about a family relations."""
 
-    family_obj = context.obj["status"].family(family_id)
+    family_obj = context.obj["status"].family(family_id, profile="case_with_samples")
     if family_obj is None:
         LOG.error("%s: family doesn't exist", family_id)
         context.abort()
@@ -109,11 +110,12 @@ def family(
         if customer_obj is None:
             LOG.error(f"{customer}: customer not found")
             context.abort()
-        families = context.obj["status"].families(customer=customer_obj, enquiry=family_ids[-1])
+        families_q = context.obj["status"].families(customer=customer_obj, enquiry=family_ids[-1])
+        families = context.obj["status"].with_profile(families_q, "case_with_samples")
     else:
         families = []
         for family_id in family_ids:
-            family_obj = context.obj["status"].family(family_id)
+            family_obj = context.obj["status"].family(family_id, profile="case_with_samples")
             if family_obj is None:
                 LOG.error(f"{family_id}: family doesn't exist")
                 context.abort()
@@ -350,6 +350,26 @@ def cases(
     click.echo(header_description)
 
 
+@status.command()
+@click.pass_context
+def explain(context):
+    """Show which status queries still read full tables."""
+    status_db = context.obj["db"]
+    rows = []
+    for name, query in status_db.status_queries().items():
+        tables = status_db.full_scans(query)
+        rows.append([name, Color(f"{{red}}{', '.join(tables)}{{/red}}") if tables else "-"])
+    click.echo(tabulate(rows, headers=["Query", "Full scans"], tablefmt="psql"))
+
+
+@status.command()
+@click.pass_context
+def rebuild(context):
+    """Summarize the progress of every case into the case status table."""
+    nr_cases = context.obj["db"].rebuild_case_status()
+    click.echo(f"summarized the progress of {nr_cases} cases")
+
+
 @status.command()
 @click.option("-s", "--skip", default=0, help="skip initial records")
 @click.pass_context
@@ -37,12 +37,20 @@ def flowcell(context, flowcell_name):
     "-i", "--include", type=click.Choice(["unset", "not-invoiced", "all"]), default="unset",
 )
 @click.option("--sample-id", help="Lims Submitted Sample id. use together with status.")
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="only check samples processed in LIMS since the last incremental transfer",
+)
 @click.pass_context
-def lims(context, status, include, sample_id):
+def lims(context, status, include, sample_id, incremental):
     """Check if samples have been updated in LIMS."""
     lims_api = lims_app.LimsAPI(context.obj)
     transfer_api = transfer_app.TransferLims(context.obj["db"], lims_api)
-    transfer_api.transfer_samples(transfer_app.SampleState[status.upper()], include, sample_id)
+    if incremental:
+        transfer_api.transfer_samples_since_mark(transfer_app.SampleState[status.upper()])
+    else:
+        transfer_api.transfer_samples(transfer_app.SampleState[status.upper()], include, sample_id)
 
 
 @transfer.command()
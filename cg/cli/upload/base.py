@@ -1,8 +1,9 @@
 """Code that handles CLI commands to upload"""
 import datetime as dt
+import functools
 import logging
 import sys
-import traceback
+from typing import List
 
 import click
 
@@ -12,6 +13,12 @@ from cg.cli.workflow.mip_dna.deliver import CASE_TAGS, SAMPLE_TAGS
 from cg.exc import AnalysisUploadError
 from cg.meta.deliver import DeliverAPI
 from cg.meta.report.api import ReportAPI
+from cg.meta.upload.auto import (
+    DEFAULT_CASE_WORKERS,
+    DEFAULT_STEP_WORKERS,
+    UploadCaseAPI,
+    upload_cases,
+)
 from cg.meta.upload.scoutapi import UploadScoutAPI
 from cg.meta.workflow.mip_dna import AnalysisAPI
 from cg.store import Store
@@ -29,6 +36,60 @@ from .validate import validate
 LOG = logging.getLogger(__name__)
 
 
+def _add_upload_apis(context_obj: dict):
+    """Add the apis used by the upload commands to the context object."""
+    context_obj["housekeeper_api"] = hk.HousekeeperAPI(context_obj)
+    context_obj["madeline_api"] = madeline.api.MadelineAPI(context_obj)
+    context_obj["genotype_api"] = gt.GenotypeAPI(context_obj)
+    context_obj["lims_api"] = lims.LimsAPI(context_obj)
+    context_obj["tb_api"] = tb.TrailblazerAPI(context_obj)
+    context_obj["chanjo_api"] = coverage_app.ChanjoAPI(context_obj)
+    context_obj["deliver_api"] = DeliverAPI(
+        context_obj,
+        hk_api=context_obj["housekeeper_api"],
+        lims_api=context_obj["lims_api"],
+        case_tags=CASE_TAGS,
+        sample_tags=SAMPLE_TAGS,
+    )
+    context_obj["scout_api"] = scoutapi.ScoutAPI(context_obj)
+    context_obj["analysis_api"] = AnalysisAPI(
+        context_obj,
+        hk_api=context_obj["housekeeper_api"],
+        scout_api=context_obj["scout_api"],
+        tb_api=context_obj["tb_api"],
+        lims_api=context_obj["lims_api"],
+        deliver_api=context_obj["deliver_api"],
+    )
+    context_obj["report_api"] = ReportAPI(
+        store=context_obj["status"],
+        lims_api=context_obj["lims_api"],
+        chanjo_api=context_obj["chanjo_api"],
+        analysis_api=context_obj["analysis_api"],
+        scout_api=context_obj["scout_api"],
+    )
+    context_obj["scout_upload_api"] = UploadScoutAPI(
+        hk_api=context_obj["housekeeper_api"],
+        scout_api=context_obj["scout_api"],
+        madeline_api=context_obj["madeline_api"],
+        analysis_api=context_obj["analysis_api"],
+        lims_api=context_obj["lims_api"],
+    )
+
+
+# invoke the upload command of a step for a case
+STEP_COMMANDS = {
+    "coverage": lambda context, case_id: context.invoke(
+        coverage, re_upload=True, family_id=case_id
+    ),
+    "validate": lambda context, case_id: context.invoke(validate, family_id=case_id),
+    "genotypes": lambda context, case_id: context.invoke(
+        genotypes, re_upload=False, family_id=case_id
+    ),
+    "observations": lambda context, case_id: context.invoke(observations, case_id=case_id),
+    "scout": lambda context, case_id: context.invoke(scout, case_id=case_id),
+}
+
+
 @click.group(invoke_without_command=True)
 @click.option("-f", "--family", "family_id", help="Upload to all apps")
 @click.option(
@@ -44,6 +105,8 @@ def upload(context, family_id, force_restart):
 
     click.echo(click.style("----------------- UPLOAD ----------------------"))
 
+    # the configuration without apis, to set up the apis again in worker processes
+    context.obj.setdefault("upload_config", dict(context.obj))
     context.obj["status"] = Store(context.obj["database"])
 
     if family_id:
@@ -76,44 +139,7 @@ def upload(context, family_id, force_restart):
             click.echo(click.style(message, fg="yellow"))
             return
 
-    context.obj["housekeeper_api"] = hk.HousekeeperAPI(context.obj)
-
-    context.obj["madeline_api"] = madeline.api.MadelineAPI(context.obj)
-    context.obj["genotype_api"] = gt.GenotypeAPI(context.obj)
-    context.obj["lims_api"] = lims.LimsAPI(context.obj)
-    context.obj["tb_api"] = tb.TrailblazerAPI(context.obj)
-    context.obj["chanjo_api"] = coverage_app.ChanjoAPI(context.obj)
-    context.obj["deliver_api"] = DeliverAPI(
-        context.obj,
-        hk_api=context.obj["housekeeper_api"],
-        lims_api=context.obj["lims_api"],
-        case_tags=CASE_TAGS,
-        sample_tags=SAMPLE_TAGS,
-    )
-    context.obj["scout_api"] = scoutapi.ScoutAPI(context.obj)
-    context.obj["analysis_api"] = AnalysisAPI(
-        context.obj,
-        hk_api=context.obj["housekeeper_api"],
-        scout_api=context.obj["scout_api"],
-        tb_api=context.obj["tb_api"],
-        lims_api=context.obj["lims_api"],
-        deliver_api=context.obj["deliver_api"],
-    )
-    context.obj["report_api"] = ReportAPI(
-        store=context.obj["status"],
-        lims_api=context.obj["lims_api"],
-        chanjo_api=context.obj["chanjo_api"],
-        analysis_api=context.obj["analysis_api"],
-        scout_api=context.obj["scout_api"],
-    )
-
-    context.obj["scout_upload_api"] = UploadScoutAPI(
-        hk_api=context.obj["housekeeper_api"],
-        scout_api=context.obj["scout_api"],
-        madeline_api=context.obj["madeline_api"],
-        analysis_api=context.obj["analysis_api"],
-        lims_api=context.obj["lims_api"],
-    )
+    _add_upload_apis(context.obj)
 
     if context.invoked_subcommand is not None:
         return
@@ -128,43 +154,93 @@ def upload(context, family_id, force_restart):
         message = f"analysis already uploaded: {analysis_obj.uploaded_at.date()}"
         click.echo(click.style(message, fg="yellow"))
     else:
-        analysis_obj.upload_started_at = dt.datetime.now()
-        context.obj["status"].commit()
-        context.invoke(coverage, re_upload=True, family_id=family_id)
-        context.invoke(validate, family_id=family_id)
-        context.invoke(genotypes, re_upload=False, family_id=family_id)
-        context.invoke(observations, case_id=family_id)
-        context.invoke(scout, case_id=family_id)
-        analysis_obj.uploaded_at = dt.datetime.now()
-        context.obj["status"].commit()
+        failed_steps = _upload_case_steps(context, family_id, DEFAULT_STEP_WORKERS)
+        if failed_steps:
+            raise AnalysisUploadError(
+                f"{family_id}: upload failed for {', '.join(failed_steps)}, "
+                f"run the upload again to resume it"
+            )
         click.echo(click.style(f"{family_id}: analysis uploaded!", fg="green"))
 
 
+def _upload_case_steps(context, case_id: str, step_workers: int) -> List[str]:
+    """Run the upload steps of a case that are not completed, return the failed steps."""
+
+    def run_step(case_id: str, step: str):
+        STEP_COMMANDS[step](context, case_id)
+
+    upload_api = UploadCaseAPI(context.obj["status"], run_step, max_workers=step_workers)
+    return upload_api.upload(case_id)
+
+
+def _upload_case_in_worker(config: dict, step_workers: int, case_id: str) -> List[str]:
+    """Upload a case in a worker process, with apis of its own, return the failed steps."""
+    context_obj = dict(config)
+    context_obj["status"] = Store(config["database"])
+    _add_upload_apis(context_obj)
+    with click.Context(upload, obj=context_obj) as context:
+        return _upload_case_steps(context, case_id, step_workers)
+
+
 @upload.command()
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=DEFAULT_CASE_WORKERS,
+    show_default=True,
+    help="cases to upload concurrently",
+)
+@click.option(
+    "--step-workers",
+    type=int,
+    default=DEFAULT_STEP_WORKERS,
+    show_default=True,
+    help="independent steps to run concurrently per case",
+)
 @click.pass_context
-def auto(context):
+def auto(context, workers, step_workers):
     """Upload all completed analyses."""
 
     click.echo(click.style("----------------- AUTO ------------------------"))
 
     exit_code = 0
+    case_ids = []
     for analysis_obj in context.obj["status"].analyses_to_upload():
 
+        internal_id = analysis_obj.family.internal_id
         if analysis_obj.family.analyses[0].uploaded_at is not None:
-            LOG.warning(
-                "Newer analysis already uploaded for %s, skipping", analysis_obj.family.internal_id
-            )
+            LOG.warning("Newer analysis already uploaded for %s, skipping", internal_id)
+            continue
+
+        upload_started_at = analysis_obj.family.analyses[0].upload_started_at
+        if upload_started_at is not None:
+            if dt.datetime.now() - upload_started_at > dt.timedelta(hours=24):
+                LOG.error(
+                    "uploading family failed: %s, the upload started at %s, "
+                    "restart it with the --restart flag",
+                    internal_id,
+                    upload_started_at,
+                )
+                exit_code = 1
+            else:
+                LOG.info("upload already started for %s, skipping", internal_id)
             continue
 
-        internal_id = analysis_obj.family.internal_id
         LOG.info("uploading family: %s", internal_id)
-        try:
-            context.invoke(upload, family_id=internal_id)
-        except Exception:
+        case_ids.append(internal_id)
 
-            LOG.error("uploading family failed: %s", internal_id)
-            LOG.error(traceback.format_exc())
-            exit_code = 1
+    # worker processes are forked, they should not share the connections of this process
+    context.obj["status"].engine.dispose()
+    upload_case = functools.partial(
+        _upload_case_in_worker, context.obj["upload_config"], step_workers
+    )
+    if workers <= 1:
+        upload_case = functools.partial(_upload_case_steps, context, step_workers=step_workers)
+    failed_cases = upload_cases(case_ids, upload_case, max_workers=workers)
+    for internal_id in failed_cases:
+        LOG.error("uploading family failed: %s", internal_id)
+        exit_code = 1
 
     sys.exit(exit_code)
 
@@ -1,7 +1,9 @@
 """Code for uploading delivery report from the CLI"""
+import concurrent.futures
 import datetime as dt
 import logging
 import sys
+import time
 
 import click
 
@@ -13,38 +15,71 @@ from .utils import _suggest_cases_delivery_report
 LOG = logging.getLogger(__name__)
 SUCCESS = 0
 FAIL = 1
+DEFAULT_REPORT_WORKERS = 4
 
 
 @click.command("delivery-reports")
 @click.option("-p", "--print", "print_console", is_flag=True, help="print list to console")
 @click.option("-f", "--force", "force_report", is_flag=True, help="overrule report validation")
+@click.option(
+    "-w",
+    "--workers",
+    default=DEFAULT_REPORT_WORKERS,
+    show_default=True,
+    help="cases to generate reports for in parallel",
+)
 @click.pass_context
-def delivery_reports(context, print_console, force_report):
+def delivery_reports(context, print_console, force_report, workers):
     """Generate delivery reports for all cases that need one"""
 
     click.echo(click.style("----------------- DELIVERY REPORTS ------------------------"))
 
-    exit_code = SUCCESS
-    for analysis_obj in context.obj["status"].analyses_to_delivery_report():
-        case_id = analysis_obj.family.internal_id
+    def _upload_delivery_report(case_id: str) -> bool:
         LOG.info("Uploading delivery report for case: %s", case_id)
         try:
-
             context.invoke(
                 delivery_report,
-                family_id=analysis_obj.family.internal_id,
+                family_id=case_id,
                 print_console=print_console,
                 force_report=force_report,
             )
         except FileNotFoundError as error:
             LOG.error("Missing file for delivery report creation for case: %s, %s", case_id, error)
-            exit_code = FAIL
+            return False
         except DeliveryReportError as error:
             LOG.error("Creation of delivery report failed for case: %s, %s", case_id, error.message)
-            exit_code = FAIL
+            return False
         except CgError as error:
             LOG.error("Uploading delivery report failed for case: %s, %s", case_id, error.message)
-            exit_code = FAIL
+            return False
+        return True
+
+    case_ids = [
+        analysis_obj.family.internal_id
+        for analysis_obj in context.obj["status"].analyses_to_delivery_report()
+    ]
+    started = time.monotonic()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = (
+            executor.map(_upload_delivery_report, case_ids)
+            if executor
+            else map(_upload_delivery_report, case_ids)
+        )
+        exit_code = SUCCESS
+        for nr_done, succeeded in enumerate(results, start=1):
+            if not succeeded:
+                exit_code = FAIL
+            minutes = (time.monotonic() - started) / 60
+            LOG.info(
+                "%s/%s delivery reports done, %.1f per minute",
+                nr_done,
+                len(case_ids),
+                nr_done / minutes if minutes else 0,
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
     sys.exit(exit_code)
 
 
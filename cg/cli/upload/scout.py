@@ -30,7 +30,7 @@ def scout(context, re_upload, print_console, case_id):
     status_api = context.obj["status"]
     scout_upload_api = context.obj["scout_upload_api"]
     hk_api = context.obj["housekeeper_api"]
-    family_obj = status_api.family(case_id)
+    family_obj = status_api.family(case_id, profile="case_full")
     scout_config = scout_upload_api.generate_config(family_obj.analyses[0])
 
     if print_console:
@@ -1,7 +1,6 @@
 """ Add CLI support to create config and/or start BALSAMIC """
 import gzip
 import logging
-import re
 import shutil
 import subprocess
 import sys
@@ -10,7 +9,7 @@ from pathlib import Path
 import click
 from cg.apps import hk, lims
 from cg.apps.balsamic.fastq import FastqHandler
-from cg.utils.fastq import FastqAPI
+from cg.utils.fastq import FastqAPI, FastqIndex, fastq_link_files
 from cg.cli.workflow.balsamic.store import store as store_cmd
 from cg.cli.workflow.balsamic.deliver import deliver as deliver_cmd
 from cg.cli.workflow.get_links import get_links
@@ -134,24 +133,13 @@ def config_case(
         file_objs = context.obj["hk_api"].get_files(
             bundle=link_obj.sample.internal_id, tags=["fastq"]
         )
-        files = []
-        for file_obj in file_objs:
-            # figure out flowcell name from header
-            with context.obj["gzipper"].open(file_obj.full_path) as handle:
-                header_line = handle.readline().decode()
-                header_info = context.obj["fastq_api"].parse_header(header_line)
-            data = {
-                "path": file_obj.full_path,
-                "lane": int(header_info["lane"]),
-                "flowcell": header_info["flowcell"],
-                "read": int(header_info["readnumber"]),
-                "undetermined": ("_Undetermined_" in file_obj.path),
-            }
-            # look for tile identifier (HiSeq X runs)
-            matches = re.findall(r"-l[1-9]t([1-9]{2})_", file_obj.path)
-            if len(matches) > 0:
-                data["flowcell"] = f"{data['flowcell']}-{matches[0]}"
-            files.append(data)
+        paths = [file_obj.full_path for file_obj in file_objs]
+        headers = FastqIndex(
+            context.obj["store_api"],
+            parse_header=context.obj["fastq_api"].parse_header,
+            gzipper=context.obj["gzipper"],
+        ).headers(paths)
+        files = fastq_link_files(paths, [headers[path] for path in paths])
         sorted_files = sorted(files, key=lambda k: k["path"])
 
         for fastq_data in sorted_files:
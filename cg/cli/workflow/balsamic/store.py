@@ -80,6 +80,7 @@ def analysis(context, case_id, deliverables_file_path, config_path):
         raise StoreError(sys.exc_info()[0])
 
     status.add_commit(new_analysis)
+    status.refresh_case_status([new_analysis.family_id])
     LOG.info("Included files in Housekeeper")
 
 
@@ -41,6 +41,7 @@ def analysis(context, config_stream):
     )
 
     status.add_commit(new_analysis)
+    status.refresh_case_status([new_analysis.family_id])
     click.echo(click.style("included files in Housekeeper", fg="green"))
 
 
@@ -63,6 +63,7 @@ def analysis(context, config_stream):
         context.abort()
 
     status.add_commit(new_analysis)
+    status.refresh_case_status([new_analysis.family_id])
     click.echo(click.style("included files in Housekeeper", fg="green"))
 
 
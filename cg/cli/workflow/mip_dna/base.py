@@ -62,6 +62,9 @@ def mip_dna(context: click.Context, case_id: str, email: str, priority: str, sta
             LOG.warning("%s: not ready to run", case_obj.internal_id)
             # commit the updates to request flowcells
             context.obj["db"].commit()
+            context.obj["db"].refresh_flowcells_case_status(
+                context.obj["db"].flowcells(family=case_obj)
+            )
         else:
             # execute the analysis!
             context.invoke(config_case, case_id=case_id)
@@ -39,6 +39,7 @@ class BackupApi:
             flowcell_obj.status = "processing"
             if not dry_run:
                 self.status.commit()
+                self.status.refresh_flowcells_case_status([flowcell_obj])
         return flowcell_obj
 
     def fetch_flowcell(self, flowcell_obj: models.Flowcell = None, dry_run: bool = False) -> float:
@@ -73,6 +74,7 @@ class BackupApi:
             if not dry_run:
                 flowcell_obj.status = "requested"
                 self.status.commit()
+                self.status.refresh_flowcells_case_status([flowcell_obj])
             raise error
         toc = time.time()
         return toc - tic
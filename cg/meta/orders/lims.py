@@ -60,5 +60,5 @@ class LimsHandler:
         samples_lims = self.to_lims(data["customer"], samples)
         project_name = data["ticket"] or data["name"]
         project_data = self.lims.submit_project(project_name, samples_lims)
-        lims_map = self.lims.get_samples(projectlimsid=project_data["id"], map_ids=True)
+        lims_map = project_data.pop("samples")
         return project_data, lims_map
@@ -1,6 +1,6 @@
 """Ordering module for intration"""
 import datetime as dt
-from typing import List
+from typing import Dict, List
 
 from cg.exc import OrderError
 from cg.store import models
@@ -175,79 +175,143 @@ class StatusHandler:
             status_data["families"].append(case)
         return status_data
 
+    def _application_versions(self, tags: List[str]) -> Dict[str, models.ApplicationVersion]:
+        """Fetch the current versions of the applications in an order."""
+        application_versions = self.status.current_application_versions(tags)
+        for tag in tags:
+            if tag not in application_versions:
+                raise OrderError(f"Invalid application: {tag}")
+        return application_versions
+
+    def _insert_links(self, links: List[tuple]):
+        """Insert links of flushed families and samples in one statement."""
+        self.status.session.bulk_insert_mappings(
+            models.FamilySample,
+            [
+                {
+                    "family_id": family_obj.id,
+                    "sample_id": sample_obj.id,
+                    "status": status or "unknown",
+                    "mother_id": mother_obj.id if mother_obj else None,
+                    "father_id": father_obj.id if father_obj else None,
+                }
+                for family_obj, sample_obj, status, mother_obj, father_obj in links
+            ],
+            render_nulls=True,
+        )
+        self.status.mark_case_status_changed(family_obj.id for family_obj, *_ in links)
+
+    def _insert_deliveries(self, samples: List[models.Sample] = (), pools: List[models.Pool] = ()):
+        """Insert deliveries of flushed samples and pools in one statement."""
+        self.status.session.bulk_insert_mappings(
+            models.Delivery,
+            [
+                {"destination": "caesar", "sample_id": sample_obj.id, "pool_id": None}
+                for sample_obj in samples
+            ]
+            + [
+                {"destination": "caesar", "sample_id": None, "pool_id": pool_obj.id}
+                for pool_obj in pools
+            ],
+            render_nulls=True,
+        )
+
     def store_cases(
         self, customer: str, order: str, ordered: dt.datetime, ticket: int, cases: List[dict],
     ) -> List[models.Family]:
-        """Store cases and samples in the status database."""
+        """Store cases and samples in the status database.
+
+        Existing families, samples and links are fetched up front, new samples and families are
+        flushed together and their links and deliveries inserted in bulk.
+        """
         customer_obj = self.status.customer(customer)
         if customer_obj is None:
             raise OrderError(f"unknown customer: {customer}")
-        new_families = []
-        for case in cases:
-            case_obj = self.status.find_family(customer_obj, case["name"])
-            if case_obj:
-                case_obj.panels = case["panels"]
-            else:
-                case_obj = self.status.add_family(
-                    name=case["name"], panels=case["panels"], priority=case["priority"]
-                )
-                case_obj.customer = customer_obj
-                new_families.append(case_obj)
+        order_samples = [sample for case in cases for sample in case["samples"]]
+        sample_ids = [sample["internal_id"] for sample in order_samples if sample["internal_id"]]
+        existing_samples = self.status.find_samples(sample_ids) if sample_ids else {}
+        application_versions = self._application_versions(
+            [
+                sample["application"]
+                for sample in order_samples
+                if sample["internal_id"] not in existing_samples
+            ]
+        )
+        case_objs = self.status.find_families(customer_obj, [case["name"] for case in cases])
+        links = (
+            self.status.family_links([case_obj.internal_id for case_obj in case_objs.values()])
+            if case_objs
+            else {}
+        )
+        new_family_ids = iter(self.status.new_family_ids(len(cases) - len(case_objs)))
 
-            family_samples = {}
-            for sample in case["samples"]:
-                sample_obj = self.status.sample(sample["internal_id"])
-                if sample_obj:
-                    family_samples[sample["name"]] = sample_obj
+        new_families = []
+        new_samples = []
+        new_links = []
+        with self.status.session.no_autoflush:
+            for case in cases:
+                case_obj = case_objs.get(case["name"])
+                if case_obj:
+                    case_obj.panels = case["panels"]
                 else:
-                    new_sample = self.status.add_sample(
-                        capture_kit=sample["capture_kit"],
-                        comment=sample["comment"],
-                        data_analysis=sample["data_analysis"],
-                        from_sample=sample["from_sample"],
-                        internal_id=sample["internal_id"],
-                        name=sample["name"],
-                        order=order,
-                        ordered=ordered,
+                    case_obj = self.status.add_family(
+                        name=case["name"],
+                        panels=case["panels"],
                         priority=case["priority"],
-                        sex=sample["sex"],
-                        ticket=ticket,
-                        time_point=sample["time_point"],
-                        tumour=sample["tumour"],
+                        internal_id=next(new_family_ids),
                     )
-                    new_sample.customer = customer_obj
-                    with self.status.session.no_autoflush:
-                        application_tag = sample["application"]
-                        new_sample.application_version = self.status.current_application_version(
-                            application_tag
+                    case_obj.customer = customer_obj
+                    new_families.append(case_obj)
+
+                family_samples = {}
+                for sample in case["samples"]:
+                    sample_obj = existing_samples.get(sample["internal_id"])
+                    if sample_obj is None:
+                        sample_obj = self.status.add_sample(
+                            capture_kit=sample["capture_kit"],
+                            comment=sample["comment"],
+                            data_analysis=sample["data_analysis"],
+                            from_sample=sample["from_sample"],
+                            internal_id=sample["internal_id"],
+                            name=sample["name"],
+                            order=order,
+                            ordered=ordered,
+                            priority=case["priority"],
+                            sex=sample["sex"],
+                            ticket=ticket,
+                            time_point=sample["time_point"],
+                            tumour=sample["tumour"],
                         )
-                    if new_sample.application_version is None:
-                        raise OrderError(f"Invalid application: {sample['application']}")
-
-                    family_samples[new_sample.name] = new_sample
-                    self.status.add(new_sample)
-                    new_delivery = self.status.add_delivery(destination="caesar", sample=new_sample)
-                    self.status.add(new_delivery)
-
-            for sample in case["samples"]:
-                mother_obj = family_samples[sample["mother"]] if sample.get("mother") else None
-                father_obj = family_samples[sample["father"]] if sample.get("father") else None
-                with self.status.session.no_autoflush:
-                    link_obj = self.status.link(case_obj.internal_id, sample["internal_id"])
-                if link_obj:
-                    link_obj.status = sample["status"] or link_obj.status
-                    link_obj.mother = mother_obj or link_obj.mother
-                    link_obj.father = father_obj or link_obj.father
-                else:
-                    new_link = self.status.relate_sample(
-                        family=case_obj,
-                        sample=family_samples[sample["name"]],
-                        status=sample["status"],
-                        mother=mother_obj,
-                        father=father_obj,
-                    )
-                    self.status.add(new_link)
-            self.status.add_commit(new_families)
+                        sample_obj.customer = customer_obj
+                        sample_obj.application_version = application_versions[sample["application"]]
+                        existing_samples[sample_obj.internal_id] = sample_obj
+                        new_samples.append(sample_obj)
+                    family_samples[sample["name"]] = sample_obj
+
+                for sample in case["samples"]:
+                    mother_obj = family_samples[sample["mother"]] if sample.get("mother") else None
+                    father_obj = family_samples[sample["father"]] if sample.get("father") else None
+                    link_obj = links.get((case_obj.internal_id, sample["internal_id"]))
+                    if link_obj:
+                        link_obj.status = sample["status"] or link_obj.status
+                        link_obj.mother = mother_obj or link_obj.mother
+                        link_obj.father = father_obj or link_obj.father
+                    else:
+                        new_links.append(
+                            (
+                                case_obj,
+                                family_samples[sample["name"]],
+                                sample["status"],
+                                mother_obj,
+                                father_obj,
+                            )
+                        )
+
+        self.status.add_all(new_families + new_samples)
+        self.status.flush()
+        self._insert_links(new_links)
+        self._insert_deliveries(samples=new_samples)
+        self.status.commit()
         return new_families
 
     def store_samples(
@@ -257,6 +321,9 @@ class StatusHandler:
         customer_obj = self.status.customer(customer)
         if customer_obj is None:
             raise OrderError(f"unknown customer: {customer}")
+        application_versions = self._application_versions(
+            [sample["application"] for sample in samples]
+        )
         new_samples = []
 
         with self.status.session.no_autoflush:
@@ -274,11 +341,7 @@ class StatusHandler:
                     data_analysis=sample["data_analysis"],
                 )
                 new_sample.customer = customer_obj
-                application_tag = sample["application"]
-                application_version = self.status.current_application_version(application_tag)
-                if application_version is None:
-                    raise OrderError(f"Invalid application: {sample['application']}")
-                new_sample.application_version = application_version
+                new_sample.application_version = application_versions[sample["application"]]
                 new_samples.append(new_sample)
 
         self.status.add_commit(new_samples)
@@ -292,7 +355,15 @@ class StatusHandler:
         customer_obj = self.status.customer(customer)
         if customer_obj is None:
             raise OrderError(f"unknown customer: {customer}")
+        application_versions = self._application_versions(
+            [sample["application"] for sample in samples]
+        )
+        new_family_ids = iter(
+            self.status.new_family_ids(sum(1 for sample in samples if not sample["tumour"]))
+        )
         new_samples = []
+        new_families = []
+        new_links = []
 
         with self.status.session.no_autoflush:
             for sample in samples:
@@ -309,30 +380,25 @@ class StatusHandler:
                     data_analysis=sample["data_analysis"],
                 )
                 new_sample.customer = customer_obj
-
-                application_tag = sample["application"]
-                application_version = self.status.current_application_version(application_tag)
-                if application_version is None:
-                    raise OrderError(f"Invalid application: {sample['application']}")
-                new_sample.application_version = application_version
+                new_sample.application_version = application_versions[sample["application"]]
                 new_samples.append(new_sample)
 
                 if not new_sample.is_tumour:
                     new_family = self.status.add_family(
-                        name=sample["name"], panels=["OMIM-AUTO"], priority="research"
+                        name=sample["name"],
+                        panels=["OMIM-AUTO"],
+                        priority="research",
+                        internal_id=next(new_family_ids),
                     )
                     new_family.customer = production_customer
-                    self.status.add(new_family)
-
-                    new_relationship = self.status.relate_sample(
-                        family=new_family, sample=new_sample, status=sample["status"] or "unknown",
-                    )
-                    self.status.add(new_relationship)
-
-                new_delivery = self.status.add_delivery(destination="caesar", sample=new_sample)
-                self.status.add(new_delivery)
-
-        self.status.add_commit(new_samples)
+                    new_families.append(new_family)
+                    new_links.append((new_family, new_sample, sample["status"], None, None))
+
+        self.status.add_all(new_samples + new_families)
+        self.status.flush()
+        self._insert_links(new_links)
+        self._insert_deliveries(samples=new_samples)
+        self.status.commit()
         return new_samples
 
     def store_microbial_order(
@@ -396,24 +462,22 @@ class StatusHandler:
         customer_obj = self.status.customer(customer)
         if customer_obj is None:
             raise OrderError(f"unknown customer: {customer}")
+        application_versions = self._application_versions([pool["application"] for pool in pools])
         new_pools = []
         for pool in pools:
-            with self.status.session.no_autoflush:
-                application_version = self.status.current_application_version(pool["application"])
-                if application_version is None:
-                    raise OrderError(f"Invalid application: {pool['application']}")
             new_pool = self.status.add_pool(
                 customer=customer_obj,
                 name=pool["name"],
                 order=order,
                 ordered=ordered,
                 ticket=ticket,
-                application_version=application_version,
+                application_version=application_versions[pool["application"]],
                 data_analysis=pool["data_analysis"],
                 capture_kit=pool["capture_kit"],
             )
-            new_delivery = self.status.add_delivery(destination="caesar", pool=new_pool)
-            self.status.add(new_delivery)
             new_pools.append(new_pool)
-        self.status.add_commit(new_pools)
+        self.status.add_all(new_pools)
+        self.status.flush()
+        self._insert_deliveries(pools=new_pools)
+        self.status.commit()
         return new_pools
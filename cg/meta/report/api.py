@@ -1,11 +1,16 @@
 """Module to create MIP analysis delivery reports"""
+import concurrent.futures
+import functools
 import logging
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 import requests
 import ruamel.yaml
-from jinja2 import Environment, PackageLoader, select_autoescape
+from jinja2 import Environment, PackageLoader, Template, select_autoescape
 from cg.apps.coverage import ChanjoAPI
 from cg.apps.lims import LimsAPI
 from cg.apps.scoutapi import ScoutAPI
@@ -17,6 +22,20 @@ from cg.meta.report.presenter import Presenter
 from cg.store import Store, models
 from cg.exc import DeliveryReportError
 
+DEFAULT_REPORT_WORKERS = 4
+# seconds to wait for each source of report data, from when its fetches were started
+DEFAULT_SOURCE_TIMEOUT = 600
+
+
+@functools.lru_cache()
+def delivery_report_template() -> Template:
+    """Return the compiled delivery report template, it is compiled once per process."""
+    env = Environment(
+        loader=PackageLoader("cg", "meta/report/templates"),
+        autoescape=select_autoescape(["html", "xml"]),
+    )
+    return env.get_template("report.html")
+
 
 class ReportAPI:
     """API to create MIP analysis delivery reports"""
@@ -31,6 +50,8 @@ class ReportAPI:
         logger=logging.getLogger(__name__),
         yaml_loader=ruamel.yaml,
         path_tool=Path,
+        max_workers: int = DEFAULT_REPORT_WORKERS,
+        source_timeout: int = DEFAULT_SOURCE_TIMEOUT,
     ):
 
         self.store = store
@@ -42,6 +63,11 @@ class ReportAPI:
         self.path_tool = path_tool
         self.scout = scout_api
         self.report_validator = ReportValidator(store)
+        self.max_workers = max_workers
+        self.source_timeout = source_timeout
+        # panel genes by panel and version, kept for the lifetime of the api
+        self._panel_genes: Dict[Tuple[str, Optional[str]], list] = dict()
+        self._panel_genes_lock = threading.Lock()
 
     def create_delivery_report(self, case_id: str, accept_missing_data: bool = False) -> str:
         """Generate the html contents of a delivery report."""
@@ -105,10 +131,7 @@ class ReportAPI:
 
         report_data["samples"] = self._fetch_case_samples_from_status_db(case_id)
         report_data["panels"] = self._fetch_panels_from_status_db(case_id)
-        self._incorporate_lims_data(report_data)
-        self._incorporate_lims_methods(report_data["samples"])
-        self._incorporate_coverage_data(report_data["samples"], report_data["panels"])
-        self._incorporate_trending_data(report_data, case_id)
+        self._incorporate_external_data(report_data, case_id)
 
         report_data["today"] = datetime.today()
         application_data = self._get_application_data_from_status_db(report_data["samples"])
@@ -117,40 +140,95 @@ class ReportAPI:
 
     def _get_case_from_statusdb(self, case_id: str) -> models.Family:
         """Fetch a case object from the status database."""
-        return self.store.family(case_id)
+        return self.store.family(case_id, profile="case_full")
+
+    def _incorporate_external_data(self, report_data: dict, case_id: str):
+        """Fetch the data from LIMS, chanjo and the trending metadata concurrently.
+
+        The fetches run in a bounded pool of threads and their results are added to the report
+        data in this thread, in the same order as when they are fetched one after another. A
+        source that has not responded within the source timeout from the start is reported as
+        missing data.
+        """
+        samples = report_data["samples"]
+        lims_ids = [sample["internal_id"] for sample in samples]
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        started = time.monotonic()
+        try:
+            # the coverage waits for the genes, fetch them first
+            genes_future = executor.submit(self._get_genes_from_scout, report_data["panels"])
+            trending_future = executor.submit(self.analysis.get_latest_metadata, family_id=case_id)
+            lims_futures = [executor.submit(self._fetch_lims_samples, lims_ids)] + [
+                executor.submit(self._fetch_lims_methods, lims_id) for lims_id in lims_ids
+            ]
+            genes = self._wait_for_source("scout", [genes_future], started)
+            coverage_futures = (
+                [executor.submit(self._get_samples_coverage_from_chanjo, lims_ids, genes[0])]
+                if genes
+                else []
+            )
+
+            lims_results = self._wait_for_source("LIMS", lims_futures, started)
+            lims_samples, *methods = lims_results or [dict()] + [dict()] * len(samples)
+            self._add_lims_data(samples, lims_samples)
+            for sample, sample_methods in zip(samples, methods):
+                for method_type in ["prep_method", "sequencing_method"]:
+                    sample[method_type] = sample_methods.get(method_type)
+
+            coverages = genes and self._wait_for_source("chanjo", coverage_futures, started)
+            for sample in samples:
+                self._add_coverage_data(
+                    sample, coverages[0].get(sample["internal_id"]) if coverages else None
+                )
+
+            trending = self._wait_for_source("trending", [trending_future], started)
+            self._add_trending_data(report_data, trending[0] if trending else dict())
+        finally:
+            executor.shutdown(wait=False)
+
+    def _wait_for_source(self, source: str, futures: list, started: float) -> Optional[list]:
+        """Return the results of the fetches from a source, None if they did not finish in time."""
+        timeout = max(0, started + self.source_timeout - time.monotonic())
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        if not_done:
+            self.log.warning("%s did not respond within %s s", source, self.source_timeout)
+            for future in not_done:
+                future.cancel()
+            return None
+        return [future.result() for future in futures]
 
     def _incorporate_lims_methods(self, samples: list):
         """Fetch the methods used for preparation, sequencing and delivery of the samples."""
 
         for sample in samples:
-            lims_id = sample["internal_id"]
-            method_types = ["prep_method", "sequencing_method"]
-            for method_type in method_types:
-                get_method = getattr(self.lims, f"get_{method_type}")
-                method_name = get_method(lims_id)
-                sample[method_type] = method_name
+            sample.update(self._fetch_lims_methods(sample["internal_id"]))
+
+    def _fetch_lims_methods(self, lims_id: str) -> dict:
+        """Fetch the methods used for preparation and sequencing of a sample."""
+        methods = dict()
+        for method_type in ["prep_method", "sequencing_method"]:
+            get_method = getattr(self.lims, f"get_{method_type}")
+            methods[method_type] = get_method(lims_id)
+        return methods
 
     @staticmethod
     def _render_delivery_report(report_data: dict) -> str:
         """Render and return report data on the report Jinja template."""
 
-        env = Environment(
-            loader=PackageLoader("cg", "meta/report/templates"),
-            autoescape=select_autoescape(["html", "xml"]),
-        )
-        template = env.get_template("report.html")
-        template_out = template.render(**report_data)
+        template_out = delivery_report_template().render(**report_data)
         return template_out
 
-    def _get_sample_coverage_from_chanjo(self, lims_id: str, genes: list) -> dict:
-
-        """Get coverage data from Chanjo for a sample."""
-        return self.chanjo.sample_coverage(lims_id, genes)
+    def _get_samples_coverage_from_chanjo(self, lims_ids: list, genes: list) -> dict:
+        """Get coverage data from Chanjo for the samples in one call."""
+        return self.chanjo.samples_coverage(lims_ids, genes)
 
     def _incorporate_trending_data(self, report_data: dict, case_id: str):
         """Incorporate trending data into a set of samples."""
         trending_data = self.analysis.get_latest_metadata(family_id=case_id)
+        self._add_trending_data(report_data, trending_data)
 
+    @staticmethod
+    def _add_trending_data(report_data: dict, trending_data: dict):
         mapped_reads_all_samples = trending_data.get("mapped_reads", {})
         duplicates_all_samples = trending_data.get("duplicates", {})
         analysis_sex_all_samples = trending_data.get("analysis_sex", {})
@@ -168,28 +246,30 @@ class ReportAPI:
 
         genes = self._get_genes_from_scout(panels)
 
+        coverages = self._get_samples_coverage_from_chanjo(
+            [sample["internal_id"] for sample in samples], genes
+        )
         for sample in samples:
-            lims_id = sample["internal_id"]
-
-            sample_coverage = self._get_sample_coverage_from_chanjo(lims_id, genes)
+            self._add_coverage_data(sample, coverages.get(sample["internal_id"]))
 
-            target_coverage = None
-            target_completeness = None
+    def _add_coverage_data(self, sample: dict, sample_coverage: Optional[dict]):
+        target_coverage = None
+        target_completeness = None
 
-            if sample_coverage:
-                target_coverage = sample_coverage.get("mean_coverage")
-                target_completeness = sample_coverage.get("mean_completeness")
-            else:
-                self.log.warning("No coverage could be calculated for: %s", lims_id)
+        if sample_coverage:
+            target_coverage = sample_coverage.get("mean_coverage")
+            target_completeness = sample_coverage.get("mean_completeness")
+        else:
+            self.log.warning("No coverage could be calculated for: %s", sample["internal_id"])
 
-            sample["target_coverage"] = target_coverage
-            sample["target_completeness"] = target_completeness
+        sample["target_coverage"] = target_coverage
+        sample["target_completeness"] = target_completeness
 
     def _fetch_case_samples_from_status_db(self, case_id: str) -> list:
         """Incorporate data from the status database for each sample ."""
 
         delivery_data_samples = list()
-        case_samples = self.store.family_samples(case_id)
+        case_samples = self.store.family_samples(case_id, profile="link_with_sample")
 
         for case_sample in case_samples:
             sample = case_sample.sample
@@ -255,15 +335,21 @@ class ReportAPI:
 
     def _incorporate_lims_data(self, report_data: dict):
         """Incorporate data from LIMS for each sample ."""
-        for sample in report_data.get("samples"):
-            lims_id = sample["internal_id"]
+        samples = report_data.get("samples")
+        lims_samples = self._fetch_lims_samples([sample["internal_id"] for sample in samples])
+        self._add_lims_data(samples, lims_samples)
 
-            try:
-                lims_sample = self.lims.sample(lims_id)
-            except requests.exceptions.HTTPError as error:
-                lims_sample = dict()
-                self.log.info("could not fetch sample %s from LIMS: %s", lims_id, error)
+    def _fetch_lims_samples(self, lims_ids: list) -> dict:
+        try:
+            return self.lims.samples_bulk(lims_ids)
+        except requests.exceptions.HTTPError as error:
+            self.log.info("could not fetch samples %s from LIMS: %s", ", ".join(lims_ids), error)
+            return dict()
 
+    @staticmethod
+    def _add_lims_data(samples: list, lims_samples: dict):
+        for sample in samples:
+            lims_sample = lims_samples.get(sample["internal_id"], dict())
             sample["name"] = lims_sample.get("name")
             sample["sex"] = lims_sample.get("sex")
             sample["source"] = lims_sample.get("source")
@@ -274,12 +360,23 @@ class ReportAPI:
         panel_genes = list()
 
         for panel in panels:
-            panel_genes.extend(self.scout.get_genes(panel))
+            panel_genes.extend(self._get_panel_genes(panel))
 
         panel_gene_ids = [gene.get("hgnc_id") for gene in panel_genes]
 
         return panel_gene_ids
 
+    def _get_panel_genes(self, panel: str, version: str = None) -> list:
+        """Fetch the genes of a panel from scout, once per panel and version."""
+        key = (panel, version)
+        with self._panel_genes_lock:
+            if key in self._panel_genes:
+                return self._panel_genes[key]
+        genes = self.scout.get_genes(panel, version=version)
+        with self._panel_genes_lock:
+            self._panel_genes[key] = genes
+        return genes
+
     @staticmethod
     def _make_data_presentable(delivery_data: dict) -> dict:
         """Replace db values with what a human might expect"""
@@ -1,11 +1,13 @@
 """API for transfer a flowcell"""
 
+import datetime as dt
 import logging
-from typing import List
+from typing import Dict, List
 
 from cg.apps.hk import HousekeeperAPI
 from cg.apps.stats import StatsAPI
 from cg.store import Store, models
+from cg.utils.fastq import FastqIndex
 
 LOG = logging.getLogger(__name__)
 
@@ -19,7 +21,7 @@ class TransferFlowcell:
         self.hk = hk_api
 
     def transfer(self, flowcell_name: str, store: bool = True) -> models.Flowcell:
-        """Populate the database with the information."""
+        """Populate the database with the information, the status database is not committed."""
         if store and self.hk.tag("fastq") is None:
             self.hk.add_commit(self.hk.new_tag("fastq"))
         if store and self.hk.tag(flowcell_name) is None:
@@ -34,22 +36,25 @@ class TransferFlowcell:
                 date=stats_data["date"],
             )
         flowcell_obj.status = "ondisk"
+        sample_names = [sample_data["name"] for sample_data in stats_data["samples"]]
+        samples = self.db.samples_by_internal_id(sample_names)
+        if store:
+            self.store_fastqs(
+                flowcell=flowcell_name,
+                sample_fastqs={
+                    sample_data["name"]: sample_data["fastqs"]
+                    for sample_data in stats_data["samples"]
+                    if sample_data["name"] in samples
+                },
+            )
+
         for sample_data in stats_data["samples"]:
             LOG.debug(f"adding reads/fastqs to sample: {sample_data['name']}")
-            sample_obj = self.db.sample(sample_data["name"]) or self.db.microbial_sample(
-                sample_data["name"]
-            )
+            sample_obj = samples.get(sample_data["name"])
             if sample_obj is None:
                 LOG.warning(f"unable to find sample: {sample_data['name']}")
                 continue
 
-            if store:
-                self.store_fastqs(
-                    sample=sample_obj.internal_id,
-                    flowcell=flowcell_name,
-                    fastq_files=sample_data["fastqs"],
-                )
-
             sample_obj.reads = sample_data["reads"]
             enough_reads = (
                 sample_obj.reads > sample_obj.application_version.application.expected_reads
@@ -70,25 +75,38 @@ class TransferFlowcell:
                 f"[{'DONE' if enough_reads else 'NOT DONE'}]"
             )
 
+        # the case status of the samples is refreshed when the caller commits the flowcell
         return flowcell_obj
 
-    def store_fastqs(self, sample: str, flowcell: str, fastq_files: List[str]):
-        """Store FASTQ files for a sample in housekeeper."""
-        hk_bundle = self.hk.bundle(sample)
-        if hk_bundle is None:
-            hk_bundle = self.hk.new_bundle(sample)
-            self.hk.add_commit(hk_bundle)
-            new_version = self.hk.new_version(created_at=hk_bundle.created_at)
-            hk_bundle.versions.append(new_version)
-            self.hk.commit()
-            LOG.info(f"added new Housekeeper bundle: {hk_bundle.name}")
-
-        with self.hk.session_no_autoflush():
-            hk_version = hk_bundle.versions[0]
-            for fastq_file in fastq_files:
-                if self.hk.files(path=fastq_file).first() is None:
+    def store_fastqs(self, flowcell: str, sample_fastqs: Dict[str, List[str]]):
+        """Store the FASTQ files of the samples on a flowcell in housekeeper.
+
+        Existing files are looked up and the new files inserted in bulk, with one housekeeper
+        commit for the whole flowcell. Their headers are indexed in the status database, which is
+        left to the caller to commit.
+        """
+        bundles = self.hk.bundles_by_name(list(sample_fastqs))
+        for sample in sample_fastqs:
+            if sample not in bundles:
+                created_at = dt.datetime.now()
+                hk_bundle = self.hk.new_bundle(sample, created_at=created_at)
+                hk_bundle.versions.append(self.hk.new_version(created_at=created_at))
+                self.hk.add(hk_bundle)
+                bundles[sample] = hk_bundle
+                LOG.info(f"added new Housekeeper bundle: {hk_bundle.name}")
+
+        fastq_files = [fastq_file for fastqs in sample_fastqs.values() for fastq_file in fastqs]
+        stored_files = self.hk.existing_paths(fastq_files)
+        new_files = []
+        for sample, fastqs in sample_fastqs.items():
+            hk_version = bundles[sample].versions[0]
+            for fastq_file in fastqs:
+                if fastq_file not in stored_files:
                     LOG.info(f"found FASTQ file: {fastq_file}")
-                    tags = [self.hk.tag("fastq"), self.hk.tag(flowcell)]
-                    new_file = self.hk.new_file(path=fastq_file, tags=tags)
-                    hk_version.files.append(new_file)
-            self.hk.commit()
+                    new_files.append((hk_version, fastq_file))
+                    stored_files.add(fastq_file)
+
+        tags = [self.hk.tag("fastq"), self.hk.tag(flowcell)]
+        self.hk.add_files_bulk(new_files, tags=tags)
+        self.hk.commit()
+        FastqIndex(self.db, commit=False).add(fastq_file for _, fastq_file in new_files)
@@ -1,3 +1,4 @@
+import datetime as dt
 from enum import Enum
 import logging
 
@@ -5,6 +6,8 @@ from cg.store import Store
 from cg.apps.lims import LimsAPI
 
 LOG = logging.getLogger(__name__)
+# transfer the processes modified just before the mark again, to allow for clock differences
+MARK_OVERLAP = dt.timedelta(hours=1)
 
 
 class SampleState(Enum):
@@ -55,15 +58,8 @@ class TransferLims(object):
         }
 
         self._date_functions = {
-            SampleState.RECEIVED: self.lims.get_received_date,
-            SampleState.PREPARED: self.lims.get_prepared_date,
-            SampleState.DELIVERED: self.lims.get_delivery_date,
             PoolState.RECEIVED: self.lims.get_received_date,
             PoolState.DELIVERED: self.lims.get_delivery_date,
-            MicrobialState.RECEIVED: self.lims.get_received_date,
-            MicrobialState.PREPARED: self.lims.get_prepared_date,
-            MicrobialState.SEQUENCED: self.lims.get_sequenced_date,
-            MicrobialState.DELIVERED: self.lims.get_delivery_date,
         }
 
     def _get_all_samples_not_yet_delivered(self):
@@ -85,23 +81,70 @@ class TransferLims(object):
         else:
             LOG.info(f"{samples.count()} samples to process")
 
-        for sample_obj in samples:
-            lims_date = self._date_functions[status_type](sample_obj.internal_id)
-            statusdb_date = getattr(sample_obj, f"{status_type.value}_at")
-            if lims_date:
+        self._update_dates(self.status.Sample, samples.all(), status_type)
 
-                if statusdb_date and statusdb_date.date() == lims_date:
-                    continue
+    def transfer_samples_since_mark(self, status_type: SampleState):
+        """Transfer the dates of the samples processed in LIMS since the previous transfer.
 
-                LOG.info(
-                    f"Found new {status_type.value} date for {sample_obj.internal_id}: "
-                    f"{lims_date}, old value: {statusdb_date} "
-                )
+        The first transfer checks every sample without a date of the status and marks when it
+        started. Later transfers only check the samples in LIMS processes modified since the mark.
+        """
+        mark_name = f"lims-sample-{status_type.value}"
+        mark = self.status.transfer_mark(mark_name)
+        started_at = dt.datetime.utcnow()
 
-                setattr(sample_obj, f"{status_type.value}_at", lims_date)
-                self.status.commit()
-            else:
-                LOG.debug(f"no {status_type.value} date found for {sample_obj.internal_id}")
+        samples = self._get_samples_in_step(status_type)
+        if mark is None:
+            LOG.info(f"No {mark_name} transfer mark, checking all samples")
+            records = samples.all()
+        else:
+            modified_ids = self.lims.samples_modified_since(mark.marked_at - MARK_OVERLAP)
+            LOG.info(f"{len(modified_ids)} samples processed in LIMS since {mark.marked_at}")
+            sample_filter = self.status.Sample.internal_id.in_(modified_ids)
+            records = samples.filter(sample_filter).all() if modified_ids else []
+
+        nr_updated = self._update_dates(self.status.Sample, records, status_type)
+        LOG.info(f"{nr_updated} {status_type.value} dates updated")
+
+        if mark is None:
+            mark = self.status.add_transfer_mark(mark_name, marked_at=started_at)
+            self.status.add(mark)
+        mark.marked_at = started_at
+        self.status.commit()
+
+    def _update_dates(self, model, records: list, status_type) -> int:
+        """Update the dates that differ from LIMS in one bulk UPDATE, return the number updated."""
+        date_field = f"{status_type.value}_at"
+        lims_dates = self._lims_dates(records, status_type)
+        updates = []
+        for record in records:
+            lims_date = lims_dates.get(record.internal_id)
+            statusdb_date = getattr(record, date_field)
+            if not lims_date:
+                LOG.debug(f"no {status_type.value} date found for {record.internal_id}")
+                continue
+            if statusdb_date and statusdb_date.date() == lims_date:
+                continue
+
+            LOG.info(
+                f"Found new {status_type.value} date for {record.internal_id}: "
+                f"{lims_date}, old value: {statusdb_date} "
+            )
+            updates.append({"id": record.id, date_field: lims_date})
+
+        if updates:
+            self.status.session.bulk_update_mappings(model, updates)
+            self.status.commit()
+            if model is self.status.Sample:
+                self.status.refresh_samples_case_status(update["id"] for update in updates)
+        return len(updates)
+
+    def _lims_dates(self, samples, status_type) -> dict:
+        """Fetch the dates of a status for all samples from LIMS in batch requests."""
+        lims_samples = self.lims.samples_bulk(sample_obj.internal_id for sample_obj in samples)
+        return {
+            lims_id: lims_sample[status_type.value] for lims_id, lims_sample in lims_samples.items()
+        }
 
     def _get_samples_to_include(self, include, status_type):
         samples = None
@@ -153,30 +196,7 @@ class TransferLims(object):
         else:
             LOG.info(f"Processing {microbial_samples.count()} microbial samples")
 
-        for microbial_sample_obj in microbial_samples:
-            internal_id = microbial_sample_obj.internal_id
-
-            lims_date = self._date_functions[status_type](microbial_sample_obj.internal_id)
-            statusdb_date = getattr(microbial_sample_obj, f"{status_type.value}_at")
-            if lims_date:
-
-                if statusdb_date and statusdb_date.date() == lims_date:
-                    continue
-
-                LOG.info(
-                    f"Found new {status_type.value} date for {microbial_sample_obj.internal_id}: "
-                    f"{lims_date}, old value: {statusdb_date} "
-                )
-
-                setattr(microbial_sample_obj, f"{status_type.value}_at", lims_date)
-                self.status.commit()
-            else:
-                LOG.debug(
-                    f"no {status_type.value} date found for {microbial_sample_obj.internal_id}"
-                )
-                LOG.info(
-                    f"no {status_type.value} date found for {microbial_sample_obj.internal_id}"
-                )
+        self._update_dates(self.status.MicrobialSample, microbial_samples.all(), status_type)
 
     def _get_samples_in_step(self, status_type):
         return self._sample_functions[status_type]()
@@ -0,0 +1,175 @@
+"""Upload the analyses of many cases concurrently and resume uploads that failed"""
+import concurrent.futures
+import datetime as dt
+import logging
+from typing import Callable, Dict, Iterable, List, Set
+
+from cg.store import Store
+
+LOG = logging.getLogger(__name__)
+
+# upload steps of a case and the steps they wait for
+UPLOAD_STEPS = {
+    "coverage": [],
+    "validate": ["coverage"],
+    "genotypes": [],
+    "observations": [],
+    "scout": [],
+}
+DEFAULT_CASE_WORKERS = 4
+DEFAULT_STEP_WORKERS = 3
+
+
+def _submit(executor, function: Callable, *args) -> concurrent.futures.Future:
+    """Submit a call to the executor, or make the call right away without one.
+
+    Like in the workers of an executor a failed call is set on the future, also when it exits
+    like a click command that aborts.
+    """
+    if executor is not None:
+        return executor.submit(function, *args)
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(function(*args))
+    except (Exception, SystemExit) as error:
+        future.set_exception(error)
+    return future
+
+
+def run_steps(
+    run_step: Callable[[str], None],
+    steps: Dict[str, List[str]],
+    done: Set[str],
+    on_done: Callable[[str], None],
+    max_workers: int = DEFAULT_STEP_WORKERS,
+) -> List[str]:
+    """Run the steps that are not done, independent steps in parallel threads.
+
+    A step starts when all the steps it waits for are done, a step that waits for a failed step
+    is not started. on_done is called for every completed step from the calling thread. With a
+    single worker the steps run one after another in the calling thread.
+
+    Returns the steps that failed.
+    """
+    done = set(done)
+    pending = [step for step in steps if step not in done]
+    failed = []
+    executor = (
+        concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    )
+    try:
+        running = {}
+        while True:
+            for step in list(pending):
+                if any(waits_for in failed for waits_for in steps[step]):
+                    LOG.warning("skipping %s, it waits for a failed step", step)
+                    pending.remove(step)
+                elif all(waits_for in done for waits_for in steps[step]):
+                    running[_submit(executor, run_step, step)] = step
+                    pending.remove(step)
+            if not running:
+                return failed
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                step = running.pop(future)
+                if future.exception() is not None:
+                    failed.append(step)
+                    continue
+                done.add(step)
+                on_done(step)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+class UploadCaseAPI:
+    """Upload the latest analysis of a case, resuming after the steps completed before"""
+
+    def __init__(
+        self,
+        store: Store,
+        run_step: Callable[[str, str], None],
+        steps: Dict[str, List[str]] = None,
+        max_workers: int = DEFAULT_STEP_WORKERS,
+    ):
+        self.store = store
+        self.run_step = run_step
+        self.steps = UPLOAD_STEPS if steps is None else steps
+        self.max_workers = max_workers
+
+    def upload(self, case_id: str) -> List[str]:
+        """Run the upload steps of a case that are not completed, return the failed steps.
+
+        Each completed step is recorded on the analysis as soon as it is done. When all steps are
+        completed the analysis is marked as uploaded, otherwise the upload start is cleared so the
+        next upload resumes after the completed steps.
+        """
+        analysis_obj = self.store.family(case_id).analyses[0]
+        analysis_obj.upload_started_at = dt.datetime.now()
+        self.store.commit()
+        if analysis_obj.upload_steps:
+            LOG.info("%s: resuming upload after %s", case_id, ", ".join(analysis_obj.upload_steps))
+
+        def run_step(step: str):
+            try:
+                self.run_step(case_id, step)
+            except (Exception, SystemExit):
+                LOG.exception("%s: %s upload failed", case_id, step)
+                raise
+
+        def record_step(step: str):
+            analysis_obj.upload_steps = analysis_obj.upload_steps + [step]
+            self.store.commit()
+            LOG.info("%s: %s upload done", case_id, step)
+
+        failed = run_steps(
+            run_step,
+            self.steps,
+            done=set(analysis_obj.upload_steps),
+            on_done=record_step,
+            max_workers=self.max_workers,
+        )
+        if set(self.steps) <= set(analysis_obj.upload_steps):
+            analysis_obj.uploaded_at = dt.datetime.now()
+        else:
+            analysis_obj.upload_started_at = None
+        self.store.commit()
+        return failed
+
+
+def upload_cases(
+    case_ids: Iterable[str],
+    upload_case: Callable[[str], List[str]],
+    max_workers: int = DEFAULT_CASE_WORKERS,
+) -> List[str]:
+    """Upload cases concurrently in worker processes, return the cases that failed.
+
+    upload_case is called with a case id in a worker process and returns the failed steps, it has
+    to be picklable, like a module level function. With a single worker the cases are uploaded
+    one after another in this process.
+    """
+    executor = (
+        concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    )
+    failed_cases = []
+    try:
+        futures = {_submit(executor, upload_case, case_id): case_id for case_id in case_ids}
+        for future in concurrent.futures.as_completed(futures):
+            case_id = futures[future]
+            try:
+                failed_steps = future.result()
+            except (Exception, SystemExit):
+                LOG.exception("%s: upload failed", case_id)
+                failed_cases.append(case_id)
+                continue
+            if failed_steps:
+                LOG.error("%s: upload failed for %s", case_id, ", ".join(failed_steps))
+                failed_cases.append(case_id)
+            else:
+                LOG.info("%s: analysis uploaded", case_id)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return failed_cases
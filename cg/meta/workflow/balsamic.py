@@ -1,12 +1,11 @@
 """Module for Balsamic Analyses"""
 import gzip
-import re
 from pathlib import Path
 
 from cg.apps import hk
 from cg.apps.pipelines.fastqhandler import BaseFastqHandler
 from cg.store import Store
-from cg.utils.fastq import FastqAPI
+from cg.utils.fastq import FastqAPI, fastq_link_files
 
 
 class AnalysisAPI:
@@ -29,26 +28,10 @@ class AnalysisAPI:
 
     def link_sample(self, fastq_handler: BaseFastqHandler, sample: str, case: str):
         """Link FASTQ files for a sample."""
-        file_objs = self.hk.files(bundle=sample, tags=["fastq"])
-        files = []
-
-        for file_obj in file_objs:
-            # figure out flowcell name from header
-            with gzip.open(file_obj.full_path) as handle:
-                header_line = handle.readline().decode()
-                header_info = self.fastq.parse_header(header_line)
-
-            data = {
-                "path": file_obj.full_path,
-                "lane": int(header_info["lane"]),
-                "flowcell": header_info["flowcell"],
-                "read": int(header_info["readnumber"]),
-                "undetermined": ("_Undetermined_" in file_obj.path),
-            }
-            # look for tile identifier (HiSeq X runs)
-            matches = re.findall(r"-l[1-9]t([1-9]{2})_", file_obj.path)
-            if len(matches) > 0:
-                data["flowcell"] = f"{data['flowcell']}-{matches[0]}"
-            files.append(data)
-
+        paths = [file_obj.full_path for file_obj in self.hk.files(bundle=sample, tags=["fastq"])]
+        headers = []
+        for path in paths:
+            with gzip.open(path) as handle:
+                headers.append(self.fastq.parse_header(handle.readline().decode()))
+        files = fastq_link_files(paths, headers)
         fastq_handler.link(case=case, sample=sample, files=files)
@@ -4,7 +4,7 @@ from flask_admin.contrib.sqla import ModelView
 from flask_dance.contrib.google import google
 from markupsafe import Markup
 
-from cg.server.ext import db
+from cg.server.ext import db, user_cache
 
 
 class BaseView(ModelView):
@@ -19,6 +19,16 @@ class BaseView(ModelView):
         return redirect(url_for("google.login", next=request.url))
 
 
+class CachedUserView(BaseView):
+    """Base for the views of models the cached API users are built from."""
+
+    def after_model_change(self, form, model, is_created):
+        user_cache.clear()
+
+    def after_model_delete(self, model):
+        user_cache.clear()
+
+
 def view_human_priority(unused1, unused2, model, unused3):
     """column formatter for priority"""
     del unused1, unused2, unused3
@@ -140,7 +150,7 @@ class BedVersionView(BaseView):
     edit_modal = True
 
 
-class CustomerView(BaseView):
+class CustomerView(CachedUserView):
     """Admin view for Model.Customer"""
 
     column_editable_list = [
@@ -376,7 +386,7 @@ class FamilySampleView(BaseView):
     edit_modal = True
 
 
-class UserView(BaseView):
+class UserView(CachedUserView):
     """Admin view for Model.User"""
 
     column_default_sort = "name"
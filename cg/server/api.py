@@ -4,17 +4,20 @@ import logging
 from functools import wraps
 from pathlib import Path
 import tempfile
+import time
 
 from cg.constants import METAGENOME_SOURCES, ANALYSIS_SOURCES
 from flask import abort, current_app, Blueprint, jsonify, g, make_response, request
-from google.auth import jwt
 from requests.exceptions import HTTPError
 from werkzeug.utils import secure_filename
 
 from cg.exc import DuplicateRecordError, OrderFormError, OrderError
 from cg.apps.lims import parse_orderform, parse_json
 from cg.meta.orders import OrdersAPI, OrderType
-from .ext import db, lims, osticket
+from cg.store import models
+from . import projection
+from .ext import db, key_store, lims, osticket, user_cache
+from .pagination import paginate, queue_page
 
 LOG = logging.getLogger(__name__)
 BLUEPRINT = Blueprint("api", __name__, url_prefix="/api/v1")
@@ -37,20 +40,31 @@ def before_request():
 
     endpoint_func = current_app.view_functions[request.endpoint]
     if not getattr(endpoint_func, "is_public", None):
+        auth_start = time.perf_counter()
         auth_header = request.headers.get("Authorization")
         if auth_header:
             jwt_token = auth_header.split("Bearer ")[-1]
         else:
             return abort(403, "no JWT token found on request")
         try:
-            user_data = jwt.decode(jwt_token, certs=current_app.config["GOOGLE_OAUTH_CERTS"])
+            user_data = key_store.decode(jwt_token)
         except ValueError as error:
             return abort(make_response(jsonify(message="outdated login certificate"), 403))
-        user_obj = db.user(user_data["email"])
-        if user_obj is None:
+        current_user = user_cache.get(user_data["email"], db.user)
+        if current_user is None:
             message = f"{user_data['email']} doesn't have access"
             return abort(make_response(jsonify(message=message), 403))
-        g.current_user = user_obj
+        g.current_user = current_user
+        g.auth_seconds = time.perf_counter() - auth_start
+        LOG.debug("authorized %s in %.1f ms", current_user.email, g.auth_seconds * 1000)
+
+
+@BLUEPRINT.after_request
+def after_request(response):
+    """Report the time spent authorizing the request."""
+    if "auth_seconds" in g:
+        response.headers["Server-Timing"] = f"auth;dur={g.auth_seconds * 1000:.1f}"
+    return response
 
 
 @BLUEPRINT.route("/submit_order/<order_type>", methods=["POST"])
@@ -102,18 +116,18 @@ def families():
     """Fetch families."""
     if request.args.get("status") == "analysis":
         records = db.cases_to_mip_analyze()
-        count = len(records)
-    else:
-        customer_obj = None if g.current_user.is_admin else g.current_user.customer
-        families_q = db.families(
-            enquiry=request.args.get("enquiry"),
-            customer=customer_obj,
-            action=request.args.get("action"),
-        )
-        count = families_q.count()
-        records = families_q.limit(30)
-    data = [family_obj.to_dict(links=True) for family_obj in records]
-    return jsonify(families=data, total=count)
+        data = [family_obj.to_dict(links=True) for family_obj in records]
+        return jsonify(families=data, total=len(records), next_cursor=None)
+
+    customer_obj = None if g.current_user.is_admin else g.current_user.customer
+    families_q = db.families(
+        enquiry=request.args.get("enquiry"),
+        customer=customer_obj,
+        action=request.args.get("action"),
+    )
+    families_q = projection.project(families_q, models.Family)
+    rows, page = paginate(families_q, models.Family.ordered_at, default_size=30)
+    return jsonify(families=projection.families(rows, links=True), **page)
 
 
 @BLUEPRINT.route("/families_in_customer_group")
@@ -123,19 +137,18 @@ def families_in_customer_group():
     families_q = db.families_in_customer_group(
         enquiry=request.args.get("enquiry"), customer=customer_obj
     )
-    count = families_q.count()
-    records = families_q.limit(30)
-    data = [family_obj.to_dict(links=True) for family_obj in records]
-    return jsonify(families=data, total=count)
+    families_q = projection.project(families_q, models.Family)
+    rows, page = paginate(families_q, models.Family.ordered_at, default_size=30)
+    return jsonify(families=projection.families(rows, links=True), **page)
 
 
 @BLUEPRINT.route("/families/<family_id>")
 def family(family_id):
     """Fetch a family with links."""
-    family_obj = db.family(family_id)
+    family_obj = db.family(family_id, profile="case_full")
     if family_obj is None:
         return abort(404)
-    elif not g.current_user.is_admin and (g.current_user.customer != family_obj.customer):
+    elif not g.current_user.is_admin and (g.current_user.customer_id != family_obj.customer_id):
         return abort(401)
 
     data = family_obj.to_dict(links=True, analyses=True)
@@ -145,11 +158,11 @@ def family(family_id):
 @BLUEPRINT.route("/families_in_customer_group/<family_id>")
 def family_in_customer_group(family_id):
     """Fetch a family with links."""
-    family_obj = db.family(family_id)
+    family_obj = db.family(family_id, profile="case_full")
     if family_obj is None:
         return abort(404)
     elif not g.current_user.is_admin and (
-        g.current_user.customer.customer_group != family_obj.customer.customer_group
+        g.current_user.customer_group_id != family_obj.customer.customer_group_id
     ):
         return abort(401)
 
@@ -171,9 +184,12 @@ def samples():
     else:
         customer_obj = None if g.current_user.is_admin else g.current_user.customer
         samples_q = db.samples(enquiry=request.args.get("enquiry"), customer=customer_obj)
-    limit = int(request.args.get("limit", 50))
-    data = [sample_obj.to_dict() for sample_obj in samples_q.limit(limit)]
-    return jsonify(samples=data, total=samples_q.count())
+    samples_q = projection.project(samples_q, models.Sample)
+    if request.args.get("status") in ("incoming", "labprep", "sequencing"):
+        rows, page = queue_page(samples_q, default_size=50)
+    else:
+        rows, page = paginate(samples_q, models.Sample.ordered_at, default_size=50)
+    return jsonify(samples=projection.samples(rows), **page)
 
 
 @BLUEPRINT.route("/samples_in_customer_group")
@@ -183,18 +199,18 @@ def samples_in_customer_group():
     samples_q = db.samples_in_customer_group(
         enquiry=request.args.get("enquiry"), customer=customer_obj
     )
-    limit = int(request.args.get("limit", 50))
-    data = [sample_obj.to_dict() for sample_obj in samples_q.limit(limit)]
-    return jsonify(samples=data, total=samples_q.count())
+    samples_q = projection.project(samples_q, models.Sample)
+    rows, page = paginate(samples_q, models.Sample.ordered_at, default_size=50)
+    return jsonify(samples=projection.samples(rows), **page)
 
 
 @BLUEPRINT.route("/samples/<sample_id>")
 def sample(sample_id):
     """Fetch a single sample."""
-    sample_obj = db.sample(sample_id)
+    sample_obj = db.sample(sample_id, profile="sample_full")
     if sample_obj is None:
         return abort(404)
-    elif not g.current_user.is_admin and (g.current_user.customer != sample_obj.customer):
+    elif not g.current_user.is_admin and (g.current_user.customer_id != sample_obj.customer_id):
         return abort(401)
     data = sample_obj.to_dict(links=True, flowcells=True)
     return jsonify(**data)
@@ -203,11 +219,11 @@ def sample(sample_id):
 @BLUEPRINT.route("/samples_in_customer_group/<sample_id>")
 def sample_in_customer_group(sample_id):
     """Fetch a single sample."""
-    sample_obj = db.sample(sample_id)
+    sample_obj = db.sample(sample_id, profile="sample_full")
     if sample_obj is None:
         return abort(404)
     elif not g.current_user.is_admin and (
-        g.current_user.customer.customer_group != sample_obj.customer.customer_group
+        g.current_user.customer_group_id != sample_obj.customer.customer_group_id
     ):
         return abort(401)
     data = sample_obj.to_dict(links=True, flowcells=True)
@@ -219,10 +235,9 @@ def microbial_orders():
     """Fetch microbial orders."""
     customer_obj = None if g.current_user.is_admin else g.current_user.customer
     orders_q = db.microbial_orders(enquiry=request.args.get("enquiry"), customer=customer_obj)
-    count = orders_q.count()
-    records = orders_q.limit(30)
-    data = [order_obj.to_dict(samples=True) for order_obj in records]
-    return jsonify(microbial_orders=data, total=count)
+    orders_q = projection.project(orders_q, models.MicrobialOrder)
+    rows, page = paginate(orders_q, models.MicrobialOrder.ordered_at, default_size=30)
+    return jsonify(microbial_orders=projection.microbial_orders(rows, samples=True), **page)
 
 
 @BLUEPRINT.route("/microbial_orders/<order_id>")
@@ -231,7 +246,7 @@ def microbial_order(order_id):
     order_obj = db.microbial_order(order_id)
     if order_obj is None:
         return abort(404)
-    elif not g.current_user.is_admin and (g.current_user.customer != order_obj.customer):
+    elif not g.current_user.is_admin and (g.current_user.customer_id != order_obj.customer_id):
         return abort(401)
     data = order_obj.to_dict(samples=True)
     return jsonify(**data)
@@ -242,9 +257,9 @@ def microbial_samples():
     """Fetch microbial samples."""
     customer_obj = None if g.current_user.is_admin else g.current_user.customer
     samples_q = db.microbial_samples(enquiry=request.args.get("enquiry"), customer=customer_obj)
-    limit = int(request.args.get("limit", 50))
-    data = [sample_obj.to_dict(order=True) for sample_obj in samples_q.limit(limit)]
-    return jsonify(samples=data, total=samples_q.count())
+    samples_q = projection.project(samples_q, models.MicrobialSample)
+    rows, page = paginate(samples_q, models.MicrobialSample.created_at, default_size=50)
+    return jsonify(samples=projection.microbial_samples(rows, order=True), **page)
 
 
 @BLUEPRINT.route("/microbial_samples/<sample_id>")
@@ -254,7 +269,7 @@ def microbial_sample(sample_id):
     if sample_obj is None:
         return abort(404)
     elif not g.current_user.is_admin and (
-        g.current_user.customer != sample_obj.microbial_order.customer
+        g.current_user.customer_id != sample_obj.microbial_order.customer_id
     ):
         return abort(401)
     data = sample_obj.to_dict()
@@ -266,8 +281,9 @@ def pools():
     """Fetch pools."""
     customer_obj = None if g.current_user.is_admin else g.current_user.customer
     pools_q = db.pools(customer=customer_obj, enquiry=request.args.get("enquiry"))
-    data = [pool_obj.to_dict() for pool_obj in pools_q.limit(30)]
-    return jsonify(pools=data, total=pools_q.count())
+    pools_q = projection.project(pools_q, models.Pool)
+    rows, page = paginate(pools_q, models.Pool.ordered_at, default_size=30)
+    return jsonify(pools=projection.plain(rows), **page)
 
 
 @BLUEPRINT.route("/pools/<pool_id>")
@@ -276,7 +292,7 @@ def pool(pool_id):
     record = db.pool(pool_id)
     if record is None:
         return abort(404)
-    elif not g.current_user.is_admin and (g.current_user.customer != record.customer):
+    elif not g.current_user.is_admin and (g.current_user.customer_id != record.customer_id):
         return abort(401)
     return jsonify(**record.to_dict())
 
@@ -285,8 +301,9 @@ def pool(pool_id):
 def flowcells():
     """Fetch flowcells."""
     query = db.flowcells(status=request.args.get("status"), enquiry=request.args.get("enquiry"))
-    data = [record.to_dict() for record in query.limit(50)]
-    return jsonify(flowcells=data, total=query.count())
+    query = projection.project(query, models.Flowcell)
+    rows, page = paginate(query, models.Flowcell.sequenced_at, default_size=50)
+    return jsonify(flowcells=projection.plain(rows), **page)
 
 
 @BLUEPRINT.route("/flowcells/<flowcell_id>")
@@ -307,8 +324,13 @@ def analyses():
         analyses_q = db.analyses_to_upload()
     else:
         analyses_q = db.Analysis.query
-    data = [analysis_obj.to_dict() for analysis_obj in analyses_q.limit(30)]
-    return jsonify(analyses=data, total=analyses_q.count())
+    # the delivery status joins the samples of the analyses
+    analyses_q = projection.project(analyses_q, models.Analysis).distinct()
+    if request.args.get("status") in ("delivery", "upload"):
+        rows, page = queue_page(analyses_q, default_size=30)
+    else:
+        rows, page = paginate(analyses_q, models.Analysis.created_at, default_size=30)
+    return jsonify(analyses=projection.analyses(rows), **page)
 
 
 @BLUEPRINT.route("/options")
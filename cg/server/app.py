@@ -3,7 +3,6 @@ from flask import Flask, redirect, url_for, session
 from flask_admin.base import AdminIndexView
 from flask_dance.contrib.google import make_google_blueprint, google
 from flask_dance.consumer import oauth_authorized
-import requests
 
 from cg.store import models
 from . import api, ext, admin, invoices
@@ -26,9 +25,9 @@ def _load_config(app):
 def _configure_extensions(app: Flask):
 
     _initialize_logging(app)
-    certs_resp = requests.get("https://www.googleapis.com/oauth2/v1/certs")
-    app.config["GOOGLE_OAUTH_CERTS"] = certs_resp.json()
 
+    ext.key_store.init_app(app)
+    ext.user_cache.init_app(app)
     ext.cors.init_app(app)
     ext.db.init_app(app)
     ext.lims.init_app(app)
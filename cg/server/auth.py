@@ -0,0 +1,246 @@
+"""Verify JSON Web Tokens with Google certificates cached on disk and cache the users"""
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import requests
+from google.auth import jwt
+
+from cg.store import models
+
+LOG = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+DEFAULT_MAX_AGE = 3600
+# seconds to wait before fetching again after a failed fetch
+RETRY_SECONDS = 60
+# seconds a request waits for the certificates when none have been fetched yet
+FIRST_FETCH_TIMEOUT = 10
+MAX_CACHED_TOKENS = 10000
+DEFAULT_USER_CACHE_SECONDS = 60
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+CERTS_CACHE_NAME = "google-certs.json"
+
+
+def max_age(headers: Mapping[str, str]) -> int:
+    """Return the seconds a response may be cached from its Cache-Control or Expires header."""
+    match = MAX_AGE_PATTERN.search(headers.get("Cache-Control", ""))
+    if match:
+        return int(match[1])
+    try:
+        expires_at = email.utils.parsedate_to_datetime(headers["Expires"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_MAX_AGE
+    return max(0, int(expires_at - time.time()))
+
+
+def writable_by_others(file_stat: os.stat_result) -> bool:
+    """Return whether a file belongs to another user or can be written by other users."""
+    return file_stat.st_uid != os.getuid() or bool(
+        file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    )
+
+
+def fetch_certs(url: str = GOOGLE_CERTS_URL) -> Tuple[Dict[str, str], int]:
+    """Fetch the certificates, return them with the seconds they may be cached."""
+    response = requests.get(url, timeout=FIRST_FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.json(), max_age(response.headers)
+
+
+class KeyStore:
+    """Certificates to verify JSON Web Tokens with and the tokens verified so far.
+
+    The certificates are cached in a file until they expire according to the HTTP cache headers
+    and are refreshed in a background thread, starting the app never waits for the network. The
+    cache file is only trusted when it belongs to the user of the server and nobody else can
+    write to it.
+    Expired certificates are used until the refresh is done, Google publishes new keys before it
+    signs with them. Decoded tokens are cached by their hash until the tokens expire.
+    """
+
+    def __init__(
+        self, fetch: Callable[[], Tuple[dict, int]] = fetch_certs, cache_path: str = None, app=None
+    ):
+        self.fetch = fetch
+        self.cache_path = cache_path
+        self._certs = {}
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache_path = app.config.get("GOOGLE_CERTS_CACHE")
+        if not self.cache_path:
+            os.makedirs(app.instance_path, mode=0o700, exist_ok=True)
+            self.cache_path = os.path.join(app.instance_path, CERTS_CACHE_NAME)
+        self.load()
+        if self.expired:
+            self.refresh_in_background()
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self._expires_at
+
+    def load(self):
+        """Read the cached certificates from disk, unless others could have written them."""
+        try:
+            with open(self.cache_path) as cache_file:
+                if writable_by_others(os.fstat(cache_file.fileno())):
+                    LOG.warning(
+                        "ignoring cached certificates writable by others: %s", self.cache_path
+                    )
+                    return
+                cached = json.load(cache_file)
+            self._certs, self._expires_at = cached["certs"], cached["expires_at"]
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            LOG.info("no cached certificates in %s: %s", self.cache_path, error)
+
+    def refresh(self):
+        """Fetch the certificates and write them to the cache file."""
+        certs, seconds = self.fetch()
+        self._certs, self._expires_at = certs, time.time() + seconds
+        if self.cache_path:
+            cache_dir = os.path.dirname(os.path.abspath(self.cache_path))
+            with tempfile.NamedTemporaryFile("w", dir=cache_dir, delete=False) as cache_file:
+                os.fchmod(cache_file.fileno(), stat.S_IRUSR | stat.S_IWUSR)
+                json.dump({"certs": certs, "expires_at": self._expires_at}, cache_file)
+            os.replace(cache_file.name, self.cache_path)
+
+    def _try_refresh(self):
+        try:
+            self.refresh()
+        except Exception as error:
+            LOG.warning("unable to refresh certificates: %s", error)
+            self._retry_at = time.time() + RETRY_SECONDS
+
+    def refresh_in_background(self) -> Optional[threading.Thread]:
+        """Start refreshing expired certificates unless a refresh is running or failed recently.
+
+        Returns the thread doing the refresh.
+        """
+        with self._lock:
+            refreshing = self._refresh_thread is not None and self._refresh_thread.is_alive()
+            if refreshing or not self.expired:
+                return self._refresh_thread
+            if time.time() < self._retry_at:
+                return None
+            self._refresh_thread = threading.Thread(target=self._try_refresh, daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def certs(self) -> Dict[str, str]:
+        """Return the certificates, wait for the first fetch if none are cached."""
+        if self.expired:
+            refresh_thread = self.refresh_in_background()
+            if not self._certs and refresh_thread is not None:
+                refresh_thread.join(FIRST_FETCH_TIMEOUT)
+        return self._certs
+
+    def decode(self, token: str) -> dict:
+        """Verify a token and return its claims, raise ValueError when it is not valid."""
+        key = hashlib.sha256(token.encode()).digest()
+        cached = self._tokens.get(key)
+        if cached is not None and time.time() < cached[0]:
+            return cached[1]
+        claims = jwt.decode(token, certs=self.certs())
+        if len(self._tokens) >= MAX_CACHED_TOKENS:
+            self._prune()
+        self._tokens[key] = (claims["exp"], claims)
+        return claims
+
+    def _prune(self):
+        """Drop the expired tokens, or all of them when none have expired."""
+        now = time.time()
+        tokens = {key: token for key, token in self._tokens.items() if now < token[0]}
+        self._tokens = tokens if len(tokens) < MAX_CACHED_TOKENS else {}
+
+
+class CurrentUser(NamedTuple):
+    """The user of a request, without a database session to expire with"""
+
+    id: int
+    name: str
+    email: str
+    is_admin: bool
+    customer_id: int
+    customer_group_id: int
+    data: dict
+
+    @classmethod
+    def from_user(cls, user_obj: models.User) -> "CurrentUser":
+        return cls(
+            id=user_obj.id,
+            name=user_obj.name,
+            email=user_obj.email,
+            is_admin=user_obj.is_admin,
+            customer_id=user_obj.customer_id,
+            customer_group_id=user_obj.customer.customer_group_id,
+            data=user_obj.to_dict(),
+        )
+
+    @property
+    def customer(self) -> models.Customer:
+        """Return the customer of the user from the session of the request."""
+        return models.Customer.query.get(self.customer_id)
+
+    def to_dict(self) -> dict:
+        return self.data
+
+
+class UserCache:
+    """Users of recent requests by email.
+
+    The users are kept for a short time since every process of the server has its own cache, the
+    admin views clear the cache of their process when users or customers are edited.
+    """
+
+    def __init__(self, seconds: int = DEFAULT_USER_CACHE_SECONDS, app=None):
+        self.seconds = seconds
+        self.hits = 0
+        self.misses = 0
+        self._users = {}
+        self._lock = threading.Lock()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.seconds = app.config["USER_CACHE_SECONDS"]
+
+    def get(
+        self, email: str, load: Callable[[str], Optional[models.User]]
+    ) -> Optional[CurrentUser]:
+        """Return a cached user, load users that are not cached or have expired."""
+        with self._lock:
+            cached = self._users.get(email)
+            if cached is not None and time.monotonic() < cached[0]:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        user_obj = load(email)
+        if user_obj is None:
+            return None
+        current_user = CurrentUser.from_user(user_obj)
+        with self._lock:
+            self._users[email] = (time.monotonic() + self.seconds, current_user)
+        return current_user
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> dict:
+        """Return the number of hits, misses and cached users."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._users)}
@@ -13,6 +13,10 @@ SQLALCHEMY_TRACK_MODIFICATIONS = "FLASK_DEBUG" in os.environ
 # server
 CG_ENABLE_ADMIN = ("FLASK_DEBUG" in os.environ) or (os.environ.get("CG_ENABLE_ADMIN") == "1")
 
+# api
+API_MAX_PAGE_SIZE = int(os.environ.get("CG_API_MAX_PAGE_SIZE", 500))
+API_COUNT_CACHE_SECONDS = int(os.environ.get("CG_API_COUNT_CACHE_SECONDS", 60))
+
 # lims
 LIMS_HOST = os.environ["LIMS_HOST"]
 LIMS_USERNAME = os.environ["LIMS_USERNAME"]
@@ -24,6 +28,9 @@ OSTICKET_DOMAIN = os.environ.get("OSTICKET_DOMAIN")
 # oauth
 GOOGLE_OAUTH_CLIENT_ID = os.environ["GOOGLE_OAUTH_CLIENT_ID"]
 GOOGLE_OAUTH_CLIENT_SECRET = os.environ["GOOGLE_OAUTH_CLIENT_SECRET"]
+# defaults to a file in the instance folder of the app
+GOOGLE_CERTS_CACHE = os.environ.get("CG_GOOGLE_CERTS_CACHE")
+USER_CACHE_SECONDS = int(os.environ.get("CG_USER_CACHE_SECONDS", 60))
 
 # invoice
 TOTAL_PRICE_TRESHOLD = 750000
@@ -5,6 +5,7 @@ from flask_cors import CORS
 from cg.apps.lims import LimsAPI
 from cg.apps.osticket import OsTicket
 from cg.store import models, api
+from .auth import KeyStore, UserCache
 
 
 class CgAlchy(Alchy, api.CoreHandler):
@@ -32,3 +33,5 @@ db = CgAlchy(Model=models.Model)
 admin = Admin(name="Clinical Genomics")
 lims = FlaskLims()
 osticket = OsTicket()
+key_store = KeyStore()
+user_cache = UserCache()
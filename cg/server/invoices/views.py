@@ -35,6 +35,8 @@ def undo_invoice(invoice_id):
     for record in records:
         record.invoice_id = None
     db.session.commit()
+    if record_type == "Sample":
+        db.refresh_samples_case_status(record.id for record in records)
 
     return url_for(".new", record_type=record_type)
 
@@ -99,6 +101,7 @@ def upload_invoice_news_to_db():
     if ki_excel_file:
         invoice_obj.excel_ki = ki_excel_file.stream.read()
     db.commit()
+    db.refresh_samples_case_status(sample_obj.id for sample_obj in invoice_obj.samples)
     return url_for("invoices.invoice", invoice_id=invoice_id)
 
 
@@ -0,0 +1,115 @@
+"""Keyset pagination of the list endpoints"""
+import base64
+import binascii
+import datetime as dt
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+CURSOR_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+DEFAULT_MAX_PAGE_SIZE = 500
+DEFAULT_COUNT_CACHE_SECONDS = 60
+COUNT_CACHE_SIZE = 1000
+
+# (statement, parameters) -> (time of the count, count)
+_COUNT_CACHE: Dict[Tuple[str, tuple], Tuple[float, int]] = {}
+# the requests of a threaded server share the cache
+_COUNT_CACHE_LOCK = threading.Lock()
+
+
+def encode_cursor(key_value: Optional[dt.datetime], record_id: int) -> str:
+    """Encode the position after a record as an opaque cursor."""
+    position = [key_value.strftime(CURSOR_DATE_FORMAT) if key_value else None, record_id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[dt.datetime], int]:
+    """Decode a cursor from encode_cursor, abort with 400 if it is invalid."""
+    try:
+        key_value, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key_value = dt.datetime.strptime(key_value, CURSOR_DATE_FORMAT) if key_value else None
+        return key_value, int(record_id)
+    except (binascii.Error, TypeError, ValueError):
+        return abort(400, f"invalid cursor: {cursor}")
+
+
+def page_size(default: int) -> int:
+    """Return the requested page size capped by the configured maximum."""
+    max_size = current_app.config.get("API_MAX_PAGE_SIZE", DEFAULT_MAX_PAGE_SIZE)
+    try:
+        size = int(request.args.get("limit", default))
+    except ValueError:
+        return abort(400, f"invalid limit: {request.args['limit']}")
+    return max(1, min(size, max_size))
+
+
+def cached_count(query: Query) -> int:
+    """Count the records of a query, reusing a recent count of the same query."""
+    compiled = query.statement.compile()
+    cache_key = (str(compiled), tuple(sorted(compiled.params.items())))
+    max_age = current_app.config.get("API_COUNT_CACHE_SECONDS", DEFAULT_COUNT_CACHE_SECONDS)
+    now = time.monotonic()
+    with _COUNT_CACHE_LOCK:
+        counted_at, count = _COUNT_CACHE.get(cache_key, (None, None))
+    if counted_at is None or now - counted_at > max_age:
+        count = query.count()
+        with _COUNT_CACHE_LOCK:
+            if len(_COUNT_CACHE) >= COUNT_CACHE_SIZE:
+                oldest_key = min(_COUNT_CACHE, key=lambda key: _COUNT_CACHE[key][0])
+                _COUNT_CACHE.pop(oldest_key, None)
+            _COUNT_CACHE[cache_key] = (now, count)
+    return count
+
+
+def queue_page(query: Query, default_size: int) -> Tuple[List, dict]:
+    """Fetch the first records of a work queue in the order of its query.
+
+    Queues are sorted on their own keys, like the priority and the date a sample was received,
+    and are not paged with cursors, the next cursor is always None. Returns the records together
+    with the total count of the queue.
+    """
+    records = query.limit(page_size(default_size)).all()
+    return records, dict(total=cached_count(query), next_cursor=None)
+
+
+def keyset_filter(key: InstrumentedAttribute, id_column: InstrumentedAttribute, cursor: str):
+    """Build the filter for the records after the cursor in descending (key, id) order.
+
+    Records with a NULL key come after all dated records, as they do in a descending sort in both
+    MySQL and sqlite.
+    """
+    key_value, record_id = decode_cursor(cursor)
+    if key_value is None:
+        return and_(key.is_(None), id_column < record_id)
+    return or_(key < key_value, and_(key == key_value, id_column < record_id), key.is_(None))
+
+
+def paginate(query: Query, key: InstrumentedAttribute, default_size: int) -> Tuple[List, dict]:
+    """Fetch one page of a query ordered by (key, id) descending.
+
+    The page starts after the record encoded in the "cursor" request argument. Returns the records
+    together with the total count of the query and the cursor of the next page, None on the last
+    page.
+    """
+    id_column = key.class_.id
+    size = page_size(default_size)
+    total = cached_count(query)
+
+    page_q = query.order_by(None).order_by(key.desc(), id_column.desc())
+    cursor = request.args.get("cursor")
+    if cursor:
+        page_q = page_q.filter(keyset_filter(key, id_column, cursor))
+    records = page_q.limit(size + 1).all()
+
+    next_cursor = None
+    if len(records) > size:
+        records = records[:size]
+        last = records[-1]
+        next_cursor = encode_cursor(getattr(last, key.key), last.id)
+    return records, dict(total=total, next_cursor=next_cursor)
@@ -0,0 +1,167 @@
+"""Serialize query results for the API straight from the selected columns.
+
+Each serializer returns the same dicts as the to_dict method of the model, but the rows are
+fetched as plain tuples and the related records with one query per relationship instead of
+building ORM objects and loading their relationships one by one.
+"""
+from typing import Dict, Iterable, List
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query
+
+from cg.constants import REV_PRIORITY_MAP
+from cg.store import models
+
+
+def columns(model) -> list:
+    """Return the column attributes of a model."""
+    return [getattr(model, column_attr.key) for column_attr in inspect(model).column_attrs]
+
+
+def project(query: Query, model) -> Query:
+    """Select only the columns of the model, the rows can be passed to the serializers."""
+    return query.with_entities(*columns(model))
+
+
+def _by_id(model, ids: set) -> Dict[int, dict]:
+    """Fetch the column values of the records with the given ids."""
+    if not ids:
+        return {}
+    query = project(model.query.filter(model.id.in_(ids)), model)
+    return {row.id: row._asdict() for row in query}
+
+
+def _add_customer(records: List[dict]):
+    customers = _by_id(models.Customer, {record["customer_id"] for record in records})
+    for record in records:
+        record["customer"] = customers[record["customer_id"]]
+
+
+def _add_priority(records: List[dict]):
+    for record in records:
+        record["priority"] = REV_PRIORITY_MAP[record["priority"]]
+
+
+def _add_application(records: List[dict]):
+    """Add the application version and application of (microbial) sample records."""
+    versions = _by_id(
+        models.ApplicationVersion, {record["application_version_id"] for record in records}
+    )
+    applications = _by_id(
+        models.Application, {version["application_id"] for version in versions.values()}
+    )
+    for version in versions.values():
+        version["application"] = applications[version["application_id"]]
+    for record in records:
+        version = versions[record["application_version_id"]]
+        record["application_version"] = version
+        record["application"] = version["application"]
+
+
+def _serialize_samples(records: List[dict]) -> List[dict]:
+    _add_priority(records)
+    _add_customer(records)
+    _add_application(records)
+    return records
+
+
+def _serialize_families(records: List[dict], links: bool) -> List[dict]:
+    for record in records:
+        panels = record.pop("_panels")
+        record["panels"] = panels.split(",") if panels else []
+    _add_priority(records)
+    _add_customer(records)
+    if not (links and records):
+        return records
+
+    links_q = models.FamilySample.query.filter(
+        models.FamilySample.family_id.in_({record["id"] for record in records})
+    ).order_by(models.FamilySample.id)
+    link_records = [row._asdict() for row in project(links_q, models.FamilySample)]
+    sample_ids = {
+        link[key] for link in link_records for key in ("sample_id", "mother_id", "father_id")
+    }
+    samples_by_id = _by_id(models.Sample, sample_ids - {None})
+    _serialize_samples(list(samples_by_id.values()))
+
+    family_links = {record["id"]: [] for record in records}
+    for link in link_records:
+        link["sample"] = samples_by_id[link["sample_id"]]
+        link["mother"] = samples_by_id.get(link["mother_id"])
+        link["father"] = samples_by_id.get(link["father_id"])
+        family_links[link["family_id"]].append(link)
+    for record in records:
+        record["links"] = family_links[record["id"]]
+    return records
+
+
+def _serialize_microbial_samples(records: List[dict], order: bool) -> List[dict]:
+    _add_application(records)
+    _add_priority(records)
+    if order:
+        orders = _by_id(models.MicrobialOrder, {record["microbial_order_id"] for record in records})
+        _add_customer(list(orders.values()))
+        for record in records:
+            record["microbial_order"] = orders[record["microbial_order_id"]]
+    invoices = _by_id(models.Invoice, {record["invoice_id"] for record in records} - {None})
+    organisms = _by_id(models.Organism, {record["organism_id"] for record in records} - {None})
+    for record in records:
+        if record["invoice_id"]:
+            record["invoice"] = invoices[record["invoice_id"]]
+        if record["organism_id"]:
+            record["organism"] = organisms[record["organism_id"]]
+    return records
+
+
+def _public(record: dict) -> dict:
+    """Leave out the private columns, like ModelBase.__to_dict__."""
+    return {key: value for key, value in record.items() if not key.startswith("_")}
+
+
+def plain(rows: Iterable) -> List[dict]:
+    """Serialize rows of models that add no related records, like pools and flowcells."""
+    return [_public(row._asdict()) for row in rows]
+
+
+def samples(rows: Iterable) -> List[dict]:
+    """Serialize sample rows like Sample.to_dict()."""
+    return _serialize_samples(plain(rows))
+
+
+def families(rows: Iterable, links: bool = False) -> List[dict]:
+    """Serialize family rows like Family.to_dict(links=links)."""
+    # the private panels column is needed to serialize the panels
+    return _serialize_families([row._asdict() for row in rows], links=links)
+
+
+def analyses(rows: Iterable) -> List[dict]:
+    """Serialize analysis rows like Analysis.to_dict()."""
+    records = plain(rows)
+    families_by_id = _by_id(models.Family, {record["family_id"] for record in records})
+    _serialize_families(list(families_by_id.values()), links=False)
+    for record in records:
+        record["family"] = families_by_id[record["family_id"]]
+    return records
+
+
+def microbial_samples(rows: Iterable, order: bool = False) -> List[dict]:
+    """Serialize microbial sample rows like MicrobialSample.to_dict(order=order)."""
+    return _serialize_microbial_samples(plain(rows), order=order)
+
+
+def microbial_orders(rows: Iterable, samples: bool = False) -> List[dict]:
+    """Serialize microbial order rows like MicrobialOrder.to_dict(samples=samples)."""
+    records = plain(rows)
+    _add_customer(records)
+    if not (samples and records):
+        return records
+
+    samples_q = models.MicrobialSample.query.filter(
+        models.MicrobialSample.microbial_order_id.in_({record["id"] for record in records})
+    ).order_by(models.MicrobialSample.delivered_at.desc())
+    order_samples = {record["id"]: [] for record in records}
+    for sample in microbial_samples(project(samples_q, models.MicrobialSample)):
+        order_samples[sample["microbial_order_id"]].append(sample)
+    for record in records:
+        record["microbial_samples"] = order_samples[record["id"]]
+    return records
@@ -141,22 +141,39 @@ class AddHandler(BaseHandler):
         )
         return new_sample
 
-    def add_family(self, name: str, panels: List[str], priority: str = "standard") -> models.Family:
+    def add_family(
+        self, name: str, panels: List[str], priority: str = "standard", internal_id: str = None
+    ) -> models.Family:
         """Build a new Family record."""
 
         # generate a unique family id
-        while True:
+        while internal_id is None:
             internal_id = petname.Generate(2, separator="")
-            if self.family(internal_id) is None:
-                break
-            else:
+            if self.family(internal_id) is not None:
                 LOG.debug(f"{internal_id} already used - trying another id")
+                internal_id = None
 
         priority_db = PRIORITY_MAP[priority]
         new_family = self.Family(internal_id=internal_id, name=name, priority=priority_db)
         new_family.panels = panels
         return new_family
 
+    def new_family_ids(self, count: int) -> List[str]:
+        """Generate unique ids for new families, checking a batch of ids per query."""
+        internal_ids = set()
+        while len(internal_ids) < count:
+            candidates = {
+                petname.Generate(2, separator="") for _ in range(count - len(internal_ids))
+            } - internal_ids
+            used = {
+                record.internal_id
+                for record in self.Family.query.filter(models.Family.internal_id.in_(candidates))
+            }
+            for internal_id in used:
+                LOG.debug(f"{internal_id} already used - trying another id")
+            internal_ids.update(candidates - used)
+        return list(internal_ids)
+
     def relate_sample(
         self,
         family: models.Family,
@@ -363,3 +380,17 @@ class AddHandler(BaseHandler):
             **kwargs,
         )
         return new_organism
+
+    def add_fastq_header(self, path: str, size: int, mtime: int, **header) -> models.FastqHeader:
+        """Build a new FastqHeader record."""
+
+        new_header = self.FastqHeader(
+            path_hash=self.FastqHeader.hash_path(path), path=path, size=size, mtime=mtime, **header
+        )
+        return new_header
+
+    def add_transfer_mark(self, name: str, marked_at: dt.datetime) -> models.TransferMark:
+        """Build a new TransferMark record."""
+
+        new_mark = self.TransferMark(name=name, marked_at=marked_at)
+        return new_mark
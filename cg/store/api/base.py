@@ -14,7 +14,9 @@ class BaseHandler:
     CustomerGroup = models.CustomerGroup
     Sample = models.Sample
     Family = models.Family
+    CaseStatus = models.CaseStatus
     FamilySample = models.FamilySample
+    FastqHeader = models.FastqHeader
     Flowcell = models.Flowcell
     Analysis = models.Analysis
     Application = models.Application
@@ -26,3 +28,4 @@ class BaseHandler:
     MicrobialSample = models.MicrobialSample
     MicrobialOrder = models.MicrobialOrder
     Organism = models.Organism
+    TransferMark = models.TransferMark
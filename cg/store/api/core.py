@@ -6,7 +6,10 @@ from cg.store.api.findbusinessdata import FindBusinessDataHandler
 from cg.store.api.reset import ResetHandler
 
 from .add import AddHandler
+from .explain import ExplainHandler
+from .export import ExportHandler
 from .findbasicdata import FindBasicDataHandler
+from .loaders import LoaderHandler
 from .status import StatusHandler
 from .trends import TrendsHandler
 
@@ -15,8 +18,11 @@ LOG = logging.getLogger(__name__)
 
 class CoreHandler(
     AddHandler,
+    ExplainHandler,
+    ExportHandler,
     FindBasicDataHandler,
     FindBusinessDataHandler,
+    LoaderHandler,
     ResetHandler,
     StatusHandler,
     TrendsHandler,
@@ -29,4 +35,11 @@ class CoreHandler(
 class Store(alchy.Manager, CoreHandler):
     def __init__(self, uri):
         self.uri = uri
-        super(Store, self).__init__(config=dict(SQLALCHEMY_DATABASE_URI=uri), Model=models.Model)
+        # a session class of its own keeps the listeners of the store off other alchy sessions
+        session_class = type("StoreSession", (alchy.Session,), {})
+        super(Store, self).__init__(
+            config=dict(SQLALCHEMY_DATABASE_URI=uri),
+            Model=models.Model,
+            session_class=session_class,
+        )
+        self.track_case_status(session_class)
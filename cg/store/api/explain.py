@@ -0,0 +1,38 @@
+"""Inspect how the database executes the store queries"""
+import re
+from typing import List
+
+from sqlalchemy.orm import Query
+
+from cg.store import models
+
+from .base import BaseHandler
+
+# e.g. "SCAN TABLE sample", "SCAN sample AS sample_1" but not "SCAN sample USING INDEX ..."
+SQLITE_TABLE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+class ExplainHandler(BaseHandler):
+    """Explain the query plans of the database"""
+
+    def full_scans(self, query: Query) -> List[str]:
+        """Return the tables that a query reads with a full table scan.
+
+        The plan depends on the data so this is only meaningful on a production sized database.
+        """
+        compiled = query.statement.compile(dialect=self.engine.dialect)
+        params = compiled.construct_params()
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        connection = self.session.connection()
+
+        if self.engine.name == "sqlite":
+            rows = connection.execute(f"EXPLAIN QUERY PLAN {compiled}", params)
+            matches = (SQLITE_TABLE_SCAN.match(row.detail) for row in rows)
+            tables = [match.group(1) for match in matches if match]
+        else:
+            rows = connection.execute(f"EXPLAIN {compiled}", params)
+            tables = [row.table for row in rows if row.type == "ALL"]
+
+        # derived tables and subqueries are scanned by definition
+        return [table for table in tables if table in models.Model.metadata.tables]
@@ -0,0 +1,119 @@
+"""Stream whole tables out of the database"""
+import datetime as dt
+import re
+from typing import Dict, Iterator, List, Tuple
+
+from dateutil.parser import parse as parse_date
+from sqlalchemy import Column, inspect
+from sqlalchemy.orm import Query
+
+from cg.exc import CgError
+from cg.store import models
+
+from .base import BaseHandler
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_TABLES = {
+    "analyses": models.Analysis,
+    "applications": models.Application,
+    "application_versions": models.ApplicationVersion,
+    "customers": models.Customer,
+    "deliveries": models.Delivery,
+    "families": models.Family,
+    "family_samples": models.FamilySample,
+    "flowcells": models.Flowcell,
+    "invoices": models.Invoice,
+    "microbial_orders": models.MicrobialOrder,
+    "microbial_samples": models.MicrobialSample,
+    "pools": models.Pool,
+    "samples": models.Sample,
+}
+# e.g. "received_at>=2020-01-01", "customer_id=1", "priority!=0"
+FILTER_PATTERN = re.compile(r"^(\w+)(=|!=|>=|<=|>|<)(.*)$")
+FILTER_OPERATORS = {
+    "=": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    ">=": lambda column, value: column >= value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    "<": lambda column, value: column < value,
+}
+
+
+def _python_type(column) -> type:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return str
+
+
+def _filter_value(column, value: str):
+    """Convert a filter value to the type of the column, an empty value means NULL."""
+    if value == "":
+        return None
+    python_type = _python_type(column)
+    try:
+        if python_type is bool:
+            return value.lower() in ("1", "true", "yes")
+        if python_type is dt.datetime:
+            return parse_date(value)
+        if python_type is dt.date:
+            return parse_date(value).date()
+        return python_type(value)
+    except ValueError as error:
+        raise CgError(f"{column.name}: invalid value {value}: {error}")
+
+
+class ExportHandler(BaseHandler):
+    """Export tables in bulk"""
+
+    @staticmethod
+    def export_columns(table: str) -> Dict[str, Column]:
+        """Return the columns of an exported table by name."""
+        if table not in EXPORT_TABLES:
+            raise CgError(f"{table}: not an exported table, use one of {', '.join(EXPORT_TABLES)}")
+        return {column.name: column for column in inspect(EXPORT_TABLES[table]).columns}
+
+    def export_query(
+        self, table: str, columns: List[str] = None, filters: List[str] = None
+    ) -> Query:
+        """Build the query of the exported columns of a table, filtered in the database.
+
+        Filters are strings like "received_at>=2020-01-01", all filters have to match. Without
+        columns all the columns of the table are exported.
+        """
+        table_columns = self.export_columns(table)
+        if columns:
+            unknown = [name for name in columns if name not in table_columns]
+            if unknown:
+                raise CgError(f"{table}: unknown columns {', '.join(unknown)}")
+            selected = [table_columns[name] for name in columns]
+        else:
+            selected = list(table_columns.values())
+
+        query = self.session.query(*selected)
+        for expression in filters or []:
+            match = FILTER_PATTERN.match(expression)
+            if match is None or match[1] not in table_columns:
+                raise CgError(f"{table}: invalid filter {expression}")
+            column = table_columns[match[1]]
+            query = query.filter(
+                FILTER_OPERATORS[match[2]](column, _filter_value(column, match[3]))
+            )
+        return query.order_by(table_columns["id"])
+
+    def export_rows(
+        self,
+        table: str,
+        columns: List[str] = None,
+        filters: List[str] = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+    ) -> Tuple[List[Column], Iterator[tuple]]:
+        """Return the exported columns and stream the rows from a server side cursor.
+
+        The rows are fetched a batch at a time so the memory use does not depend on the size of
+        the table.
+        """
+        query = self.export_query(table, columns=columns, filters=filters)
+        selected = [description["expr"] for description in query.column_descriptions]
+        return selected, iter(query.yield_per(batch_size))
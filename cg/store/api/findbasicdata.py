@@ -1,8 +1,9 @@
 """Handler to find basic data objects"""
 import datetime as dt
-from typing import List
+from typing import Dict, List
 
 from sqlalchemy import desc
+from sqlalchemy.orm import contains_eager
 
 from cg.store.api.base import BaseHandler
 from cg.store import models
@@ -80,6 +81,25 @@ class FindBasicDataHandler(BaseHandler):
 
         return records.first()
 
+    def current_application_versions(self, tags: List[str]) -> Dict[str, models.ApplicationVersion]:
+        """Fetch the current application versions for application tags in one query.
+
+        Tags without a current version are left out.
+        """
+        records = (
+            self.ApplicationVersion.query.join(models.ApplicationVersion.application)
+            .options(contains_eager(models.ApplicationVersion.application))
+            .filter(
+                models.Application.tag.in_(set(tags)),
+                self.ApplicationVersion.valid_from < dt.datetime.now(),
+            )
+            .order_by(desc(self.ApplicationVersion.valid_from))
+        )
+        versions = {}
+        for record in records:
+            versions.setdefault(record.application.tag, record)
+        return versions
+
     def latest_version(self, tag: str) -> models.ApplicationVersion:
         """Fetch the latest application version for an application tag."""
         application_obj = self.Application.query.filter_by(tag=tag).first()
@@ -103,6 +123,22 @@ class FindBasicDataHandler(BaseHandler):
         """Returns all panels."""
         return self.Panel.query.order_by(models.Panel.abbrev)
 
+    def fastq_headers(self, paths: List[str], lock: bool = False) -> Dict[str, models.FastqHeader]:
+        """Fetch the indexed headers of FASTQ files by path.
+
+        With lock the records are locked for update, which also reads the records that other
+        transactions committed after this one started.
+        """
+        path_hashes = [self.FastqHeader.hash_path(path) for path in paths]
+        records = self.FastqHeader.query.filter(self.FastqHeader.path_hash.in_(path_hashes))
+        if lock:
+            records = records.with_for_update()
+        return {record.path: record for record in records}
+
+    def transfer_mark(self, name: str) -> models.TransferMark:
+        """Fetch the mark of how far a LIMS transfer has come."""
+        return self.TransferMark.query.filter_by(name=name).first()
+
     def user(self, email: str) -> models.User:
         """Fetch a user from the store."""
         return self.User.query.filter_by(email=email).first()
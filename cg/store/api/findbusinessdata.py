@@ -1,15 +1,15 @@
 """Handler to find business data objects"""
 import datetime as dt
-from typing import List
+from typing import Dict, List, Tuple, Union
 
 from sqlalchemy import and_, func, or_
-from sqlalchemy.orm import Query
+from sqlalchemy.orm import Query, contains_eager
 
 from cg.store import models
-from cg.store.api.base import BaseHandler
+from cg.store.api.loaders import LoaderHandler
 
 
-class FindBusinessDataHandler(BaseHandler):
+class FindBusinessDataHandler(LoaderHandler):
     """Contains methods to find business data model instances"""
 
     def analyses(self, *, family: models.Family = None, before: dt.datetime = None) -> Query:
@@ -112,14 +112,16 @@ class FindBusinessDataHandler(BaseHandler):
 
         return records.order_by(models.Family.created_at.desc())
 
-    def family(self, internal_id: str) -> models.Family:
+    def family(self, internal_id: str, profile: str = None) -> models.Family:
         """Fetch a family by internal id from the database."""
-        return self.Family.query.filter_by(internal_id=internal_id).first()
+        records = self.with_profile(self.Family.query, profile)
+        return records.filter_by(internal_id=internal_id).first()
 
-    def family_samples(self, family_id: str) -> List[models.FamilySample]:
+    def family_samples(self, family_id: str, profile: str = None) -> List[models.FamilySample]:
         """Find the samples of a family."""
+        records = self.with_profile(self.FamilySample.query, profile)
         return (
-            self.FamilySample.query.join(models.FamilySample.family, models.FamilySample.sample)
+            records.join(models.FamilySample.family, models.FamilySample.sample)
             .filter(models.Family.internal_id == family_id)
             .all()
         )
@@ -128,6 +130,29 @@ class FindBusinessDataHandler(BaseHandler):
         """Find a family by family name within a customer."""
         return self.Family.query.filter_by(customer=customer, name=name).first()
 
+    def find_families(
+        self, customer: models.Customer, names: List[str]
+    ) -> Dict[str, models.Family]:
+        """Find families by family name within a customer."""
+        records = self.Family.query.filter(
+            models.Family.customer == customer, models.Family.name.in_(names)
+        )
+        return {record.name: record for record in records}
+
+    def family_links(self, family_ids: List[str]) -> Dict[Tuple[str, str], models.FamilySample]:
+        """Fetch the links of families by family and sample internal id."""
+        records = (
+            self.FamilySample.query.join(models.FamilySample.family, models.FamilySample.sample)
+            .options(
+                contains_eager(models.FamilySample.family),
+                contains_eager(models.FamilySample.sample),
+            )
+            .filter(models.Family.internal_id.in_(family_ids))
+        )
+        return {
+            (record.family.internal_id, record.sample.internal_id): record for record in records
+        }
+
     def find_sample(self, customer: models.Customer, name: str) -> List[models.Sample]:
         """Find samples within a customer."""
         return self.Sample.query.filter_by(customer=customer, name=name)
@@ -263,9 +288,34 @@ class FindBusinessDataHandler(BaseHandler):
         """Fetch a pool."""
         return self.Pool.get(pool_id)
 
-    def sample(self, internal_id: str) -> models.Sample:
+    def sample(self, internal_id: str, profile: str = None) -> models.Sample:
         """Fetch a sample by lims id."""
-        return self.Sample.query.filter_by(internal_id=internal_id).first()
+        records = self.with_profile(self.Sample.query, profile)
+        return records.filter_by(internal_id=internal_id).first()
+
+    def find_samples(
+        self, internal_ids: List[str], profile: str = None
+    ) -> Dict[str, models.Sample]:
+        """Find samples by lims id, microbial samples are not included."""
+        records = self.with_profile(self.Sample.query, profile)
+        records = records.filter(models.Sample.internal_id.in_(internal_ids))
+        return {record.internal_id: record for record in records}
+
+    def samples_by_internal_id(
+        self, internal_ids: List[str]
+    ) -> Dict[str, Union[models.Sample, models.MicrobialSample]]:
+        """Fetch samples, or microbial samples, by lims id with their applications.
+
+        Uses one query for the samples and one for the ids that are not samples.
+        """
+        records = self.find_samples(internal_ids, profile="sample_with_app")
+        missing_ids = set(internal_ids) - set(records)
+        if missing_ids:
+            microbial_q = self.with_profile(
+                self.MicrobialSample.query, "microbial_sample_with_app"
+            ).filter(models.MicrobialSample.internal_id.in_(missing_ids))
+            records.update((sample_obj.internal_id, sample_obj) for sample_obj in microbial_q)
+        return records
 
     def samples(
         self, *, customer: models.Customer = None, enquiry: str = None
@@ -0,0 +1,77 @@
+"""Named eager loading profiles for the store queries"""
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.strategy_options import Load
+
+from cg.store import models
+
+from .base import BaseHandler
+
+
+def _sample_with_app(path: Load) -> Tuple[Load, ...]:
+    """Load the customer and the application (version) of the sample(s) at the end of path."""
+    return (
+        path.joinedload(models.Sample.customer),
+        path.joinedload(models.Sample.application_version).joinedload(
+            models.ApplicationVersion.application
+        ),
+    )
+
+
+def _case_with_samples(path: Load) -> Tuple[Load, ...]:
+    """Load the customer and samples of the case(s) at the end of path."""
+    return (
+        path.joinedload(models.Family.customer),
+        *_sample_with_app(
+            path.selectinload(models.Family.links).joinedload(models.FamilySample.sample)
+        ),
+    )
+
+
+def _sample_full(path: Load) -> Tuple[Load, ...]:
+    """Load the application, families and flowcells of the sample(s) at the end of path."""
+    return (
+        *_sample_with_app(path),
+        path.selectinload(models.Sample.links)
+        .joinedload(models.FamilySample.family)
+        .joinedload(models.Family.customer),
+        path.selectinload(models.Sample.flowcells),
+    )
+
+
+# the options are built on use since the backref relationships exist only once the mappers are
+# configured
+LOADER_PROFILES: Dict[str, Callable[[], Tuple[Load, ...]]] = {
+    "case_with_samples": lambda: _case_with_samples(Load(models.Family)),
+    "case_full": lambda: (
+        *_case_with_samples(Load(models.Family)),
+        Load(models.Family).selectinload(models.Family.analyses),
+    ),
+    "sample_with_app": lambda: _sample_with_app(Load(models.Sample)),
+    "sample_full": lambda: _sample_full(Load(models.Sample)),
+    "microbial_sample_with_app": lambda: (
+        Load(models.MicrobialSample)
+        .joinedload(models.MicrobialSample.application_version)
+        .joinedload(models.ApplicationVersion.application),
+    ),
+    "link_with_sample": lambda: _sample_with_app(
+        Load(models.FamilySample).joinedload(models.FamilySample.sample)
+    ),
+    "analysis_with_case": lambda: (
+        Load(models.Analysis).joinedload(models.Analysis.family).joinedload(models.Family.customer),
+    ),
+}
+
+
+class LoaderHandler(BaseHandler):
+    """Apply named eager loading profiles to queries"""
+
+    @staticmethod
+    def with_profile(query: Query, profile: str = None) -> Query:
+        """Eagerly load the relationships of a named loader profile when the query is run."""
+        if profile is None:
+            return query
+        if profile not in LOADER_PROFILES:
+            raise ValueError(f"unknown loader profile: {profile}")
+        return query.options(*LOADER_PROFILES[profile]())
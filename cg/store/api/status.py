@@ -1,11 +1,44 @@
+import itertools
+import json
 from datetime import datetime, timedelta
-from typing import List
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
 from cg.constants import PRIORITY_MAP
 from cg.store import models
 from cg.store.api.base import BaseHandler
-from sqlalchemy import or_, and_, func
-from sqlalchemy.orm import Query
+from sqlalchemy import or_, and_, case, event, func, inspect, not_
+from sqlalchemy.orm import Query, Session, aliased
+
+# cases summarized per query when refreshing the case status table
+CASE_STATUS_BATCH_SIZE = 500
+CASE_STATUS_COUNTS = [
+    "total_samples",
+    "total_external_samples",
+    "samples_received",
+    "samples_prepared",
+    "samples_sequenced",
+    "samples_delivered",
+    "samples_invoiced",
+    "samples_to_invoice",
+    "max_tat",
+    "flowcells",
+    "flowcells_on_disk",
+]
+CASE_STATUS_DATES = [
+    "samples_received_at",
+    "samples_prepared_at",
+    "samples_sequenced_at",
+    "samples_delivered_at",
+    "samples_invoiced_at",
+]
+# keys of the session info with the cases and samples changed in the transaction
+CHANGED_FAMILY_IDS = "case_status_family_ids"
+CHANGED_SAMPLE_IDS = "case_status_sample_ids"
+
+
+def _batches(values: list, size: int = CASE_STATUS_BATCH_SIZE) -> Iterable[list]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
 
 
 class StatusHandler(BaseHandler):
@@ -61,58 +94,64 @@ class StatusHandler(BaseHandler):
 
     def cases_to_mip_analyze(self, limit: int = 50):
         """Fetch families without analyses where all samples are sequenced."""
-
-        families_q = (
-            self.Family.query.outerjoin(models.Analysis)
-            .join(models.Family.links, models.FamilySample.sample)
-            .filter(or_(models.Sample.is_external, models.Sample.sequenced_at.isnot(None)))
-            .filter(
-                or_(
-                    models.Sample.data_analysis.is_(None), models.Sample.data_analysis != "Balsamic"
-                )
-            )
-            .filter(
-                or_(
-                    models.Family.action == "analyze",
-                    and_(models.Family.action.is_(None), models.Analysis.created_at.is_(None)),
+        families_q = self._cases_to_analyze().filter(
+            models.Family.links.any(
+                models.FamilySample.sample.has(
+                    or_(
+                        models.Sample.data_analysis.is_(None),
+                        models.Sample.data_analysis != "Balsamic",
+                    )
                 )
             )
-            .order_by(models.Family.priority.desc(), models.Family.ordered_at)
         )
 
-        families = [
-            record for record in families_q if self._all_samples_have_sequence_data(record.links)
-        ]
-
-        return families[:limit]
+        return families_q.limit(limit).all()
 
     def cases_to_balsamic_analyze(self, limit: int = 50):
         """Fetch families without analyses where all samples are sequenced."""
 
-        # there are two cases when a sample should be analysed:
+        # The data_analysis is includes Balsamic
+        families_q = self._cases_to_analyze().filter(
+            models.Family.links.any(
+                models.FamilySample.sample.has(models.Sample.data_analysis.ilike("%Balsamic%"))
+            )
+        )
+
+        return families_q.limit(limit).all()
+
+    def _cases_to_analyze(self) -> Query:
+        """Fetch families to analyse where all samples are sequenced, in order of priority."""
+
+        # there are two cases when a family should be analysed:
+        # 1. family that has been analysed but now is requested for re-analysing
+        # 2. new family that hasn't been analysed yet
+        # the samples must be external or be sequenced to be analysed
         families_q = (
-            self.Family.query.outerjoin(models.Analysis)
-            .join(models.Family.links, models.FamilySample.sample)
-            # the samples must external or be sequenced to be analysed
-            .filter(or_(models.Sample.is_external, models.Sample.sequenced_at.isnot(None)))
-            # The data_analysis is includes Balsamic
-            .filter(models.Sample.data_analysis.ilike("%Balsamic%"))
-            # 1. family that has been analysed but now is requested for re-analysing
-            # 2. new family that hasn't been analysed yet
-            .filter(
+            self.Family.query.filter(
                 or_(
                     models.Family.action == "analyze",
-                    and_(models.Family.action.is_(None), models.Analysis.created_at.is_(None)),
+                    and_(models.Family.action.is_(None), not_(models.Family.analyses.any())),
+                )
+            )
+            .filter(
+                not_(
+                    models.Family.links.any(
+                        models.FamilySample.sample.has(
+                            and_(
+                                models.Sample.sequenced_at.is_(None),
+                                or_(
+                                    models.Sample.is_external.is_(None),
+                                    models.Sample.is_external.is_(False),
+                                ),
+                            )
+                        )
+                    )
                 )
             )
             .order_by(models.Family.priority.desc(), models.Family.ordered_at)
         )
 
-        families = [
-            record for record in families_q if self._all_samples_have_sequence_data(record.links)
-        ]
-
-        return families[:limit]
+        return families_q
 
     def cases(
         self,
@@ -145,6 +184,112 @@ class StatusHandler(BaseHandler):
         exclude_invoiced=False,
     ):
         """Fetch cases with and w/o analyses"""
+        families_q = self._filter_cases(
+            internal_id=internal_id,
+            name=name,
+            days=days,
+            case_action=case_action,
+            priority=priority,
+            customer_id=customer_id,
+            exclude_customer_id=exclude_customer_id,
+            data_analysis=data_analysis,
+            sample_id=sample_id,
+        )
+        only = {
+            "received": only_received,
+            "prepared": only_prepared,
+            "sequenced": only_sequenced,
+            "analysed": only_analysed,
+            "uploaded": only_uploaded,
+            "delivered": only_delivered,
+            "delivery_reported": only_delivery_reported,
+            "invoiced": only_invoiced,
+        }
+        exclude = {
+            "received": exclude_received,
+            "prepared": exclude_prepared,
+            "sequenced": exclude_sequenced,
+            "analysed": exclude_analysed,
+            "uploaded": exclude_uploaded,
+            "delivered": exclude_delivered,
+            "delivery_reported": exclude_delivery_reported,
+            "invoiced": exclude_invoiced,
+        }
+        # sorted here, ordering by id in the query would keep it from using the family filters
+        rows = sorted(
+            self._case_status_query(families_q, only=only, exclude=exclude), key=lambda row: row.id
+        )
+        # the values of the samples of cases that are not summarized are fetched separately
+        aggregated_ids = [row.id for row in rows if row.aggregated_id is not None]
+        sample_values = self._cases_sample_values(aggregated_ids) if aggregated_ids else {}
+        cases = []
+
+        for row in rows:
+
+            analysis_status = None
+            analysis_completion = None
+
+            if progress_tracker:
+                for analysis_obj in progress_tracker.get_latest_logged_analysis(
+                    case_id=row.internal_id
+                ):
+
+                    if not analysis_status:
+                        analysis_completion = round(analysis_obj.progress * 100)
+                        analysis_status = analysis_obj.status
+
+            # filter on a status
+            if progress_status and progress_status != analysis_status:
+                continue
+
+            if row.aggregated_id is not None:
+                data_analyses, flowcell_statuses = sample_values.get(row.id, (set(), set()))
+                data_analyses = sorted(data_analyses, key=str)
+                flowcell_statuses = sorted(flowcell_statuses)
+            else:
+                data_analyses = json.loads(row.data_analyses) if row.data_analyses else []
+                flowcell_statuses = (
+                    row.flowcell_statuses.split(",") if row.flowcell_statuses else []
+                )
+            cases.append(
+                self._case_progress_record(
+                    row, data_analyses, flowcell_statuses, analysis_status, analysis_completion
+                )
+            )
+
+        cases_sorted = sorted(cases, key=lambda k: k["tat"], reverse=True)
+
+        return cases_sorted
+
+    def _case_status_query(
+        self, families_q: Query, only: Dict[str, bool] = None, exclude: Dict[str, bool] = None,
+    ) -> Query:
+        """Build the query of cases() for the progress of the cases, one row per case.
+
+        only and exclude name the progress steps that the cases must, or must not, have completed.
+        """
+        only, exclude = only or {}, exclude or {}
+        progress_q, completed = self._case_status_progress(families_q)
+        for step, is_completed in completed.items():
+            if only.get(step):
+                progress_q = progress_q.filter(is_completed)
+            if exclude.get(step):
+                progress_q = progress_q.filter(not_(is_completed))
+        return progress_q
+
+    def _filter_cases(
+        self,
+        internal_id=None,
+        name=None,
+        days=0,
+        case_action=None,
+        priority=None,
+        customer_id=None,
+        exclude_customer_id=None,
+        data_analysis=None,
+        sample_id=None,
+    ) -> Query:
+        """Fetch cases filtered on case, customer and sample properties"""
         families_q = self.Family.query
 
         # family filters
@@ -175,364 +320,534 @@ class StatusHandler(BaseHandler):
             if exclude_customer_id:
                 families_q = families_q.filter(models.Customer.internal_id != exclude_customer_id)
 
-        # sample filters
-        if data_analysis or sample_id:
-            families_q = families_q.join(models.Family.links, models.FamilySample.sample)
-            if data_analysis:
-                families_q = families_q.filter(
-                    models.Sample.data_analysis.like("%" + data_analysis + "%")
-                )
-            if sample_id:
-                families_q = families_q.filter(models.Sample.internal_id.like(sample_id))
-
-        else:
-            families_q = families_q.outerjoin(models.Family.links, models.FamilySample.sample)
-
-        # other joins
-        families_q = families_q.outerjoin(
-            models.Family.analyses, models.Sample.invoice, models.Sample.flowcells
-        )
-
-        cases = []
-
-        for record in families_q:
-
-            samples_received = None
-            samples_prepared = None
-            samples_sequenced = None
-            samples_delivered = None
-            samples_invoiced = None
-            samples_received_at = None
-            samples_prepared_at = None
-            samples_sequenced_at = None
-            samples_delivered_at = None
-            samples_invoiced_at = None
-            samples_to_receive = None
-            samples_to_prepare = None
-            samples_to_sequence = None
-            samples_to_deliver = None
-            samples_to_invoice = None
-            samples_received_bool = None
-            samples_prepared_bool = None
-            samples_sequenced_bool = None
-            samples_invoiced_bool = None
-            analysis_completed_at = None
-            analysis_uploaded_at = None
-            analysis_delivery_reported_at = None
-            analysis_pipeline = None
-            analysis_status = None
-            analysis_completion = None
-            analysis_completed_bool = None
-            analysis_uploaded_bool = None
-            samples_delivered_bool = None
-            analysis_delivery_reported_bool = None
-            samples_data_analyses = None
-            flowcells_status = None
-            flowcells_on_disk = None
-            flowcells_on_disk_bool = None
-            tat = None
-            is_rerun = False
-
-            analysis_in_progress = record.action is not None
-            case_action = record.action
-
-            total_samples = len(record.links)
-            total_external_samples = len(
-                [
-                    link.sample.application_version.application.is_external
-                    for link in record.links
-                    if link.sample.application_version.application.is_external
-                ]
-            )
-            total_internal_samples = total_samples - total_external_samples
-            case_external_bool = total_external_samples == total_samples
-
-            if total_samples > 0:
-                samples_received = len(
-                    [
-                        link.sample.received_at
-                        for link in record.links
-                        if link.sample.received_at is not None
-                    ]
-                )
-                samples_prepared = len(
-                    [
-                        link.sample.prepared_at
-                        for link in record.links
-                        if link.sample.prepared_at is not None
-                    ]
-                )
-                samples_sequenced = len(
-                    [
-                        link.sample.sequenced_at
-                        for link in record.links
-                        if link.sample.sequenced_at is not None
-                    ]
-                )
-                samples_delivered = len(
-                    [
-                        link.sample.delivered_at
-                        for link in record.links
-                        if link.sample.delivered_at is not None
-                    ]
-                )
-                samples_invoiced = len(
-                    [
-                        link.sample.invoice.invoiced_at
-                        for link in record.links
-                        if link.sample.invoice and link.sample.invoice.invoiced_at
-                    ]
-                )
-
-                samples_to_receive = total_internal_samples
-                samples_to_prepare = total_internal_samples
-                samples_to_sequence = total_internal_samples
-                samples_to_deliver = total_internal_samples
-                samples_to_invoice = total_samples - len(
-                    [link.sample.no_invoice for link in record.links if link.sample.no_invoice]
-                )
-
-                samples_received_bool = samples_received == samples_to_receive
-                samples_prepared_bool = samples_prepared == samples_to_prepare
-                samples_sequenced_bool = samples_sequenced == samples_to_sequence
-                samples_delivered_bool = samples_delivered == samples_to_deliver
-                samples_invoiced_bool = samples_invoiced == samples_to_invoice
-                samples_data_analyses = list(
-                    set(link.sample.data_analysis for link in record.links)
-                )
-
-                if samples_to_receive > 0 and samples_received_bool:
-                    samples_received_at = max(
-                        [
-                            link.sample.received_at
-                            for link in record.links
-                            if link.sample.received_at is not None
-                        ]
-                    )
-
-                if samples_to_prepare > 0 and samples_prepared_bool:
-                    samples_prepared_at = max(
-                        [
-                            link.sample.prepared_at
-                            for link in record.links
-                            if link.sample.prepared_at is not None
-                        ]
-                    )
-
-                if samples_to_sequence > 0 and samples_sequenced_bool:
-                    samples_sequenced_at = max(
-                        [
-                            link.sample.sequenced_at
-                            for link in record.links
-                            if link.sample.sequenced_at is not None
-                        ]
-                    )
-
-                if samples_to_deliver > 0 and samples_delivered_bool:
-                    samples_delivered_at = max(
-                        [
-                            link.sample.delivered_at
-                            for link in record.links
-                            if link.sample.delivered_at is not None
-                        ]
-                    )
+        # sample filters, a single sample has to match all of them
+        sample_filters = []
+        if data_analysis:
+            sample_filters.append(models.Sample.data_analysis.like("%" + data_analysis + "%"))
+        if sample_id:
+            sample_filters.append(models.Sample.internal_id.like(sample_id))
+        if sample_filters:
+            families_q = families_q.filter(
+                models.Family.links.any(models.FamilySample.sample.has(and_(*sample_filters)))
+            )
 
-                if samples_to_invoice > 0 and samples_invoiced_bool:
-                    samples_invoiced_at = max(
-                        [
-                            link.sample.invoice.invoiced_at
-                            for link in record.links
-                            if link.sample.invoice and link.sample.invoice.invoiced_at
-                        ]
-                    )
+        return families_q
 
-                flowcells = len(
-                    [flowcell.status for link in record.links for flowcell in link.sample.flowcells]
-                )
+    def track_case_status(self, session_class: type):
+        """Refresh the case status of the cases changed in a session when it is committed.
 
-                flowcells_status = list(
-                    set(
-                        flowcell.status
-                        for link in record.links
-                        for flowcell in link.sample.flowcells
-                    )
-                )
-                if flowcells < total_samples:
-                    flowcells_status.append("new")
-
-                flowcells_status = ", ".join(flowcells_status)
-
-                flowcells_on_disk = len(
-                    [
-                        flowcell.status
-                        for link in record.links
-                        for flowcell in link.sample.flowcells
-                        if flowcell.status == "ondisk"
-                    ]
-                )
+        The cases of the links, samples, flowcells and analyses written in a flush are collected
+        and summarized right before the commit, in the same transaction.
+        """
+        event.listen(session_class, "before_flush", self._collect_moved_cases)
+        event.listen(session_class, "after_flush", self._collect_case_status_changes)
+        event.listen(session_class, "before_commit", self._refresh_changed_case_status)
+        event.listen(session_class, "after_transaction_end", self._forget_case_status_changes)
 
-                flowcells_on_disk_bool = flowcells_on_disk == total_samples
-
-            if record.analyses and not analysis_in_progress:
-                analysis_completed_at = record.analyses[0].completed_at
-                analysis_uploaded_at = record.analyses[0].uploaded_at
-                analysis_delivery_reported_at = record.analyses[0].delivery_report_created_at
-                analysis_pipeline = record.analyses[0].pipeline
-                analysis_completed_bool = analysis_completed_at is not None
-                analysis_uploaded_bool = analysis_uploaded_at is not None
-                analysis_delivery_reported_bool = analysis_delivery_reported_at is not None
-            elif total_samples > 0:
-                analysis_completed_bool = False
-                analysis_uploaded_bool = False
-                analysis_delivery_reported_bool = False
-
-            if only_received and not samples_received_bool:
-                continue
+    @staticmethod
+    def _collect_moved_cases(session: Session, flush_context, instances):
+        # the foreign key of a link moved to another family is set in the flush and the links of
+        # a deleted sample are gone after it, the families they belonged to are only known before
+        family_ids = session.info.setdefault(CHANGED_FAMILY_IDS, set())
+        for record in itertools.chain(session.dirty, session.deleted):
+            if isinstance(record, (models.FamilySample, models.Analysis)):
+                family_ids.add(record.family_id)
+        for record in session.deleted:
+            if isinstance(record, models.Sample):
+                family_ids.update(link_obj.family_id for link_obj in record.links)
 
-            if only_prepared and not samples_prepared_bool:
-                continue
+    @staticmethod
+    def _collect_case_status_changes(session: Session, flush_context):
+        family_ids = session.info.setdefault(CHANGED_FAMILY_IDS, set())
+        sample_ids = session.info.setdefault(CHANGED_SAMPLE_IDS, set())
+        for record in itertools.chain(session.new, session.dirty, session.deleted):
+            if isinstance(record, (models.FamilySample, models.Analysis)):
+                family_ids.add(record.family_id)
+                family_ids.update(inspect(record).attrs.family_id.history.deleted or ())
+            elif isinstance(record, models.Family):
+                family_ids.add(record.id)
+            elif isinstance(record, models.Sample):
+                sample_ids.add(record.id)
+            elif isinstance(record, models.Flowcell):
+                sample_ids.update(sample_obj.id for sample_obj in record.samples)
+
+    def _refresh_changed_case_status(self, session: Session):
+        # collect the changes that are not flushed yet
+        session.flush()
+        family_ids = session.info.pop(CHANGED_FAMILY_IDS, set())
+        family_ids.update(self._samples_family_ids(session.info.pop(CHANGED_SAMPLE_IDS, set())))
+        for batch in _batches(sorted(family_ids - {None})):
+            self._summarize_cases(batch)
 
-            if only_sequenced and not samples_sequenced_bool:
-                continue
+    @staticmethod
+    def _forget_case_status_changes(session: Session, transaction):
+        if transaction.parent is None:
+            session.info.pop(CHANGED_FAMILY_IDS, None)
+            session.info.pop(CHANGED_SAMPLE_IDS, None)
+
+    def _uncommitted_family_ids(self) -> Set[int]:
+        """Return the cases changed in the session since the last commit."""
+        self.session.flush()
+        family_ids = set(self.session.info.get(CHANGED_FAMILY_IDS, ()))
+        family_ids.update(self._samples_family_ids(self.session.info.get(CHANGED_SAMPLE_IDS, ())))
+        return family_ids - {None}
+
+    def _samples_family_ids(self, sample_ids: Iterable[int]) -> Set[int]:
+        family_ids = set()
+        for batch in _batches(sorted(set(sample_ids) - {None})):
+            links_q = self.session.query(models.FamilySample.family_id).filter(
+                models.FamilySample.sample_id.in_(batch)
+            )
+            family_ids.update(family_id for family_id, in links_q)
+        return family_ids
 
-            if only_analysed and not analysis_completed_bool:
-                continue
+    def mark_case_status_changed(self, family_ids: Iterable[int]):
+        """Summarize the progress of cases at the next commit.
 
-            if only_uploaded and not analysis_uploaded_bool:
-                continue
+        Needed for rows written in bulk, they are not seen by the flush listener.
+        """
+        self.session.info.setdefault(CHANGED_FAMILY_IDS, set()).update(family_ids)
+
+    def refresh_case_status(self, family_ids: Iterable[int]):
+        """Summarize the progress of cases into the case status table."""
+        self.mark_case_status_changed(family_ids)
+        self.commit()
+
+    def refresh_samples_case_status(self, sample_ids: Iterable[int]):
+        """Summarize the progress of the cases of samples into the case status table."""
+        self.session.info.setdefault(CHANGED_SAMPLE_IDS, set()).update(sample_ids)
+        self.commit()
+
+    def refresh_flowcells_case_status(self, flowcells: Iterable[models.Flowcell]):
+        """Summarize the progress of the cases with samples on the flowcells."""
+        self.refresh_samples_case_status(
+            sample_obj.id for flowcell_obj in flowcells for sample_obj in flowcell_obj.samples
+        )
 
-            if only_delivered and not samples_delivered_bool:
-                continue
+    def rebuild_case_status(self) -> int:
+        """Summarize the progress of every case into the case status table.
 
-            if only_delivery_reported and not analysis_delivery_reported_bool:
-                continue
+        Returns the number of cases.
+        """
+        nr_cases = self._summarize_cases(self.session.query(models.Family.id).subquery())
+        self.commit()
+        return nr_cases
+
+    def _summarize_cases(self, family_ids) -> int:
+        """Write the case status of the given cases, return the number of cases."""
+        existing_ids = {
+            family_id
+            for family_id, in self.session.query(models.CaseStatus.family_id).filter(
+                models.CaseStatus.family_id.in_(family_ids)
+            )
+        }
+        sample_values = self._cases_sample_values(family_ids)
+        updated_at = datetime.now()
+        new_records = []
+        updated_records = []
+        for row in self._cases_progress(family_ids):
+            data_analyses, flowcell_statuses = sample_values.get(row.id, (set(), set()))
+            record = {column: getattr(row, column) for column in CASE_STATUS_COUNTS}
+            record.update({column: getattr(row, column) for column in CASE_STATUS_DATES})
+            record.update(
+                family_id=row.id,
+                data_analyses=json.dumps(sorted(data_analyses, key=str)) if data_analyses else None,
+                flowcell_statuses=",".join(sorted(flowcell_statuses)) or None,
+                analysis_id=row.analysis_id,
+                updated_at=updated_at,
+            )
+            if row.id in existing_ids:
+                updated_records.append(record)
+            else:
+                new_records.append(record)
+        self.session.bulk_insert_mappings(models.CaseStatus, new_records, render_nulls=True)
+        self.session.bulk_update_mappings(models.CaseStatus, updated_records)
+        return len(new_records) + len(updated_records)
+
+    def _case_status_progress(self, families_q: Query) -> Tuple[Query, Dict[str, Any]]:
+        """Select the summarized progress of the cases with the dates of their latest analysis.
+
+        Cases that are not summarized yet or changed in the session since the last commit are
+        aggregated from their samples in the same query. Returns a query with one unordered row
+        per case and, for each progress step, the SQL expression that is true when the case has
+        completed that step.
+        """
+        status = models.CaseStatus
+        latest_analysis = aliased(models.Analysis)
+        not_summarized = status.family_id.is_(None)
+        changed_ids = self._uncommitted_family_ids()
+        if changed_ids:
+            not_summarized = or_(not_summarized, models.Family.id.in_(changed_ids))
+        aggregated_ids = (
+            families_q.outerjoin(status, status.family_id == models.Family.id)
+            .filter(not_summarized)
+            .with_entities(models.Family.id)
+            .subquery()
+        )
+        aggregated = self._cases_progress(aggregated_ids).order_by(None).subquery()
 
-            if only_invoiced and not samples_invoiced_bool:
-                continue
+        def column_value(column: str):
+            return case(
+                [(aggregated.c.id.isnot(None), getattr(aggregated.c, column))],
+                else_=getattr(status, column),
+            )
 
-            if exclude_received and samples_received_bool:
-                continue
+        counts = {column: func.coalesce(column_value(column), 0) for column in CASE_STATUS_COUNTS}
+        total_samples = counts["total_samples"]
+        total_internal_samples = total_samples - counts["total_external_samples"]
+
+        progress_q = (
+            families_q.outerjoin(status, status.family_id == models.Family.id)
+            .outerjoin(aggregated, aggregated.c.id == models.Family.id)
+            .outerjoin(latest_analysis, latest_analysis.id == column_value("analysis_id"))
+            .with_entities(
+                models.Family.id,
+                models.Family.internal_id,
+                models.Family.name,
+                models.Family.ordered_at,
+                models.Family.action,
+                *[count.label(column) for column, count in counts.items()],
+                *[column_value(column).label(column) for column in CASE_STATUS_DATES],
+                aggregated.c.id.label("aggregated_id"),
+                status.data_analyses,
+                status.flowcell_statuses,
+                latest_analysis.id.label("analysis_id"),
+                latest_analysis.completed_at.label("analysis_completed_at"),
+                latest_analysis.uploaded_at.label("analysis_uploaded_at"),
+                latest_analysis.delivery_report_created_at.label("analysis_delivery_reported_at"),
+                latest_analysis.pipeline.label("analysis_pipeline"),
+            )
+        )
 
-            if exclude_prepared and samples_prepared_bool:
-                continue
+        def samples_completed(samples_done, samples_expected):
+            return and_(total_samples > 0, samples_done == samples_expected)
 
-            if exclude_sequenced and samples_sequenced_bool:
-                continue
-
-            if exclude_analysed and analysis_completed_bool:
-                continue
+        def analysis_completed(analysis_date):
+            return and_(
+                latest_analysis.id.isnot(None),
+                models.Family.action.is_(None),
+                analysis_date.isnot(None),
+            )
 
-            if exclude_uploaded and analysis_uploaded_bool:
-                continue
+        completed = {
+            "received": samples_completed(counts["samples_received"], total_internal_samples),
+            "prepared": samples_completed(counts["samples_prepared"], total_internal_samples),
+            "sequenced": samples_completed(counts["samples_sequenced"], total_internal_samples),
+            "analysed": analysis_completed(latest_analysis.completed_at),
+            "uploaded": analysis_completed(latest_analysis.uploaded_at),
+            "delivered": samples_completed(counts["samples_delivered"], total_internal_samples),
+            "delivery_reported": analysis_completed(latest_analysis.delivery_report_created_at),
+            "invoiced": samples_completed(counts["samples_invoiced"], counts["samples_to_invoice"]),
+        }
 
-            if exclude_delivered and samples_delivered_bool:
-                continue
+        return progress_q, completed
 
-            if exclude_delivery_reported and analysis_delivery_reported_bool:
-                continue
+    def _cases_progress(self, family_ids) -> Query:
+        """Aggregate the progress of the given cases from their samples, flowcells and analyses.
 
-            if exclude_invoiced and samples_invoiced_bool:
-                continue
+        Returns a query with one row per case.
+        """
+        samples = (
+            self.session.query(
+                models.FamilySample.family_id.label("family_id"),
+                func.count(models.Sample.id).label("total_samples"),
+                func.sum(case([(models.Application.is_external, 1)], else_=0)).label(
+                    "total_external_samples"
+                ),
+                func.count(models.Sample.received_at).label("samples_received"),
+                func.count(models.Sample.prepared_at).label("samples_prepared"),
+                func.count(models.Sample.sequenced_at).label("samples_sequenced"),
+                func.count(models.Sample.delivered_at).label("samples_delivered"),
+                func.count(models.Invoice.invoiced_at).label("samples_invoiced"),
+                func.sum(case([(models.Sample.no_invoice, 1)], else_=0)).label(
+                    "samples_no_invoice"
+                ),
+                func.max(models.Sample.received_at).label("samples_received_at"),
+                func.max(models.Sample.prepared_at).label("samples_prepared_at"),
+                func.max(models.Sample.sequenced_at).label("samples_sequenced_at"),
+                func.max(models.Sample.delivered_at).label("samples_delivered_at"),
+                func.max(models.Invoice.invoiced_at).label("samples_invoiced_at"),
+                func.max(models.Application.turnaround_time).label("max_tat"),
+            )
+            .select_from(models.FamilySample)
+            .join(
+                models.FamilySample.sample,
+                models.Sample.application_version,
+                models.ApplicationVersion.application,
+            )
+            .outerjoin(models.Sample.invoice)
+            .filter(models.FamilySample.family_id.in_(family_ids))
+            .group_by(models.FamilySample.family_id)
+            .subquery()
+        )
+        flowcells = (
+            self.session.query(
+                models.FamilySample.family_id.label("family_id"),
+                func.count(models.Flowcell.id).label("flowcells"),
+                func.sum(case([(models.Flowcell.status == "ondisk", 1)], else_=0)).label(
+                    "flowcells_on_disk"
+                ),
+            )
+            .select_from(models.FamilySample)
+            .join(models.FamilySample.sample, models.Sample.flowcells)
+            .filter(models.FamilySample.family_id.in_(family_ids))
+            .group_by(models.FamilySample.family_id)
+            .subquery()
+        )
+        # the latest analysis is the first one in the Family.analyses relationship
+        latest_analysis = aliased(models.Analysis)
+        latest_analysis_id = (
+            self.session.query(models.Analysis.id)
+            .filter(models.Analysis.family_id == models.Family.id)
+            .order_by(*models.Family.analyses.property.order_by, models.Analysis.id)
+            .limit(1)
+            .correlate(models.Family)
+            .as_scalar()
+        )
 
-            if progress_tracker:
-                for analysis_obj in progress_tracker.get_latest_logged_analysis(
-                    case_id=record.internal_id
-                ):
+        total_samples = func.coalesce(samples.c.total_samples, 0)
+        total_external_samples = func.coalesce(samples.c.total_external_samples, 0)
+        samples_to_invoice = total_samples - func.coalesce(samples.c.samples_no_invoice, 0)
+
+        progress_q = (
+            self.session.query(
+                models.Family.id,
+                models.Family.internal_id,
+                models.Family.name,
+                models.Family.ordered_at,
+                models.Family.action,
+                total_samples.label("total_samples"),
+                total_external_samples.label("total_external_samples"),
+                func.coalesce(samples.c.samples_received, 0).label("samples_received"),
+                func.coalesce(samples.c.samples_prepared, 0).label("samples_prepared"),
+                func.coalesce(samples.c.samples_sequenced, 0).label("samples_sequenced"),
+                func.coalesce(samples.c.samples_delivered, 0).label("samples_delivered"),
+                func.coalesce(samples.c.samples_invoiced, 0).label("samples_invoiced"),
+                samples_to_invoice.label("samples_to_invoice"),
+                samples.c.samples_received_at,
+                samples.c.samples_prepared_at,
+                samples.c.samples_sequenced_at,
+                samples.c.samples_delivered_at,
+                samples.c.samples_invoiced_at,
+                func.coalesce(samples.c.max_tat, 0).label("max_tat"),
+                func.coalesce(flowcells.c.flowcells, 0).label("flowcells"),
+                func.coalesce(flowcells.c.flowcells_on_disk, 0).label("flowcells_on_disk"),
+                latest_analysis.id.label("analysis_id"),
+                latest_analysis.completed_at.label("analysis_completed_at"),
+                latest_analysis.uploaded_at.label("analysis_uploaded_at"),
+                latest_analysis.delivery_report_created_at.label("analysis_delivery_reported_at"),
+                latest_analysis.pipeline.label("analysis_pipeline"),
+            )
+            .select_from(models.Family)
+            .outerjoin(samples, samples.c.family_id == models.Family.id)
+            .outerjoin(flowcells, flowcells.c.family_id == models.Family.id)
+            .outerjoin(latest_analysis, latest_analysis.id == latest_analysis_id)
+            .filter(models.Family.id.in_(family_ids))
+            .order_by(models.Family.id)
+        )
 
-                    if not analysis_status:
-                        analysis_completion = round(analysis_obj.progress * 100)
-                        analysis_status = analysis_obj.status
+        return progress_q
 
-            # filter on a status
-            if progress_status and progress_status != analysis_status:
-                continue
+    def _cases_sample_values(self, family_ids) -> Dict[int, Tuple[Set[str], Set[str]]]:
+        """Fetch the data analyses and flowcell statuses of the samples in each case"""
+        records = (
+            self.session.query(
+                models.FamilySample.family_id, models.Sample.data_analysis, models.Flowcell.status
+            )
+            .select_from(models.FamilySample)
+            .join(models.FamilySample.sample)
+            .outerjoin(models.Sample.flowcells)
+            .filter(models.FamilySample.family_id.in_(family_ids))
+            .distinct()
+        )
 
-            is_rerun = self._is_rerun(
-                record, samples_received_at, samples_prepared_at, samples_sequenced_at
-            )
-
-            tat = self._calculate_estimated_turnaround_time(
-                is_rerun,
-                case_external_bool,
-                record.ordered_at,
-                samples_received_at,
-                samples_prepared_at,
-                samples_sequenced_at,
-                analysis_completed_at,
-                analysis_uploaded_at,
-                samples_delivered_at,
-            )
-
-            max_tat = self._get_max_tat(links=record.links)
-
-            case = {
-                "internal_id": record.internal_id,
-                "name": record.name,
-                "ordered_at": record.ordered_at,
-                "total_samples": total_samples,
-                "total_external_samples": total_external_samples,
-                "total_internal_samples": total_internal_samples,
-                "case_external_bool": case_external_bool,
-                "samples_to_receive": samples_to_receive,
-                "samples_to_prepare": samples_to_prepare,
-                "samples_to_sequence": samples_to_sequence,
-                "samples_to_deliver": samples_to_deliver,
-                "samples_to_invoice": samples_to_invoice,
-                "samples_data_analyses": samples_data_analyses,
-                "samples_received": samples_received,
-                "samples_prepared": samples_prepared,
-                "samples_sequenced": samples_sequenced,
-                "samples_received_at": samples_received_at,
-                "samples_prepared_at": samples_prepared_at,
-                "samples_sequenced_at": samples_sequenced_at,
-                "samples_delivered_at": samples_delivered_at,
-                "samples_invoiced_at": samples_invoiced_at,
-                "case_action": case_action,
-                "analysis_status": analysis_status,
-                "analysis_completion": analysis_completion,
-                "analysis_completed_at": analysis_completed_at,
-                "analysis_uploaded_at": analysis_uploaded_at,
-                "samples_delivered": samples_delivered,
-                "analysis_delivery_reported_at": analysis_delivery_reported_at,
-                "samples_invoiced": samples_invoiced,
-                "analysis_pipeline": analysis_pipeline,
-                "samples_received_bool": samples_received_bool,
-                "samples_prepared_bool": samples_prepared_bool,
-                "samples_sequenced_bool": samples_sequenced_bool,
-                "analysis_completed_bool": analysis_completed_bool,
-                "analysis_uploaded_bool": analysis_uploaded_bool,
-                "samples_delivered_bool": samples_delivered_bool,
-                "analysis_delivery_reported_bool": analysis_delivery_reported_bool,
-                "samples_invoiced_bool": samples_invoiced_bool,
-                "flowcells_status": flowcells_status,
-                "flowcells_on_disk": flowcells_on_disk,
-                "flowcells_on_disk_bool": flowcells_on_disk_bool,
-                "tat": tat,
-                "is_rerun": is_rerun,
-                "max_tat": max_tat,
-            }
-
-            cases.append(case)
+        sample_values = {}
+        for family_id, data_analysis, flowcell_status in records:
+            data_analyses, flowcell_statuses = sample_values.setdefault(family_id, (set(), set()))
+            data_analyses.add(data_analysis)
+            if flowcell_status:
+                flowcell_statuses.add(flowcell_status)
+        return sample_values
+
+    def _case_progress_record(
+        self, row, data_analyses, flowcell_statuses, analysis_status, analysis_completion
+    ) -> dict:
+        """Build the progress record of a case from its aggregated progress row"""
+        samples_received = None
+        samples_prepared = None
+        samples_sequenced = None
+        samples_delivered = None
+        samples_invoiced = None
+        samples_received_at = None
+        samples_prepared_at = None
+        samples_sequenced_at = None
+        samples_delivered_at = None
+        samples_invoiced_at = None
+        samples_to_receive = None
+        samples_to_prepare = None
+        samples_to_sequence = None
+        samples_to_deliver = None
+        samples_to_invoice = None
+        samples_received_bool = None
+        samples_prepared_bool = None
+        samples_sequenced_bool = None
+        samples_invoiced_bool = None
+        analysis_completed_at = None
+        analysis_uploaded_at = None
+        analysis_delivery_reported_at = None
+        analysis_pipeline = None
+        analysis_completed_bool = None
+        analysis_uploaded_bool = None
+        samples_delivered_bool = None
+        analysis_delivery_reported_bool = None
+        samples_data_analyses = None
+        flowcells_status = None
+        flowcells_on_disk = None
+        flowcells_on_disk_bool = None
+
+        analysis_in_progress = row.action is not None
+
+        total_samples = row.total_samples
+        total_external_samples = row.total_external_samples
+        total_internal_samples = total_samples - total_external_samples
+        case_external_bool = total_external_samples == total_samples
+
+        if total_samples > 0:
+            samples_received = row.samples_received
+            samples_prepared = row.samples_prepared
+            samples_sequenced = row.samples_sequenced
+            samples_delivered = row.samples_delivered
+            samples_invoiced = row.samples_invoiced
+
+            samples_to_receive = total_internal_samples
+            samples_to_prepare = total_internal_samples
+            samples_to_sequence = total_internal_samples
+            samples_to_deliver = total_internal_samples
+            samples_to_invoice = row.samples_to_invoice
+
+            samples_received_bool = samples_received == samples_to_receive
+            samples_prepared_bool = samples_prepared == samples_to_prepare
+            samples_sequenced_bool = samples_sequenced == samples_to_sequence
+            samples_delivered_bool = samples_delivered == samples_to_deliver
+            samples_invoiced_bool = samples_invoiced == samples_to_invoice
+            samples_data_analyses = list(data_analyses)
+
+            if samples_to_receive > 0 and samples_received_bool:
+                samples_received_at = row.samples_received_at
+
+            if samples_to_prepare > 0 and samples_prepared_bool:
+                samples_prepared_at = row.samples_prepared_at
+
+            if samples_to_sequence > 0 and samples_sequenced_bool:
+                samples_sequenced_at = row.samples_sequenced_at
+
+            if samples_to_deliver > 0 and samples_delivered_bool:
+                samples_delivered_at = row.samples_delivered_at
+
+            if samples_to_invoice > 0 and samples_invoiced_bool:
+                samples_invoiced_at = row.samples_invoiced_at
+
+            flowcells_status = sorted(flowcell_statuses)
+            if row.flowcells < total_samples:
+                flowcells_status.append("new")
+
+            flowcells_status = ", ".join(flowcells_status)
+
+            flowcells_on_disk = row.flowcells_on_disk
+            flowcells_on_disk_bool = flowcells_on_disk == total_samples
+
+        if row.analysis_id is not None and not analysis_in_progress:
+            analysis_completed_at = row.analysis_completed_at
+            analysis_uploaded_at = row.analysis_uploaded_at
+            analysis_delivery_reported_at = row.analysis_delivery_reported_at
+            analysis_pipeline = row.analysis_pipeline
+            analysis_completed_bool = analysis_completed_at is not None
+            analysis_uploaded_bool = analysis_uploaded_at is not None
+            analysis_delivery_reported_bool = analysis_delivery_reported_at is not None
+        elif total_samples > 0:
+            analysis_completed_bool = False
+            analysis_uploaded_bool = False
+            analysis_delivery_reported_bool = False
+
+        is_rerun = self._is_rerun(
+            row.analysis_id is not None,
+            row.ordered_at,
+            samples_received_at,
+            samples_prepared_at,
+            samples_sequenced_at,
+        )
 
-        cases_sorted = sorted(cases, key=lambda k: k["tat"], reverse=True)
+        tat = self._calculate_estimated_turnaround_time(
+            is_rerun,
+            case_external_bool,
+            row.ordered_at,
+            samples_received_at,
+            samples_prepared_at,
+            samples_sequenced_at,
+            analysis_completed_at,
+            analysis_uploaded_at,
+            samples_delivered_at,
+        )
 
-        return cases_sorted
+        return {
+            "internal_id": row.internal_id,
+            "name": row.name,
+            "ordered_at": row.ordered_at,
+            "total_samples": total_samples,
+            "total_external_samples": total_external_samples,
+            "total_internal_samples": total_internal_samples,
+            "case_external_bool": case_external_bool,
+            "samples_to_receive": samples_to_receive,
+            "samples_to_prepare": samples_to_prepare,
+            "samples_to_sequence": samples_to_sequence,
+            "samples_to_deliver": samples_to_deliver,
+            "samples_to_invoice": samples_to_invoice,
+            "samples_data_analyses": samples_data_analyses,
+            "samples_received": samples_received,
+            "samples_prepared": samples_prepared,
+            "samples_sequenced": samples_sequenced,
+            "samples_received_at": samples_received_at,
+            "samples_prepared_at": samples_prepared_at,
+            "samples_sequenced_at": samples_sequenced_at,
+            "samples_delivered_at": samples_delivered_at,
+            "samples_invoiced_at": samples_invoiced_at,
+            "case_action": row.action,
+            "analysis_status": analysis_status,
+            "analysis_completion": analysis_completion,
+            "analysis_completed_at": analysis_completed_at,
+            "analysis_uploaded_at": analysis_uploaded_at,
+            "samples_delivered": samples_delivered,
+            "analysis_delivery_reported_at": analysis_delivery_reported_at,
+            "samples_invoiced": samples_invoiced,
+            "analysis_pipeline": analysis_pipeline,
+            "samples_received_bool": samples_received_bool,
+            "samples_prepared_bool": samples_prepared_bool,
+            "samples_sequenced_bool": samples_sequenced_bool,
+            "analysis_completed_bool": analysis_completed_bool,
+            "analysis_uploaded_bool": analysis_uploaded_bool,
+            "samples_delivered_bool": samples_delivered_bool,
+            "analysis_delivery_reported_bool": analysis_delivery_reported_bool,
+            "samples_invoiced_bool": samples_invoiced_bool,
+            "flowcells_status": flowcells_status,
+            "flowcells_on_disk": flowcells_on_disk,
+            "flowcells_on_disk_bool": flowcells_on_disk_bool,
+            "tat": tat,
+            "is_rerun": is_rerun,
+            "max_tat": row.max_tat,
+        }
 
     @staticmethod
-    def _is_rerun(record, samples_received_at, samples_prepared_at, samples_sequenced_at):
+    def _is_rerun(
+        has_analyses, ordered_at, samples_received_at, samples_prepared_at, samples_sequenced_at
+    ):
 
         return (
-            (len(record.analyses) > 0)
-            or (samples_received_at and samples_received_at < record.ordered_at)
-            or (samples_prepared_at and samples_prepared_at < record.ordered_at)
-            or (samples_sequenced_at and samples_sequenced_at < record.ordered_at)
+            has_analyses
+            or (samples_received_at and samples_received_at < ordered_at)
+            or (samples_prepared_at and samples_prepared_at < ordered_at)
+            or (samples_sequenced_at and samples_sequenced_at < ordered_at)
         )
 
-    @staticmethod
-    def _all_samples_have_sequence_data(links: List[models.FamilySample]) -> bool:
-        """Return True if all samples are external or sequenced inhouse."""
-        return all((link.sample.sequenced_at or link.sample.is_external) for link in links)
-
     def analyses_to_upload(self):
         """Fetch analyses that haven't been uploaded."""
         records = self.Analysis.query.filter(
@@ -748,6 +1063,31 @@ class StatusHandler(BaseHandler):
         )
         return records
 
+    def status_queries(self) -> Dict[str, Query]:
+        """Return the queries that the status commands run, named by the method building them."""
+        return {
+            "samples_to_recieve": self.samples_to_recieve(),
+            "samples_to_prepare": self.samples_to_prepare(),
+            "samples_to_sequence": self.samples_to_sequence(),
+            "samples_to_deliver": self.samples_to_deliver(),
+            "samples_not_delivered": self.samples_not_delivered(),
+            "samples_not_invoiced": self.samples_not_invoiced(),
+            "samples_not_downsampled": self.samples_not_downsampled(),
+            "cases_to_analyze": self._cases_to_analyze(),
+            "cases": self._case_status_query(self._filter_cases(days=31)),
+            "analyses_to_upload": self.analyses_to_upload(),
+            "analyses_to_deliver": self.analyses_to_deliver(),
+            "analyses_to_delivery_report": self.analyses_to_delivery_report(),
+            "observations_to_upload": self.observations_to_upload(),
+            "observations_uploaded": self.observations_uploaded(),
+            "pools_to_receive": self.pools_to_receive(),
+            "pools_to_deliver": self.pools_to_deliver(),
+            "microbial_samples_to_receive": self.microbial_samples_to_receive(),
+            "microbial_samples_to_prepare": self.microbial_samples_to_prepare(),
+            "microbial_samples_to_sequence": self.microbial_samples_to_sequence(),
+            "microbial_samples_to_deliver": self.microbial_samples_to_deliver(),
+        }
+
     def _calculate_estimated_turnaround_time(
         self,
         is_rerun,
@@ -795,11 +1135,3 @@ class StatusHandler(BaseHandler):
         if first_date:
             delta = (last_date - first_date).days
         return delta
-
-    @staticmethod
-    def _get_max_tat(links):
-        max_tat = 0
-        for link in links:
-            if link.sample.application_version.application.turnaround_time:
-                max_tat = max(0, link.sample.application_version.application.turnaround_time)
-        return max_tat
@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 import datetime as dt
+import hashlib
 from typing import List
 
 import alchy
-from sqlalchemy import Column, ForeignKey, orm, types, UniqueConstraint, Table
+from sqlalchemy import Column, ForeignKey, Index, orm, types, UniqueConstraint, Table
 
 from cg.constants import (
     REV_PRIORITY_MAP,
@@ -13,7 +14,24 @@ from cg.constants import (
     PREP_CATEGORIES,
 )
 
-Model = alchy.make_declarative_base(Base=alchy.ModelBase)
+
+class ModelBase(alchy.ModelBase):
+    @property
+    def __to_dict__(self) -> set:
+        """Serialize only the public columns, relationships are added by the to_dict overrides.
+
+        The default includes any relationship that happens to be loaded which makes the output
+        depend on the loader options of the query. Private columns like the panels of a family
+        are serialized by the to_dict overrides through their properties.
+        """
+        return {
+            column_attr.key
+            for column_attr in self.column_attrs()
+            if not column_attr.key.startswith("_")
+        }
+
+
+Model = alchy.make_declarative_base(Base=ModelBase)
 
 
 flowcell_sample = Table(
@@ -140,6 +158,12 @@ class ApplicationVersion(Model):
 
 
 class Analysis(Model):
+    __table_args__ = (
+        Index("ix_analysis_uploaded_at_completed_at", "uploaded_at", "completed_at"),
+        # the latest analysis of a case, MySQL also indexes the foreign key by itself
+        Index("ix_analysis_family_id", "family_id"),
+    )
+
     id = Column(types.Integer, primary_key=True)
     pipeline = Column(types.String(32), nullable=False)
     pipeline_version = Column(types.String(32))
@@ -148,6 +172,8 @@ class Analysis(Model):
     delivery_report_created_at = Column(types.DateTime)
     upload_started_at = Column(types.DateTime)
     uploaded_at = Column(types.DateTime)
+    # upload steps completed so far, a failed upload resumes after them
+    _upload_steps = Column(types.Text)
     # primary analysis is the one originally delivered to the customer
     is_primary = Column(types.Boolean, default=False)
 
@@ -164,6 +190,15 @@ class Analysis(Model):
             data["family"] = self.family.to_dict()
         return data
 
+    @property
+    def upload_steps(self) -> List[str]:
+        """Return a list of completed upload steps."""
+        return self._upload_steps.split(",") if self._upload_steps else []
+
+    @upload_steps.setter
+    def upload_steps(self, step_list: List[str]):
+        self._upload_steps = ",".join(step_list) if step_list else None
+
 
 class Bed(Model):
     """Model for bed target captures """
@@ -210,6 +245,41 @@ class BedVersion(Model):
         return data
 
 
+class CaseStatus(Model):
+    """Progress of a case summarized from its samples, flowcells and invoices.
+
+    The rows are refreshed when changes of the rows they are summarized from are committed, see
+    StatusHandler.track_case_status. The dates of the latest analysis are read from the analysis.
+    """
+
+    family_id = Column(ForeignKey("family.id", ondelete="CASCADE"), primary_key=True)
+    total_samples = Column(types.Integer, default=0, nullable=False)
+    total_external_samples = Column(types.Integer, default=0, nullable=False)
+    samples_received = Column(types.Integer, default=0, nullable=False)
+    samples_prepared = Column(types.Integer, default=0, nullable=False)
+    samples_sequenced = Column(types.Integer, default=0, nullable=False)
+    samples_delivered = Column(types.Integer, default=0, nullable=False)
+    samples_invoiced = Column(types.Integer, default=0, nullable=False)
+    samples_to_invoice = Column(types.Integer, default=0, nullable=False)
+    # latest dates of the samples
+    samples_received_at = Column(types.DateTime)
+    samples_prepared_at = Column(types.DateTime)
+    samples_sequenced_at = Column(types.DateTime)
+    samples_delivered_at = Column(types.DateTime)
+    samples_invoiced_at = Column(types.DateTime)
+    max_tat = Column(types.Integer, default=0, nullable=False)
+    flowcells = Column(types.Integer, default=0, nullable=False)
+    flowcells_on_disk = Column(types.Integer, default=0, nullable=False)
+    # comma separated values of the samples
+    flowcell_statuses = Column(types.String(128))
+    data_analyses = Column(types.Text)
+    analysis_id = Column(ForeignKey("analysis.id", ondelete="SET NULL"))
+    updated_at = Column(types.DateTime, default=dt.datetime.now, nullable=False)
+
+    def __str__(self) -> str:
+        return f"{self.family_id} | {self.updated_at}"
+
+
 class Customer(Model):
     id = Column(types.Integer, primary_key=True)
     internal_id = Column(types.String(32), unique=True, nullable=False)
@@ -268,7 +338,11 @@ class Delivery(Model):
 
 
 class Family(Model, PriorityMixin):
-    __table_args__ = (UniqueConstraint("customer_id", "name", name="_customer_name_uc"),)
+    __table_args__ = (
+        UniqueConstraint("customer_id", "name", name="_customer_name_uc"),
+        Index("ix_family_action_priority_ordered_at", "action", "priority", "ordered_at"),
+        Index("ix_family_ordered_at", "ordered_at"),
+    )
 
     id = Column(types.Integer, primary_key=True)
     internal_id = Column(types.String(32), unique=True, nullable=False)
@@ -350,6 +424,35 @@ class FamilySample(Model):
         return f"{self.family.internal_id} | {self.sample.internal_id}"
 
 
+class FastqHeader(Model):
+    """Lane, flowcell and read number from the first header of a FASTQ file.
+
+    Paths can be longer than a unique index allows, a header is unique by the sha1 of its path.
+    """
+
+    id = Column(types.Integer, primary_key=True)
+    path_hash = Column(types.String(40), unique=True, nullable=False)
+    path = Column(types.Text, nullable=False)
+    # size and modification time (ns) of the file when the header was read
+    size = Column(types.BigInteger, nullable=False)
+    mtime = Column(types.BigInteger, nullable=False)
+    lane = Column(types.String(8))
+    flowcell = Column(types.String(32))
+    readnumber = Column(types.String(8))
+
+    def __str__(self) -> str:
+        return self.path
+
+    @staticmethod
+    def hash_path(path: str) -> str:
+        """Return the sha1 of a path that identifies its header."""
+        return hashlib.sha1(path.encode()).hexdigest()
+
+    def to_header(self) -> dict:
+        """Return the header fields like FastqAPI.parse_header."""
+        return {"lane": self.lane, "flowcell": self.flowcell, "readnumber": self.readnumber}
+
+
 class Flowcell(Model):
     id = Column(types.Integer, primary_key=True)
     name = Column(types.String(32), unique=True, nullable=False)
@@ -526,6 +629,41 @@ class Pool(Model):
 
 
 class Sample(Model, PriorityMixin):
+    # one index per status queue: the unset dates first and the set date last
+    __table_args__ = (
+        Index(
+            "ix_sample_received_at_downsampled_to_ordered_at",
+            "received_at",
+            "downsampled_to",
+            "ordered_at",
+        ),
+        Index(
+            "ix_sample_prepared_at_sequenced_at_downsampled_to_received_at",
+            "prepared_at",
+            "sequenced_at",
+            "downsampled_to",
+            "received_at",
+        ),
+        Index(
+            "ix_sample_sequenced_at_downsampled_to_prepared_at",
+            "sequenced_at",
+            "downsampled_to",
+            "prepared_at",
+        ),
+        Index(
+            "ix_sample_delivered_at_downsampled_to_sequenced_at",
+            "delivered_at",
+            "downsampled_to",
+            "sequenced_at",
+        ),
+        Index(
+            "ix_sample_invoice_id_no_invoice_downsampled_to_delivered_at",
+            "invoice_id",
+            "no_invoice",
+            "downsampled_to",
+            "delivered_at",
+        ),
+    )
 
     application_version_id = Column(ForeignKey("application_version.id"), nullable=False)
     beaconized_at = Column(types.Text)
@@ -617,6 +755,18 @@ class Invoice(Model):
         return data
 
 
+class TransferMark(Model):
+    """How far LIMS changes have been transferred, per transfer and status."""
+
+    id = Column(types.Integer, primary_key=True)
+    name = Column(types.String(64), unique=True, nullable=False)
+    marked_at = Column(types.DateTime, nullable=False)
+    updated_at = Column(types.DateTime, onupdate=dt.datetime.now)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.marked_at})"
+
+
 class User(Model):
     id = Column(types.Integer, primary_key=True)
     name = Column(types.String(128), nullable=False)
@@ -2,13 +2,167 @@
 Code to handle communications to the shell from CG
 """
 
+import asyncio
+import concurrent.futures
 import copy
 import logging
+import os
 import subprocess
-from subprocess import CalledProcessError
+import threading
+import time
+from subprocess import CalledProcessError, TimeoutExpired
+from typing import AsyncIterator, Callable, Iterable, List, NamedTuple, Tuple
 
 LOG = logging.getLogger(__name__)
 
+CHUNK_SIZE = 65536
+DEFAULT_MAX_CONCURRENT = 8
+
+
+class ProcessResult(NamedTuple):
+    """Outcome and resource usage of a finished command"""
+
+    command: List[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    # seconds from start to exit
+    wall_time: float
+    # user and system seconds of the process
+    cpu_time: float
+    # peak resident set size in kilobytes
+    max_rss: int
+
+
+async def _read_lines(reader: asyncio.StreamReader, on_line: Callable[[str], None]):
+    """Read a pipe to the end in chunks and pass on every line."""
+    pending = b""
+    while True:
+        chunk = await reader.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            on_line(line.decode("utf-8"))
+    if pending:
+        on_line(pending.decode("utf-8"))
+
+
+async def _connect_pipe(pipe) -> Tuple[asyncio.StreamReader, asyncio.ReadTransport]:
+    """Wrap a pipe of a child process in a stream reader of the running loop."""
+    loop = asyncio.get_event_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader, transport
+
+
+def _exit_code(status: int) -> int:
+    """Return the exit code of a wait status, the negative signal for a killed process."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _retrieve_exception(future: asyncio.Future):
+    """Mark the exception of a finished future as retrieved so asyncio does not log it."""
+    if not future.cancelled():
+        future.exception()
+
+
+def _reap(popen: subprocess.Popen, lock: threading.Lock) -> tuple:
+    """Wait for a process to exit and reap it, return its wait status and resource usage.
+
+    The process is left a zombie until it is reaped under the lock, where its return code is set
+    at once. A process is only killed under the same lock while it has no return code, so its pid
+    can not have been reused by another process.
+    """
+    os.waitid(os.P_PID, popen.pid, os.WEXITED | os.WNOWAIT)
+    with lock:
+        _, status, rusage = os.wait4(popen.pid, 0)
+        popen.returncode = _exit_code(status)
+    return status, rusage
+
+
+async def execute(
+    command: List[str],
+    timeout: float = None,
+    on_stdout_line: Callable[[str], None] = None,
+    executor: concurrent.futures.ThreadPoolExecutor = None,
+) -> ProcessResult:
+    """Run a command without blocking the event loop.
+
+    The output is read line by line as it is written. Lines passed to on_stdout_line are not kept
+    in the result. The process is reaped with wait4, in a thread of the executor, to get the
+    resources it used. Without an executor a thread of its own is used, the thread has to be free
+    for the timeout to only count the command. A process running longer than timeout seconds is
+    killed and TimeoutExpired is raised.
+    """
+    loop = asyncio.get_event_loop()
+    start = time.monotonic()
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    popen = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout_lines, stderr_lines = [], []
+    reap_lock = threading.Lock()
+    reaped = loop.run_in_executor(executor, _reap, popen, reap_lock)
+    transports = []
+    try:
+        stdout, transport = await _connect_pipe(popen.stdout)
+        transports.append(transport)
+        stderr, transport = await _connect_pipe(popen.stderr)
+        transports.append(transport)
+        gathered = asyncio.gather(
+            _read_lines(stdout, on_stdout_line or stdout_lines.append),
+            _read_lines(stderr, stderr_lines.append),
+            asyncio.shield(reaped),
+        )
+        # a timeout cancels the gather, which then finishes with an unretrieved CancelledError
+        gathered.add_done_callback(_retrieve_exception)
+        _, _, (_, rusage) = await asyncio.wait_for(gathered, timeout)
+    except asyncio.TimeoutError:
+        # the process may have exited while a child of it keeps the pipes open
+        with reap_lock:
+            if not reaped.done() and popen.returncode is None:
+                popen.kill()
+        await reaped
+        raise TimeoutExpired(command, timeout)
+    finally:
+        for transport in transports:
+            transport.close()
+        if own_executor:
+            executor.shutdown(wait=False)
+    return ProcessResult(
+        command=command,
+        returncode=popen.returncode,
+        stdout="\n".join(stdout_lines).rstrip(),
+        stderr="\n".join(stderr_lines).rstrip(),
+        wall_time=time.monotonic() - start,
+        cpu_time=rusage.ru_utime + rusage.ru_stime,
+        max_rss=rusage.ru_maxrss,
+    )
+
+
+def run_sync(coroutine):
+    """Run a coroutine to the end in an event loop of its own.
+
+    Raises RuntimeError when called from a running event loop, the coroutine should be awaited
+    there instead.
+    """
+    try:
+        in_running_loop = asyncio.get_event_loop().is_running()
+    except RuntimeError:
+        # threads other than the main thread have no event loop by default
+        in_running_loop = False
+    if in_running_loop:
+        coroutine.close()
+        raise RuntimeError("can not run a command synchronously in a running event loop")
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
 
 class Process:
     """Class to handle communication with other programs via the shell
@@ -32,28 +186,90 @@ class Process:
         LOG.debug("Use base call %s", self.base_call)
         self._stdout = ""
         self._stderr = ""
+        self.result = None
 
-    def run_command(self, parameters=None):
-        """Execute a command in the shell
-
-        Args:
-            parameters(list)
-        """
+    def command(self, parameters=None) -> List[str]:
+        """Build the call of the binary with parameters"""
         command = copy.deepcopy(self.base_call)
         if parameters:
             command.extend(parameters)
+        return command
 
-        LOG.info("Running command %s", " ".join(command))
-        res = subprocess.run(command, check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    async def run_command_async(
+        self,
+        parameters=None,
+        timeout: float = None,
+        check: bool = True,
+        on_stdout_line: Callable[[str], None] = None,
+        executor: concurrent.futures.ThreadPoolExecutor = None,
+    ) -> ProcessResult:
+        """Execute a command in the shell without blocking the event loop
 
-        self.stdout = res.stdout.decode("utf-8").rstrip()
-        self.stderr = res.stderr.decode("utf-8").rstrip()
-        if res.returncode != 0:
+        Args:
+            parameters(list)
+            timeout(float): seconds before the process is killed and TimeoutExpired is raised
+            check(bool): raise CalledProcessError on a non zero exit code
+            on_stdout_line(callable): called with each line of stdout instead of keeping it
+            executor(ThreadPoolExecutor): with a free thread to wait for the process in
+        """
+        command = self.command(parameters)
+        LOG.info("Running command %s", " ".join(command))
+        result = await execute(
+            command, timeout=timeout, on_stdout_line=on_stdout_line, executor=executor
+        )
+        LOG.debug(
+            "Command %s took %.2f s, %.2f s cpu, %d kB max rss",
+            command,
+            result.wall_time,
+            result.cpu_time,
+            result.max_rss,
+        )
+        if check and result.returncode != 0:
             LOG.critical("Call %s exit with a non zero exit code", command)
+            LOG.critical(result.stderr)
+            raise CalledProcessError(result.returncode, command, result.stdout, result.stderr)
+        return result
+
+    async def iter_command_lines(self, parameters=None, timeout: float = None) -> AsyncIterator:
+        """Execute a command and yield the lines of stdout while it runs
+
+        Errors of the command are raised after the last line.
+        """
+        lines = asyncio.Queue()
+        running = asyncio.ensure_future(
+            self.run_command_async(parameters, timeout=timeout, on_stdout_line=lines.put_nowait)
+        )
+        running.add_done_callback(lambda _: lines.put_nowait(None))
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            yield line
+        self.result = await running
+
+    def run_command(self, parameters=None, timeout: float = None):
+        """Execute a command in the shell
+
+        The command runs in an event loop of its own, code running in an event loop should await
+        run_command_async instead, run_command raises RuntimeError there.
+
+        Args:
+            parameters(list)
+            timeout(float): seconds before the process is killed and TimeoutExpired is raised
+        """
+        try:
+            self.result = run_sync(self.run_command_async(parameters, timeout=timeout, check=False))
+        except TimeoutExpired:
+            self.stdout = self.stderr = ""
+            raise
+        self.stdout = self.result.stdout
+        self.stderr = self.result.stderr
+        if self.result.returncode != 0:
+            LOG.critical("Call %s exit with a non zero exit code", self.result.command)
             LOG.critical(self.stderr)
-            raise CalledProcessError(command, res.returncode)
+            raise CalledProcessError(self.result.returncode, self.result.command)
 
-        return res.returncode
+        return self.result.returncode
 
     @property
     def stdout(self):
@@ -93,3 +309,40 @@ class Process:
 
     def __repr__(self):
         return f"Process:base_call:{self.base_call}"
+
+
+class CommandPool:
+    """Run commands concurrently, at most max_concurrent at a time"""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self._semaphore = None
+        # a thread per running command waits for its process
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent)
+
+    async def run(
+        self, process: Process, parameters=None, timeout: float = None, check: bool = True
+    ) -> ProcessResult:
+        """Execute a command of a process once a slot is free"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            return await process.run_command_async(
+                parameters, timeout=timeout, check=check, executor=self._executor
+            )
+
+    def run_all(self, calls: Iterable[Tuple[Process, list]], timeout: float = None) -> list:
+        """Execute the commands of (process, parameters) calls and wait for all of them
+
+        Returns a result per call in the same order. A command that fails is not raised, its
+        CalledProcessError or TimeoutExpired takes the place of the result.
+        """
+
+        async def run_calls():
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            return await asyncio.gather(
+                *[self.run(process, parameters, timeout=timeout) for process, parameters in calls],
+                return_exceptions=True,
+            )
+
+        return run_sync(run_calls())
@@ -1,3 +1,81 @@
+"""Parse FASTQ headers and index them"""
+import gzip
+import logging
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+from sqlalchemy.exc import IntegrityError
+
+LOG = logging.getLogger(__name__)
+
+# Casava 1.8 and later, including NovaSeq/NextSeq headers with a UMI in the read name and dual
+# indexes, and HiSeq X headers with the read number after a slash
+CASAVA_HEADER = re.compile(
+    r"@[^:\s]+:\d+:([^:\s]+):(\d+):\d+:\d+:\d+(?::[^:\s]+)?(?:\s+(\d):|/(\d))?"
+)
+# before Casava 1.8, without a flowcell id
+LEGACY_HEADER = re.compile(r"@[^:\s]+:(\d+):\d+:\d+:\d+(?:#[^/\s]*)?/(\d)")
+# tile identifier in the file names of HiSeq X runs
+TILE_PATTERN = re.compile(r"-l[1-9]t([1-9]{2})_")
+UNKNOWN_FLOWCELL = "XXXXXX"
+
+
+class FastqHeaderInfo(NamedTuple):
+    """Lane, flowcell and read number of a FASTQ header, None when the header is not recognized"""
+
+    lane: Optional[str]
+    flowcell: Optional[str]
+    readnumber: Optional[str]
+
+
+UNKNOWN_HEADER = FastqHeaderInfo(None, None, None)
+
+
+def parse_header_lines(lines: Iterable[str]) -> List[FastqHeaderInfo]:
+    """Parse FASTQ header lines, equal headers are parsed into the same record."""
+    casava_match, legacy_match = CASAVA_HEADER.match, LEGACY_HEADER.match
+    records = {}
+    parsed = []
+    for line in lines:
+        match = casava_match(line)
+        if match is not None:
+            flowcell, lane, readnumber, slash_readnumber = match.groups()
+            key = (lane, flowcell, readnumber or slash_readnumber)
+        else:
+            match = legacy_match(line)
+            key = UNKNOWN_HEADER if match is None else (match[1], UNKNOWN_FLOWCELL, match[2])
+        record = records.get(key)
+        if record is None:
+            record = records[key] = FastqHeaderInfo(*key)
+        parsed.append(record)
+    return parsed
+
+
+def fastq_link_files(paths: Sequence[str], headers: Sequence[Mapping]) -> List[dict]:
+    """Return the data the FASTQ handlers link files by, from the paths and parsed headers.
+
+    The flowcell of files from HiSeq X runs is suffixed with the tile identifier of the file.
+    """
+    files = []
+    for path, header in zip(paths, headers):
+        file_name = os.path.basename(path)
+        flowcell = header["flowcell"]
+        tile = TILE_PATTERN.search(file_name)
+        if tile is not None:
+            flowcell = f"{flowcell}-{tile[1]}"
+        files.append(
+            {
+                "path": path,
+                "lane": int(header["lane"]),
+                "flowcell": flowcell,
+                "read": int(header["readnumber"]),
+                "undetermined": "_Undetermined_" in file_name,
+            }
+        )
+    return files
+
+
 class FastqAPI:
     @staticmethod
     def parse_header(line):
@@ -34,22 +112,99 @@ class FastqAPI:
             Y   Y if the read is filtered, N otherwise
             18  0 when none of the control bits are on, otherwise it is an even number
             ATCACG  index sequence
+
+        NovaSeq and NextSeq headers follow the Casava 1.8 format and may add a UMI to the read
+        name and a second index:
+
+        @A00621:130:HFWJMDSXX:1:1101:1000:1000:ACGTACGT 1:N:0:GATCAG+ACGTGA
         """
 
-        fastq_meta = {"lane": None, "flowcell": None, "readnumber": None}
-
-        parts = line.split(":")
-        if len(parts) == 5:  # @HWUSI-EAS100R:6:73:941:1973#0/1
-            fastq_meta["lane"] = parts[1]
-            fastq_meta["flowcell"] = "XXXXXX"
-            fastq_meta["readnumber"] = parts[-1].split("/")[-1]
-        if len(parts) == 10:  # @EAS139:136:FC706VJ:2:2104:15343:197393 1:Y:18:ATCACG
-            fastq_meta["lane"] = parts[3]
-            fastq_meta["flowcell"] = parts[2]
-            fastq_meta["readnumber"] = parts[6].split(" ")[-1]
-        if len(parts) == 7:  # @ST-E00201:173:HCLCGALXX:1:2106:22516:34834/1
-            fastq_meta["lane"] = parts[3]
-            fastq_meta["flowcell"] = parts[2]
-            fastq_meta["readnumber"] = parts[-1].split("/")[-1]
-
-        return fastq_meta
+        return dict(parse_header_lines([line])[0]._asdict())
+
+
+class FastqIndex:
+    """Lane, flowcell and read number of FASTQ files, read from the first header once per file.
+
+    The headers are kept in the status database by path together with the size and modification
+    time of the file. A file is opened again only when it changed. New headers are written in a
+    savepoint and committed, or left to the caller to commit with the rest of its changes.
+    """
+
+    def __init__(
+        self, store, parse_header: Callable[[str], dict] = None, gzipper=gzip, commit: bool = True
+    ):
+        self.store = store
+        self.parse_header = parse_header or FastqAPI.parse_header
+        self.gzipper = gzipper
+        self.commit = commit
+
+    def read_header(self, path: str) -> dict:
+        """Parse the first header of a gzipped FASTQ file."""
+        with self.gzipper.open(path) as handle:
+            header_line = handle.readline().decode()
+        return self.parse_header(header_line)
+
+    def headers(self, paths: Iterable[str]) -> Dict[str, dict]:
+        """Return the parsed headers of FASTQ files by path, indexing files not seen before."""
+        return self._index(paths, skip_unreadable=False)
+
+    def add(self, paths: Iterable[str]):
+        """Index the headers of FASTQ files, files that can not be read are skipped."""
+        self._index(paths, skip_unreadable=True)
+
+    def _index(self, paths: Iterable[str], skip_unreadable: bool) -> Dict[str, dict]:
+        paths = list(paths)
+        indexed = self.store.fastq_headers([os.path.abspath(path) for path in paths])
+        read_paths = []
+        new_headers = {}
+        for path in paths:
+            abs_path = os.path.abspath(path)
+            record = indexed.get(abs_path)
+            try:
+                stat = os.stat(abs_path)
+                if record is None or (record.size, record.mtime) != (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    new_headers[abs_path] = (stat, self.read_header(path))
+            except (OSError, EOFError, UnicodeDecodeError) as error:
+                if not skip_unreadable:
+                    raise
+                LOG.warning("unable to index FASTQ header of %s: %s", path, error)
+                continue
+            read_paths.append(path)
+        if new_headers:
+            self._save(indexed, new_headers)
+        return {path: indexed[os.path.abspath(path)].to_header() for path in read_paths}
+
+    def _save(self, indexed: dict, new_headers: Dict[str, tuple]):
+        """Store new headers, without losing the pending changes of the caller on a conflict.
+
+        When another process indexed some of the files at the same time, the savepoint is rolled
+        back and the headers are written again on top of the records stored by the other process.
+        """
+        try:
+            self._save_in_savepoint(indexed, new_headers)
+        except IntegrityError:
+            LOG.debug("FASTQ headers indexed concurrently, updating the stored headers")
+            # the records of the failed savepoint are expired or no longer in the session
+            stored = self.store.fastq_headers(list(new_headers), lock=True)
+            indexed.update((path, stored.get(path)) for path in new_headers)
+            self._save_in_savepoint(indexed, new_headers)
+        if self.commit:
+            self.store.commit()
+
+    def _save_in_savepoint(self, indexed: dict, new_headers: Dict[str, tuple]):
+        with self.store.session.begin_nested():
+            for path, (stat, header) in new_headers.items():
+                indexed[path] = self._update(indexed.get(path), path, stat, header)
+
+    def _update(self, record, path: str, stat: os.stat_result, header: dict):
+        if record is None:
+            record = self.store.add_fastq_header(path, stat.st_size, stat.st_mtime_ns)
+            self.store.add(record)
+        record.size, record.mtime = stat.st_size, stat.st_mtime_ns
+        record.lane = header["lane"]
+        record.flowcell = header["flowcell"]
+        record.readnumber = header["readnumber"]
+        return record
@@ -0,0 +1,2 @@
+CREATE INDEX `ix_family_action_priority_ordered_at`
+ON `family` (`action`, `priority`, `ordered_at`);
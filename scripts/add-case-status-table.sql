@@ -0,0 +1,26 @@
+CREATE TABLE `case_status` (
+  `family_id` int(11) NOT NULL,
+  `total_samples` int(11) NOT NULL DEFAULT 0,
+  `total_external_samples` int(11) NOT NULL DEFAULT 0,
+  `samples_received` int(11) NOT NULL DEFAULT 0,
+  `samples_prepared` int(11) NOT NULL DEFAULT 0,
+  `samples_sequenced` int(11) NOT NULL DEFAULT 0,
+  `samples_delivered` int(11) NOT NULL DEFAULT 0,
+  `samples_invoiced` int(11) NOT NULL DEFAULT 0,
+  `samples_to_invoice` int(11) NOT NULL DEFAULT 0,
+  `samples_received_at` datetime DEFAULT NULL,
+  `samples_prepared_at` datetime DEFAULT NULL,
+  `samples_sequenced_at` datetime DEFAULT NULL,
+  `samples_delivered_at` datetime DEFAULT NULL,
+  `samples_invoiced_at` datetime DEFAULT NULL,
+  `max_tat` int(11) NOT NULL DEFAULT 0,
+  `flowcells` int(11) NOT NULL DEFAULT 0,
+  `flowcells_on_disk` int(11) NOT NULL DEFAULT 0,
+  `flowcell_statuses` varchar(128) DEFAULT NULL,
+  `data_analyses` text DEFAULT NULL,
+  `analysis_id` int(11) DEFAULT NULL,
+  `updated_at` datetime NOT NULL,
+  PRIMARY KEY (`family_id`),
+  CONSTRAINT `case_status_ibfk_1` FOREIGN KEY (`family_id`) REFERENCES `family` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `case_status_ibfk_2` FOREIGN KEY (`analysis_id`) REFERENCES `analysis` (`id`) ON DELETE SET NULL
+) ENGINE=InnoDB;
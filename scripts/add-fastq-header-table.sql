@@ -0,0 +1,11 @@
+CREATE TABLE `fastq_header` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `path_hash` varchar(40) NOT NULL UNIQUE,
+  `path` text NOT NULL,
+  `size` bigint(20) NOT NULL,
+  `mtime` bigint(20) NOT NULL,
+  `lane` varchar(8) DEFAULT NULL,
+  `flowcell` varchar(32) DEFAULT NULL,
+  `readnumber` varchar(8) DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
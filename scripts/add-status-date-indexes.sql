@@ -0,0 +1,23 @@
+CREATE INDEX `ix_sample_received_at_downsampled_to_ordered_at`
+ON `sample` (`received_at`, `downsampled_to`, `ordered_at`);
+
+CREATE INDEX `ix_sample_prepared_at_sequenced_at_downsampled_to_received_at`
+ON `sample` (`prepared_at`, `sequenced_at`, `downsampled_to`, `received_at`);
+
+CREATE INDEX `ix_sample_sequenced_at_downsampled_to_prepared_at`
+ON `sample` (`sequenced_at`, `downsampled_to`, `prepared_at`);
+
+CREATE INDEX `ix_sample_delivered_at_downsampled_to_sequenced_at`
+ON `sample` (`delivered_at`, `downsampled_to`, `sequenced_at`);
+
+CREATE INDEX `ix_sample_invoice_id_no_invoice_downsampled_to_delivered_at`
+ON `sample` (`invoice_id`, `no_invoice`, `downsampled_to`, `delivered_at`);
+
+CREATE INDEX `ix_family_ordered_at`
+ON `family` (`ordered_at`);
+
+CREATE INDEX `ix_analysis_uploaded_at_completed_at`
+ON `analysis` (`uploaded_at`, `completed_at`);
+
+CREATE INDEX `ix_analysis_family_id`
+ON `analysis` (`family_id`);
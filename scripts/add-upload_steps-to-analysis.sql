@@ -0,0 +1,2 @@
+ALTER TABLE `analysis`
+ADD COLUMN `_upload_steps` text DEFAULT NULL;
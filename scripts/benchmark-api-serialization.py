@@ -0,0 +1,142 @@
+"""Benchmark serializing API list responses from ORM objects against column projection.
+
+Usage:
+    python scripts/benchmark-api-serialization.py --rows 1000
+
+A temporary sqlite database is populated with families of three samples each. Every response is
+built three ways: to_dict() on lazily loaded ORM objects, to_dict() on objects fetched with a
+loader profile and the column projection of cg.server.projection.
+"""
+import datetime as dt
+import tempfile
+import time
+
+import click
+from sqlalchemy import event
+
+from cg.server import projection
+from cg.store import Store, models
+
+
+def populate(store: Store, nr_families: int, samples_per_family: int):
+    """Populate the store with families and samples using bulk inserts."""
+    now = dt.datetime.now()
+    customer_group = store.add_customer_group("all_customers", "all customers")
+    store.add_commit(customer_group)
+    customer = store.add_customer(
+        "cust000",
+        "Production",
+        customer_group=customer_group,
+        invoice_address="Test street",
+        invoice_reference="ABCDEF",
+    )
+    store.add_commit(customer)
+    application = store.add_application("WGSPCFC030", "wgs", "WGS", percent_kth=80)
+    store.add_commit(application)
+    prices = {"standard": 10, "priority": 20, "express": 30, "research": 5}
+    version = store.add_version(application, 1, valid_from=now, prices=prices)
+    store.add_commit(version)
+
+    families, samples, links = [], [], []
+    for family_nr in range(nr_families):
+        family_id = family_nr + 1
+        families.append(
+            dict(
+                id=family_id,
+                internal_id=f"case{family_id}",
+                name=f"case{family_id}",
+                priority=1,
+                _panels="OMIM-AUTO",
+                ordered_at=now,
+                customer_id=customer.id,
+            )
+        )
+        for sample_nr in range(samples_per_family):
+            sample_id = family_nr * samples_per_family + sample_nr + 1
+            samples.append(
+                dict(
+                    id=sample_id,
+                    internal_id=f"sample{sample_id}",
+                    name=f"sample{sample_id}",
+                    sex="unknown",
+                    priority=1,
+                    ordered_at=now,
+                    application_version_id=version.id,
+                    customer_id=customer.id,
+                )
+            )
+            links.append(dict(family_id=family_id, sample_id=sample_id, status="unknown"))
+    store.session.bulk_insert_mappings(models.Family, families)
+    store.session.bulk_insert_mappings(models.Sample, samples)
+    store.session.bulk_insert_mappings(models.FamilySample, links)
+    store.commit()
+
+
+def timed(store: Store, build_response) -> tuple:
+    """Build a response in a fresh session, return the seconds and queries it took."""
+    store.session.expunge_all()
+    statements = []
+
+    def count_query(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(store.engine, "before_cursor_execute", count_query)
+    start = time.perf_counter()
+    build_response()
+    elapsed = time.perf_counter() - start
+    event.remove(store.engine, "before_cursor_execute", count_query)
+    return elapsed, len(statements)
+
+
+@click.command()
+@click.option("--rows", "nr_rows", default=1000, show_default=True, help="rows per response")
+def benchmark(nr_rows):
+    """Time ORM hydration against column projection for list responses."""
+    with tempfile.NamedTemporaryFile(suffix=".sqlite3") as db_file:
+        store = Store(f"sqlite:///{db_file.name}")
+        store.create_all()
+        populate(store, nr_families=nr_rows, samples_per_family=3)
+
+        samples_q = models.Sample.query.order_by(models.Sample.id).limit(nr_rows)
+        families_q = models.Family.query.order_by(models.Family.id).limit(nr_rows)
+        responses = {
+            "samples": [
+                ("orm", lambda: [record.to_dict() for record in samples_q]),
+                (
+                    "orm + loader profile",
+                    lambda: [
+                        record.to_dict()
+                        for record in store.with_profile(samples_q, "sample_with_app")
+                    ],
+                ),
+                (
+                    "projection",
+                    lambda: projection.samples(projection.project(samples_q, models.Sample)),
+                ),
+            ],
+            "families with links": [
+                ("orm", lambda: [record.to_dict(links=True) for record in families_q]),
+                (
+                    "orm + loader profile",
+                    lambda: [
+                        record.to_dict(links=True)
+                        for record in store.with_profile(families_q, "case_with_samples")
+                    ],
+                ),
+                (
+                    "projection",
+                    lambda: projection.families(
+                        projection.project(families_q, models.Family), links=True
+                    ),
+                ),
+            ],
+        }
+        for response, builders in responses.items():
+            click.echo(f"{response} ({nr_rows} rows)")
+            for name, build_response in builders:
+                elapsed, nr_queries = timed(store, build_response)
+                click.echo(f"  {name:<22} {elapsed:6.2f} s {nr_queries:6} queries")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,103 @@
+"""Benchmark concatenating FASTQ files through user space against kernel copies.
+
+Usage:
+    python scripts/benchmark-fastq-concatenation.py --files 8 --file-size 256 --tmp-dir /scratch
+
+Synthetic files of random bytes, incompressible like gzipped FASTQs, are written for two reads.
+The reads are concatenated with shutil.copyfileobj, like FastqFileConcatenator did before, and
+with the kernel copies of FastqFileConcatenator, one read after the other and both reads at once.
+Each run includes syncing the output to disk. Run it on the filesystem of the balsamic root, with
+files larger than the page cache to measure the disks rather than memory.
+"""
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from cg.apps.balsamic.fastq import FastqFileConcatenator
+
+READS = (1, 2)
+
+
+def write_files(directory: Path, nr_files: int, file_size: int) -> dict:
+    """Write files of random bytes per read, return their paths."""
+    block = os.urandom(1024 * 1024)
+    read_files = {}
+    for read in READS:
+        read_files[read] = []
+        for file_nr in range(nr_files):
+            file_path = directory / f"S1_FC000{file_nr}_L001_R_{read}.fastq.gz"
+            with open(file_path, "wb") as file_:
+                for _ in range(file_size):
+                    file_.write(block)
+            read_files[read].append(file_path)
+    return read_files
+
+
+def copy_through_user_space(files: list, concat_file: Path):
+    """Concatenate like FastqFileConcatenator did before."""
+    with open(concat_file, "wb") as wfd:
+        for fil in files:
+            with open(fil, "rb") as file_descriptor:
+                shutil.copyfileobj(file_descriptor, wfd)
+
+
+def sequential(concatenate, read_files: dict, directory: Path):
+    for read, files in read_files.items():
+        concatenate(files, directory / f"concatenated_R_{read}.fastq.gz")
+
+
+def concurrent_reads(concatenate, read_files: dict, directory: Path):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(read_files)) as pool:
+        concatenations = [
+            pool.submit(concatenate, files, directory / f"concatenated_R_{read}.fastq.gz")
+            for read, files in read_files.items()
+        ]
+        for concatenation in concatenations:
+            concatenation.result()
+
+
+@click.command()
+@click.option("--files", "nr_files", default=8, show_default=True, help="files per read")
+@click.option("--file-size", default=128, show_default=True, help="MB per file")
+@click.option("--tmp-dir", type=click.Path(exists=True), help="directory to write the files in")
+def benchmark(nr_files, file_size, tmp_dir):
+    """Time FASTQ concatenation through user space against kernel copies."""
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        directory = Path(directory)
+        read_files = write_files(directory, nr_files, file_size)
+        total_mb = len(READS) * nr_files * file_size
+        click.echo(f"concatenating {total_mb} MB in {len(READS)} reads")
+        args = (read_files, directory)
+        for name, run in [
+            ("copyfileobj, reads in turn", lambda: sequential(copy_through_user_space, *args)),
+            (
+                "copyfileobj, concurrent reads",
+                lambda: concurrent_reads(copy_through_user_space, *args),
+            ),
+            (
+                "kernel copy, reads in turn",
+                lambda: sequential(FastqFileConcatenator.concatenate, *args),
+            ),
+            (
+                "kernel copy, concurrent reads",
+                lambda: concurrent_reads(FastqFileConcatenator.concatenate, *args),
+            ),
+        ]:
+            # start from clean disks, without the output or dirty pages of the previous run
+            for concatenated in directory.glob("concatenated_*"):
+                concatenated.unlink()
+            os.sync()
+            start = time.perf_counter()
+            run()
+            os.sync()
+            elapsed = time.perf_counter() - start
+            click.echo(f"  {name:<32} {elapsed:6.2f} s {total_mb / elapsed:8.0f} MB/s")
+
+
+if __name__ == "__main__":
+    benchmark()
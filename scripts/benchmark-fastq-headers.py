@@ -0,0 +1,76 @@
+"""Benchmark parsing FASTQ header lines with the split parser against the compiled patterns.
+
+Usage:
+    python scripts/benchmark-fastq-headers.py --headers 1000000
+
+Header lines are generated in the formats seen on the sequencers: Casava 1.8 with a single and a
+dual index, NovaSeq with a UMI in the read name, HiSeq X with the read number after a slash and
+the format from before Casava 1.8. The split parser is the one every workflow had a copy of before
+the parsers were shared, it does not recognize the NovaSeq headers with a UMI.
+"""
+import time
+
+import click
+
+from cg.utils.fastq import parse_header_lines
+
+HEADER_FORMATS = [
+    "@EAS139:136:FC706VJ:{lane}:2104:{x}:197393 1:Y:18:ATCACG\n",
+    "@A00621:130:HFWJMDSXX:{lane}:1101:{x}:1000 2:N:0:GATCAG+ACGTGA\n",
+    "@A00621:130:HFWJMDSXX:{lane}:1101:{x}:1000:ACGTACGT 1:N:0:GATCAG+ACGTGA\n",
+    "@ST-E00201:173:HCLCGALXX:{lane}:2106:{x}:34834/1\n",
+    "@HWUSI-EAS100R:{lane}:73:{x}:1973#0/1\n",
+]
+
+
+def split_parse_header(line: str) -> dict:
+    """Parse a header line like the workflows did before the parsers were shared."""
+    fastq_meta = {"lane": None, "flowcell": None, "readnumber": None}
+    parts = line.split(":")
+    if len(parts) == 5:
+        fastq_meta["lane"] = parts[1]
+        fastq_meta["flowcell"] = "XXXXXX"
+        fastq_meta["readnumber"] = parts[-1].split("/")[-1]
+    if len(parts) == 10:
+        fastq_meta["lane"] = parts[3]
+        fastq_meta["flowcell"] = parts[2]
+        fastq_meta["readnumber"] = parts[6].split(" ")[-1]
+    if len(parts) == 7:
+        fastq_meta["lane"] = parts[3]
+        fastq_meta["flowcell"] = parts[2]
+        fastq_meta["readnumber"] = parts[-1].split("/")[-1]
+    return fastq_meta
+
+
+def best_of(repeats: int, parse) -> tuple:
+    """Return the fastest of a number of runs in seconds and the parsed headers."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parsed = parse()
+        timings.append(time.perf_counter() - start)
+    return min(timings), parsed
+
+
+@click.command()
+@click.option("--headers", "nr_headers", default=1000000, show_default=True)
+@click.option("--repeats", default=3, show_default=True, help="report the fastest run")
+def benchmark(nr_headers, repeats):
+    """Time parsing header lines one by one with str.split against one batch."""
+    for header_format in HEADER_FORMATS:
+        lines = [
+            header_format.format(lane=nr % 8 + 1, x=nr % 30000 + 1000) for nr in range(nr_headers)
+        ]
+        click.echo(header_format.strip())
+        split_time, split_parsed = best_of(
+            repeats, lambda: [split_parse_header(line) for line in lines]
+        )
+        batch_time, batch_parsed = best_of(repeats, lambda: parse_header_lines(lines))
+        recognized = sum(1 for record in batch_parsed if record.lane is not None)
+        split_recognized = sum(1 for header in split_parsed if header["lane"] is not None)
+        click.echo(f"  split  {split_time:6.2f} s {split_recognized:>9} recognized")
+        click.echo(f"  batch  {batch_time:6.2f} s {recognized:>9} recognized")
+
+
+if __name__ == "__main__":
+    benchmark()
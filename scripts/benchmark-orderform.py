@@ -0,0 +1,143 @@
+"""Benchmark parsing a large orderform read-only with openpyxl against loading it with xlrd.
+
+Usage:
+    python scripts/benchmark-orderform.py --samples 1000
+
+The orderform is generated from the MIP orderform in the test fixtures, the first sample row is
+copied once per sample with trios as cases. The xlrd parser loads the whole workbook before the
+rows are parsed, like the order portal did before the rows were streamed.
+"""
+import re
+import tempfile
+import time
+import tracemalloc
+import warnings
+import zipfile
+from pathlib import Path
+
+import click
+import openpyxl
+import xlrd
+from openpyxl.utils import get_column_letter
+
+from cg.apps.lims import orderform
+
+TEMPLATE = Path(__file__).parent.parent / "tests" / "fixtures" / "orderforms" / "1508.20.mip.xlsx"
+TEMPLATE_SHEET = "xl/worksheets/sheet2.xml"
+ROW_PATTERN = re.compile(r'<row r="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+
+
+def renumber(row_xml: str, row_nr: int) -> str:
+    """Move a row and its cells to another row number."""
+    return re.sub(r'(<row r="|<c r="[A-Z]+)\d+"', lambda match: f'{match[1]}{row_nr}"', row_xml)
+
+
+def set_cell(row_xml: str, column: str, string_nr: int = None) -> str:
+    """Set a cell of a row to a shared string, clear it without a string."""
+    value = "/>" if string_nr is None else f' t="s"><v>{string_nr}</v></c>'
+    return re.sub(
+        rf'<c r="{column}(\d+)"( s="\d+")?[^>]*?(?:/>|>.*?</c>)',
+        lambda match: f'<c r="{column}{match[1]}"{match[2] or ""}{value}',
+        row_xml,
+    )
+
+
+def write_orderform(path: Path, nr_samples: int):
+    """Write an orderform with a number of samples in trios.
+
+    The rows are copied in the XML of the template, saving the workbook with openpyxl would
+    store the text in the cells instead of in the shared strings like Excel does.
+    """
+    with warnings.catch_warnings():
+        # the data validations of the template are not supported by openpyxl
+        warnings.simplefilter("ignore")
+        rows = list(openpyxl.load_workbook(TEMPLATE, read_only=True)["orderform"].values)
+    header = rows[next(nr for nr, row in enumerate(rows) if row[0] == "<TABLE HEADER>") + 1]
+    columns = {name: get_column_letter(nr) for nr, name in enumerate(header, start=1) if name}
+    # row numbers in the sheet start at 1
+    first_nr = next(nr for nr, row in enumerate(rows) if row[0] == "<SAMPLE ENTRIES>") + 2
+    end_nr = next(nr for nr, row in enumerate(rows) if row[0] == "</SAMPLE ENTRIES>") + 1
+
+    with zipfile.ZipFile(TEMPLATE) as template:
+        files = {name: template.read(name) for name in template.namelist()}
+    strings_xml = files["xl/sharedStrings.xml"].decode()
+    nr_strings = int(re.search(r'uniqueCount="(\d+)"', strings_xml)[1])
+    new_strings = [f"sample{nr}" for nr in range(nr_samples)]
+    new_strings += [f"family{nr}" for nr in range(0, nr_samples, 3)]
+    files["xl/sharedStrings.xml"] = re.sub(
+        r'uniqueCount="\d+"',
+        f'uniqueCount="{nr_strings + len(new_strings)}"',
+        strings_xml.replace(
+            "</sst>", "".join(f"<si><t>{text}</t></si>" for text in new_strings) + "</sst>"
+        ),
+    )
+
+    sheet_xml = files[TEMPLATE_SHEET].decode()
+    template_rows = {int(match[1]): match[0] for match in ROW_PATTERN.finditer(sheet_xml)}
+    sample_row = template_rows[first_nr]
+    for column in ("UDF/motherID", "UDF/fatherID"):
+        sample_row = set_cell(sample_row, columns[column])
+    new_rows = [template_rows[nr] for nr in sorted(template_rows) if nr < first_nr]
+    for sample_nr in range(nr_samples):
+        new_row = set_cell(sample_row, columns["Sample/Name"], nr_strings + sample_nr)
+        family_nr = nr_strings + nr_samples + sample_nr // 3
+        new_row = set_cell(new_row, columns["UDF/familyID"], family_nr)
+        new_rows.append(renumber(new_row, first_nr + sample_nr))
+    new_rows.append(renumber(template_rows[end_nr], first_nr + nr_samples))
+    sheet_xml = re.sub(
+        r"<sheetData>.*</sheetData>",
+        lambda match: "<sheetData>" + "".join(new_rows) + "</sheetData>",
+        sheet_xml,
+        flags=re.S,
+    )
+    files[TEMPLATE_SHEET] = re.sub(
+        r'(<dimension ref="[A-Z]+\d+:[A-Z]+)\d+',
+        lambda match: f"{match[1]}{first_nr + nr_samples}",
+        sheet_xml,
+    )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as orderform_file:
+        for name, content in files.items():
+            orderform_file.writestr(name, content)
+
+
+def parse_with_xlrd(path: Path) -> list:
+    """Load the whole workbook with xlrd and parse the sample rows."""
+    workbook = xlrd.open_workbook(str(path))
+    rows = ([cell.value for cell in row] for row in workbook.sheet_by_name("orderform").get_rows())
+    return [orderform.parse_sample(raw_sample) for raw_sample in orderform.relevant_rows(rows)]
+
+
+def measure(parse) -> tuple:
+    """Return the seconds of a parse, the peak of its traced memory in MB and the result.
+
+    The memory is traced in a second run, tracing slows down the parsing.
+    """
+    start = time.perf_counter()
+    result = parse()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    parse()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+@click.command()
+@click.option("--samples", "nr_samples", default=1000, show_default=True)
+def benchmark(nr_samples):
+    """Time parsing an orderform with xlrd against streaming it with openpyxl."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "1508.20.mip.xlsx"
+        write_orderform(path, nr_samples)
+        click.echo(f"{nr_samples} samples, {path.stat().st_size / 1024:.0f} kB")
+
+        xlrd_time, xlrd_peak, samples = measure(lambda: parse_with_xlrd(path))
+        click.echo(f"  xlrd      {xlrd_time:6.2f} s {xlrd_peak:7.1f} MB {len(samples):>6} samples")
+        stream_time, stream_peak, data = measure(lambda: orderform.parse_orderform(str(path)))
+        nr_parsed = sum(len(case["samples"]) for case in data["items"])
+        click.echo(f"  openpyxl  {stream_time:6.2f} s {stream_peak:7.1f} MB {nr_parsed:>6} samples")
+
+
+if __name__ == "__main__":
+    benchmark()
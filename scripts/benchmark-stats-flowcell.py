@@ -0,0 +1,106 @@
+"""Benchmark the cgstats flowcell summary against querying and globbing sample by sample.
+
+Usage:
+    python scripts/benchmark-stats-flowcell.py --samples 400
+
+A temporary demux tree and sqlite cgstats database are populated with the samples spread over the
+lanes of one flowcell. The summary is built sample by sample, with the per sample queries and
+globs StatsAPI.flowcell used before, and with StatsAPI.flowcell.
+"""
+import datetime as dt
+import tempfile
+import time
+from pathlib import Path
+
+import click
+from sqlalchemy import event
+
+from cg.apps.stats import StatsAPI
+
+FLOWCELL = "HJKMYBCXX"
+LANES = 8
+
+
+def populate(stats_api: StatsAPI, root: Path, nr_samples: int):
+    """Add the samples to the database and their FASTQ files to the demux tree."""
+    project_dir = root / f"160219_D00410_0217_A{FLOWCELL}" / "Unaligned" / "Project_337334"
+    project = stats_api.Project(projectname="337334", time=dt.datetime.now())
+    datasource = stats_api.Datasource(document_path="NA", document_type="html")
+    datasource.supportparams = stats_api.Supportparams(document_path="NA", idstring="NA")
+    demux = stats_api.Demux()
+    demux.datasource = datasource
+    demux.flowcell = stats_api.Flowcell(
+        flowcellname=FLOWCELL, flowcell_pos="A", hiseqtype="hiseqx", time=dt.datetime.now()
+    )
+    for sample_nr in range(nr_samples):
+        samplename = f"ACC{sample_nr}A1_XTC{sample_nr:03}"
+        sample = stats_api.Sample(samplename=samplename, limsid=samplename)
+        sample.project = project
+        lane = sample_nr % LANES + 1
+        unaligned = stats_api.Unaligned(lane=lane, readcounts=1000000, q30_bases_pct=85)
+        unaligned.sample = sample
+        unaligned.demux = demux
+        stats_api.add(unaligned)
+
+        sample_dir = project_dir / f"Sample_{samplename}"
+        sample_dir.mkdir(parents=True)
+        for read in (1, 2):
+            (sample_dir / f"{samplename}_L00{lane}_R{read}_001.fastq.gz").touch()
+    stats_api.commit()
+
+
+def sample_by_sample(stats_api: StatsAPI) -> list:
+    """Summarize the flowcell with queries and globs per sample."""
+    record = stats_api.Flowcell.query.filter_by(flowcellname=FLOWCELL).first()
+    samples = []
+    for sample_obj in stats_api.flowcell_samples(record):
+        sample_data = {"name": sample_obj.samplename, "reads": 0, "fastqs": []}
+        for fc_data in stats_api.sample_reads(sample_obj):
+            sample_data["reads"] += fc_data.reads
+            for fastq_path in stats_api.fastqs(fc_data.name, sample_obj):
+                if stats_api.is_lane_pooled(flowcell_obj=record, lane=fc_data.lane):
+                    if "Undetermined" in str(fastq_path):
+                        continue
+                sample_data["fastqs"].append(str(fastq_path))
+        samples.append(sample_data)
+    return samples
+
+
+def timed(stats_api: StatsAPI, summarize) -> tuple:
+    """Summarize the flowcell in a fresh session, return the seconds and queries it took."""
+    stats_api.session.expunge_all()
+    statements = []
+
+    def count_query(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(stats_api.engine, "before_cursor_execute", count_query)
+    start = time.perf_counter()
+    summarize()
+    elapsed = time.perf_counter() - start
+    event.remove(stats_api.engine, "before_cursor_execute", count_query)
+    return elapsed, len(statements)
+
+
+@click.command()
+@click.option("--samples", "nr_samples", default=400, show_default=True, help="samples on flowcell")
+def benchmark(nr_samples):
+    """Time the flowcell summary sample by sample against the set based summary."""
+    with tempfile.TemporaryDirectory() as root, tempfile.NamedTemporaryFile(
+        suffix=".sqlite3"
+    ) as db_file:
+        stats_api = StatsAPI({"cgstats": {"database": f"sqlite:///{db_file.name}", "root": root}})
+        stats_api.create_all()
+        populate(stats_api, Path(root), nr_samples)
+
+        click.echo(f"flowcell summary ({nr_samples} samples)")
+        for name, summarize in [
+            ("sample by sample", lambda: sample_by_sample(stats_api)),
+            ("StatsAPI.flowcell", lambda: stats_api.flowcell(FLOWCELL)),
+        ]:
+            elapsed, nr_queries = timed(stats_api, summarize)
+            click.echo(f"  {name:<18} {elapsed:6.2f} s {nr_queries:6} queries")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,147 @@
+"""Benchmark StatusHandler.cases() on a synthetic statusdb.
+
+Usage:
+    python scripts/benchmark-status-cases.py --cases 50000
+
+The database is built in a temporary sqlite file unless a database URI is given, in which case
+the tables are created and populated there. Each sample is received, prepared, sequenced and
+delivered with a random lag and every other case has an analysis. cases() is called twice, the
+first call summarizes every case into the case status table like `cg status rebuild`.
+"""
+import datetime as dt
+import logging
+import random
+import tempfile
+import time
+
+import click
+from sqlalchemy import event
+
+from cg.store import Store, models
+
+LOG = logging.getLogger(__name__)
+CHUNK_SIZE = 5000
+
+
+def populate(store: Store, nr_cases: int, samples_per_case: int, seed: int):
+    """Populate the store with synthetic cases using bulk inserts."""
+    rnd = random.Random(seed)
+    now = dt.datetime.now()
+    customer_group = store.add_customer_group("all_customers", "all customers")
+    store.add_commit(customer_group)
+    customer = store.add_customer(
+        "cust000",
+        "Production",
+        customer_group=customer_group,
+        invoice_address="Test street",
+        invoice_reference="ABCDEF",
+    )
+    store.add_commit(customer)
+    application = store.add_application(
+        "WGSPCFC030", "wgs", "WGS", percent_kth=80, turnaround_time=10
+    )
+    store.add_commit(application)
+    prices = {"standard": 10, "priority": 20, "express": 30, "research": 5}
+    version = store.add_version(application, 1, valid_from=now, prices=prices)
+    store.add_commit(version)
+    flowcell = store.add_flowcell("HJKMYBCXX", "A00689", "novaseq", now)
+    store.add_commit(flowcell)
+
+    def lagged(date):
+        return None if date is None or rnd.random() < 0.1 else date + dt.timedelta(days=2)
+
+    for chunk_start in range(0, nr_cases, CHUNK_SIZE):
+        chunk = range(chunk_start, min(chunk_start + CHUNK_SIZE, nr_cases))
+        families, samples, links, analyses, flowcell_samples = [], [], [], [], []
+        for case_nr in chunk:
+            family_id = case_nr + 1
+            ordered_at = now - dt.timedelta(days=rnd.randint(0, 365))
+            families.append(
+                dict(
+                    id=family_id,
+                    internal_id=f"case{family_id}",
+                    name=f"case{family_id}",
+                    priority=1,
+                    ordered_at=ordered_at,
+                    customer_id=customer.id,
+                )
+            )
+            for sample_nr in range(samples_per_case):
+                sample_id = case_nr * samples_per_case + sample_nr + 1
+                received_at = lagged(ordered_at)
+                prepared_at = lagged(received_at)
+                sequenced_at = lagged(prepared_at)
+                samples.append(
+                    dict(
+                        id=sample_id,
+                        internal_id=f"sample{sample_id}",
+                        name=f"sample{sample_id}",
+                        sex="unknown",
+                        ordered_at=ordered_at,
+                        received_at=received_at,
+                        prepared_at=prepared_at,
+                        sequenced_at=sequenced_at,
+                        delivered_at=lagged(sequenced_at),
+                        data_analysis="MIP",
+                        application_version_id=version.id,
+                        customer_id=customer.id,
+                    )
+                )
+                links.append(dict(family_id=family_id, sample_id=sample_id, status="unknown"))
+                if sequenced_at:
+                    flowcell_samples.append(dict(flowcell_id=flowcell.id, sample_id=sample_id))
+            if case_nr % 2:
+                analyses.append(
+                    dict(
+                        family_id=family_id,
+                        pipeline="mip",
+                        completed_at=now,
+                        uploaded_at=now,
+                        created_at=now,
+                    )
+                )
+        store.session.bulk_insert_mappings(models.Family, families)
+        store.session.bulk_insert_mappings(models.Sample, samples)
+        store.session.bulk_insert_mappings(models.FamilySample, links)
+        store.session.bulk_insert_mappings(models.Analysis, analyses)
+        store.session.execute(models.flowcell_sample.insert(), flowcell_samples)
+        store.commit()
+        LOG.info("added %s cases", chunk[-1] + 1)
+
+
+@click.command()
+@click.option("-d", "--database", help="URI of an empty database, defaults to a temporary sqlite")
+@click.option("--cases", "nr_cases", default=50000, show_default=True, help="number of cases")
+@click.option("--samples", "samples_per_case", default=3, show_default=True, help="per case")
+@click.option("--days", default=0, show_default=True, help="days to go back, 0 for all cases")
+@click.option("--seed", default=1, show_default=True, help="seed for the random dates")
+def benchmark(database, nr_cases, samples_per_case, days, seed):
+    """Time StatusHandler.cases() on a synthetic database."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with tempfile.NamedTemporaryFile(suffix=".sqlite3") as db_file:
+        store = Store(database or f"sqlite:///{db_file.name}")
+        store.create_all()
+        if store.engine.name == "sqlite":
+            # InnoDB indexes foreign keys implicitly, sqlite does not
+            store.session.execute("CREATE INDEX ix_analysis_family_id ON analysis (family_id)")
+        populate(store, nr_cases, samples_per_case, seed)
+
+        for call in ("first call, summarizes every case", "summarized cases"):
+            nr_queries = []
+
+            def count_query(*args):
+                nr_queries.append(args[2])
+
+            event.listen(store.engine, "before_cursor_execute", count_query)
+            start = time.perf_counter()
+            cases = store.cases(days=days)
+            elapsed = time.perf_counter() - start
+            event.remove(store.engine, "before_cursor_execute", count_query)
+            click.echo(
+                f"cases() {call}: {len(cases)} cases in {elapsed:.2f} s "
+                f"using {len(nr_queries)} queries"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
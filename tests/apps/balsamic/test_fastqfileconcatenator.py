@@ -1,4 +1,9 @@
 """Test FastqFileConcatenator"""
+import errno
+import os
+
+import pytest
+
 from cg.apps.balsamic.fastq import FastqFileConcatenator
 
 
@@ -19,3 +24,88 @@ def test_concatenate(tmpdir, simple_files, files_content):
         file_content = file.read()
 
     assert files_content == file_content
+
+
+def unsupported_copy(*args):
+    """A kernel copy that is not supported for the files"""
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+@pytest.mark.parametrize(
+    "unsupported",
+    [[], ["copy_file_range"], ["copy_file_range", "sendfile"]],
+    ids=["copy_file_range", "sendfile", "user space"],
+)
+def test_concatenate_falls_back(tmpdir, simple_files, files_content, monkeypatch, unsupported):
+    """Test that files are concatenated when the kernel copies are not supported"""
+
+    # given files to concatenate and kernel copies that are not supported
+    for copy_function in unsupported:
+        monkeypatch.setattr(os, copy_function, unsupported_copy, raising=False)
+    concatenated_filepath = tmpdir + "/concatenated.fastq.gz"
+
+    # when calling the method to concatenate
+    FastqFileConcatenator.concatenate(simple_files, concatenated_filepath)
+
+    # then we get the concatenation of the files
+    with open(concatenated_filepath, "rt") as file:
+        assert file.read() == files_content
+
+
+def empty_copy(*args):
+    """A kernel copy that copies nothing, like on filesystems that do not support it"""
+    return 0
+
+
+@pytest.mark.parametrize(
+    "empty", [["copy_file_range"], ["copy_file_range", "sendfile"]], ids=["sendfile", "user space"],
+)
+def test_concatenate_falls_back_after_empty_copy(
+    tmpdir, simple_files, files_content, monkeypatch, empty
+):
+    """Test that files are concatenated when a kernel copy copies nothing of a file"""
+
+    # given files to concatenate and kernel copies that copy nothing
+    for copy_function in empty:
+        monkeypatch.setattr(os, copy_function, empty_copy, raising=False)
+    concatenated_filepath = tmpdir + "/concatenated.fastq.gz"
+
+    # when calling the method to concatenate
+    FastqFileConcatenator.concatenate(simple_files, concatenated_filepath)
+
+    # then we get the concatenation of the files
+    with open(concatenated_filepath, "rt") as file:
+        assert file.read() == files_content
+
+
+def test_concatenate_raises_on_short_copy(tmpdir, simple_files, monkeypatch):
+    """Test that a copy that misses a part of a file fails the concatenation"""
+
+    # given a copy that copies only a part of the files
+    monkeypatch.setattr(FastqFileConcatenator, "copy_file", lambda source, target: 0)
+    concatenated_filepath = tmpdir + "/concatenated.fastq.gz"
+
+    # when calling the method to concatenate
+    # then it raises an error about the size of the copy
+    with pytest.raises(OSError, match="Copied 0 of"):
+        FastqFileConcatenator.concatenate(simple_files, concatenated_filepath)
+
+
+def test_copy_file_appends(tmpdir):
+    """Test that a copied file is appended after the content of the target"""
+
+    # given a large source file and a target with some content
+    source_path = tmpdir / "source.fastq.gz"
+    source_content = os.urandom(3 * 1024 * 1024)
+    source_path.write_binary(source_content)
+    target_path = tmpdir / "target.fastq.gz"
+
+    # when copying the source to the target after writing to the target
+    with open(target_path, "wb", buffering=0) as target:
+        target.write(b"head")
+        with open(source_path, "rb", buffering=0) as source:
+            copied = FastqFileConcatenator.copy_file(source, target)
+
+    # then the whole source is appended to the target
+    assert copied == len(source_content)
+    assert target_path.read_binary() == b"head" + source_content
@@ -1,7 +1,9 @@
 """Tests for chanjo coverage api"""
-
+import json
 from pathlib import Path
 
+import pytest
+
 from cg.apps.coverage.api import ChanjoAPI
 from cg.utils.commands import Process
 
@@ -173,3 +175,81 @@ def test_chanjo_api_coverage(chanjo_config_dict, mocker, mock_process):
     # the sample
     assert samples["mean_coverage"] == mean_coverage
     assert samples["mean_completeness"] == mean_completeness
+
+
+class RecordingProcess(Process):
+    """Process that records the commands and answers with the coverage of the samples"""
+
+    commands = []
+
+    def run_command(self, parameters=None):
+        self.commands.append(parameters)
+        sample_ids = [parameters[nr + 1] for nr, value in enumerate(parameters) if value == "-s"]
+        self.stdout = json.dumps(
+            {
+                sample_id: {"mean_coverage": 30.0, "mean_completeness": 99.0}
+                for sample_id in sample_ids
+                if sample_id != "unknown"
+            }
+        )
+
+
+@pytest.fixture(name="recording_api")
+def fixture_recording_api(chanjo_config_dict, mocker) -> ChanjoAPI:
+    """Return a chanjo api that records the commands it runs"""
+    RecordingProcess.commands = []
+    mocker.patch("cg.apps.coverage.api.Process", RecordingProcess)
+    return ChanjoAPI(chanjo_config_dict)
+
+
+def test_samples_coverage_in_one_call(recording_api):
+    # GIVEN samples of a case, one of them without coverage in chanjo
+
+    # WHEN calculating the coverage of a gene panel for the samples
+    coverage = recording_api.samples_coverage(["ADM1", "ADM2", "unknown"], ["123", "456"])
+
+    # THEN chanjo should be called once for all samples
+    assert len(RecordingProcess.commands) == 1
+    assert RecordingProcess.commands[0][:8] == [
+        "calculate",
+        "coverage",
+        "-s",
+        "ADM1",
+        "-s",
+        "ADM2",
+        "-s",
+        "unknown",
+    ]
+    assert coverage["ADM1"]["mean_coverage"] == 30.0
+    assert coverage["unknown"] is None
+
+
+def test_samples_coverage_is_cached(recording_api):
+    # GIVEN the coverage of a sample calculated for a set of genes
+    recording_api.samples_coverage(["ADM1"], ["123", "456"])
+
+    # WHEN calculating it again with the genes in another order and for a new sample
+    coverage = recording_api.samples_coverage(["ADM1", "ADM2"], ["456", "123"])
+
+    # THEN chanjo should only be called for the new sample
+    assert RecordingProcess.commands[1][:4] == ["calculate", "coverage", "-s", "ADM2"]
+    assert set(coverage) == {"ADM1", "ADM2"}
+
+    # WHEN the coverage is calculated for other genes
+    recording_api.samples_coverage(["ADM1"], ["789"])
+
+    # THEN chanjo should be called again
+    assert len(RecordingProcess.commands) == 3
+
+
+def test_upload_drops_cached_coverage(recording_api):
+    # GIVEN the cached coverage of a sample
+    recording_api.sample_coverage("ADM1", ["123"])
+
+    # WHEN the coverage of the sample is uploaded again
+    recording_api.upload("ADM1", "sample", "case", "case name", "coverage.bed")
+    recording_api.sample_coverage("ADM1", ["123"])
+
+    # THEN the coverage should be calculated again
+    calculations = [command for command in RecordingProcess.commands if command[0] == "calculate"]
+    assert len(calculations) == 2
@@ -64,3 +64,15 @@ def test_get_bundle(housekeeper_api, minimal_bundle_obj):
     # THEN assert that a bundle was fetched
     assert bundle_obj
     assert bundle_obj.name == bundle_name
+
+
+def test_bundles_by_name(populated_housekeeper_api, case_id):
+    """Test to fetch bundles by name"""
+    # GIVEN a housekeeper api with a bundle
+
+    # WHEN fetching the bundle and a missing bundle by name
+    bundles = populated_housekeeper_api.bundles_by_name([case_id, "missing"])
+
+    # THEN only the existing bundle should be returned with its versions
+    assert list(bundles) == [case_id]
+    assert bundles[case_id].versions
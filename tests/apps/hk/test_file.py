@@ -110,3 +110,33 @@ def test_get_include_file(populated_housekeeper_api, case_id):
     assert included_path.exists() is True
     # THEN assert that the file path has been updated
     assert included_file.path != original_path
+
+
+def test_existing_paths(populated_housekeeper_api, bed_file):
+    """Test to find which paths are already stored as files"""
+    # GIVEN a housekeeper api with a stored bed file
+
+    # WHEN checking the bed file and a new file
+    existing = populated_housekeeper_api.existing_paths([bed_file, "new.fastq.gz"])
+
+    # THEN only the bed file should be returned
+    assert existing == {bed_file}
+
+
+def test_add_files_bulk(populated_housekeeper_api, case_id):
+    """Test to insert files with tags in bulk"""
+    # GIVEN the version of a bundle and a tag
+    version_obj = populated_housekeeper_api.last_version(bundle=case_id)
+    tag_obj = populated_housekeeper_api.add_tag("fastq")
+    paths = ["a_R1.fastq.gz", "a_R2.fastq.gz"]
+
+    # WHEN adding files in bulk and committing
+    populated_housekeeper_api.add_files_bulk(
+        [(version_obj, path) for path in paths], tags=[tag_obj]
+    )
+    populated_housekeeper_api.commit()
+
+    # THEN the files should be stored in the version with the tag
+    fastq_files = populated_housekeeper_api.files(bundle=case_id, tags=["fastq"])
+    assert sorted(file_obj.path for file_obj in fastq_files) == paths
+    assert all(file_obj.version == version_obj for file_obj in fastq_files)
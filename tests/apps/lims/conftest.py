@@ -1,4 +1,10 @@
 """Fixtures for lims tests"""
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree
 
 import pytest
 
@@ -40,3 +46,185 @@ def skeleton_orderform_sample():
         "UDF/customer": "",
         "Sample/Name": "",
     }
+
+
+STUB_NAMESPACES = (
+    'xmlns:smp="http://genologics.com/ri/sample" xmlns:prj="http://genologics.com/ri/project" '
+    'xmlns:art="http://genologics.com/ri/artifact" xmlns:prc="http://genologics.com/ri/process" '
+    'xmlns:udf="http://genologics.com/ri/userdefined" xmlns:exc="http://genologics.com/ri/exception"'
+)
+NOT_FOUND = f"<exc:exception {STUB_NAMESPACES}><message>not found</message></exc:exception>"
+
+
+class LimsStub(ThreadingMixIn, HTTPServer):
+    """Local http server answering like the LIMS REST api for a few samples"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), LimsStubHandler)
+        self.base_uri = f"http://127.0.0.1:{self.server_port}/api/v2"
+        self.samples = {}
+        self.projects = {}
+        self.artifacts = {}
+        self.processes = {}
+        self.process_modified = {}
+        self.requests = Counter()
+
+    def add_sample(self, lims_id: str, project_id: str = "PRJ1", **udfs):
+        """Add a sample with a project and udfs, without a project like a control"""
+        project = ""
+        if project_id:
+            self.projects[project_id] = (
+                f'<prj:project {STUB_NAMESPACES} uri="{self.base_uri}/projects/{project_id}" '
+                f'limsid="{project_id}"><name>{project_id}</name>'
+                "<open-date>2020-01-01</open-date></prj:project>"
+            )
+            project = (
+                f'<project uri="{self.base_uri}/projects/{project_id}" limsid="{project_id}"/>'
+            )
+        fields = "".join(
+            f'<udf:field type="{"Date" if name.endswith(" at") else "String"}" name="{name}">'
+            f"{value}</udf:field>"
+            for name, value in udfs.items()
+        )
+        self.samples[lims_id] = (
+            f'<smp:sample {STUB_NAMESPACES} uri="{self.base_uri}/samples/{lims_id}" '
+            f'limsid="{lims_id}"><name>{lims_id}-name</name>{project}{fields}</smp:sample>'
+        )
+
+    def add_method(self, lims_id: str, process_type: str, method: str, version: str):
+        """Add an artifact of the sample made by a process with a method document"""
+        artifact_id = f"ART{len(self.artifacts) + 1}"
+        process_uri = f"{self.base_uri}/processes/PRC{artifact_id}"
+        self.artifacts[(process_type, lims_id)] = (
+            f'<art:artifact {STUB_NAMESPACES} uri="{self.base_uri}/artifacts/{artifact_id}" '
+            f'limsid="{artifact_id}"><name>{artifact_id}</name>'
+            f'<parent-process uri="{process_uri}" limsid="PRC{artifact_id}"/></art:artifact>'
+        )
+        self.processes[f"PRC{artifact_id}"] = (
+            f'<prc:process {STUB_NAMESPACES} uri="{process_uri}" limsid="PRC{artifact_id}">'
+            "<date-run>2020-01-02</date-run>"
+            f'<udf:field type="String" name="Method">{method}</udf:field>'
+            f'<udf:field type="String" name="Method Version">{version}</udf:field></prc:process>'
+        )
+
+    def add_process(self, process_id: str, modified_at: str, inputs: dict):
+        """Add a process modified at a time with input artifacts of samples, by artifact id"""
+        input_output_maps = ""
+        for artifact_id, lims_id in inputs.items():
+            artifact_uri = f"{self.base_uri}/artifacts/{artifact_id}"
+            self.artifacts[("input", artifact_id)] = (
+                f'<art:artifact {STUB_NAMESPACES} uri="{artifact_uri}" limsid="{artifact_id}">'
+                f'<name>{artifact_id}</name><sample uri="{self.base_uri}/samples/{lims_id}" '
+                f'limsid="{lims_id}"/></art:artifact>'
+            )
+            input_output_maps += (
+                f'<input-output-map><input uri="{artifact_uri}" limsid="{artifact_id}"/>'
+                "</input-output-map>"
+            )
+        self.processes[process_id] = (
+            f'<prc:process {STUB_NAMESPACES} uri="{self.base_uri}/processes/{process_id}" '
+            f'limsid="{process_id}">{input_output_maps}</prc:process>'
+        )
+        self.process_modified[process_id] = modified_at
+
+    def artifacts_by_id(self) -> dict:
+        """Return the artifacts by LIMS id"""
+        return {
+            ElementTree.fromstring(artifact).attrib["limsid"]: artifact
+            for artifact in self.artifacts.values()
+        }
+
+
+class LimsStubHandler(BaseHTTPRequestHandler):
+    """Serve the entities of a LimsStub"""
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def do_GET(self):
+        stub = self.server
+        url = urlparse(self.path)
+        entity, _, lims_id = url.path.replace("/api/v2/", "").partition("/")
+        stub.requests[f"GET {entity}"] += 1
+        if entity == "artifacts" and not lims_id:
+            query = parse_qs(url.query)
+            artifact = stub.artifacts.get((query["process-type"][0], query["samplelimsid"][0]))
+            links = ElementTree.fromstring(artifact).attrib if artifact else None
+            node = f'<artifact uri="{links["uri"]}" limsid="{links["limsid"]}"/>' if links else ""
+            return self.reply(f"<art:artifacts {STUB_NAMESPACES}>{node}</art:artifacts>")
+        if entity == "processes" and not lims_id:
+            since = parse_qs(url.query)["last-modified"][0]
+            nodes = "".join(
+                f'<process uri="{stub.base_uri}/processes/{process_id}" limsid="{process_id}"/>'
+                for process_id, modified_at in stub.process_modified.items()
+                if modified_at >= since
+            )
+            return self.reply(f"<prc:processes {STUB_NAMESPACES}>{nodes}</prc:processes>")
+        entities = {
+            "samples": stub.samples,
+            "projects": stub.projects,
+            "processes": stub.processes,
+            "artifacts": stub.artifacts_by_id(),
+        }
+        body = entities.get(entity, {}).get(lims_id)
+        if body is None:
+            return self.reply(NOT_FOUND, 404)
+        return self.reply(body)
+
+    def do_PUT(self):
+        stub = self.server
+        url = urlparse(self.path)
+        entity, _, lims_id = url.path.replace("/api/v2/", "").partition("/")
+        stub.requests[f"PUT {entity}"] += 1
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if entity == "samples":
+            stub.samples[lims_id] = body
+        return self.reply(body)
+
+    def do_POST(self):
+        stub = self.server
+        path = self.path.replace("/api/v2/", "")
+        stub.requests[f"POST {path}"] += 1
+        entity = path.split("/")[0]
+        entities, prefix = {
+            "samples": (stub.samples, "smp"),
+            "artifacts": (stub.artifacts_by_id(), "art"),
+        }[entity]
+        links = ElementTree.fromstring(self.rfile.read(int(self.headers["Content-Length"])))
+        lims_ids = [link.attrib["uri"].split("/")[-1] for link in links]
+        if any(lims_id not in entities for lims_id in lims_ids):
+            return self.reply(NOT_FOUND, 404)
+        details = "".join(entities[lims_id] for lims_id in lims_ids)
+        return self.reply(f"<{prefix}:details {STUB_NAMESPACES}>{details}</{prefix}:details>")
+
+
+@pytest.fixture(name="lims_stub")
+def fixture_lims_stub() -> LimsStub:
+    """Return a running LIMS stub server"""
+    stub = LimsStub()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture(name="stub_lims_api")
+def fixture_stub_lims_api(lims_stub: LimsStub) -> LimsAPI:
+    """Return a lims api talking to the LIMS stub"""
+    config = {
+        "lims": {
+            "host": lims_stub.base_uri[: -len("/api/v2")],
+            "username": "user",
+            "password": "pass",
+        }
+    }
+    return LimsAPI(config)
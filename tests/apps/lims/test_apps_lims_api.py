@@ -1,10 +1,12 @@
 """Test the Lims api"""
 import datetime as dt
 
+import pytest
 from requests.exceptions import HTTPError
 
 import cg
 from cg.apps.lims.api import LimsAPI
+from cg.exc import LimsDataError
 
 
 def test_get_received_date(lims_api, mocker):
@@ -174,3 +176,140 @@ def test_get_processing_time_for_no_delivered_time(lims_api, mocker):
 
     # THEN return value is none
     assert processing_time is None
+
+
+def test_samples_bulk(lims_stub, stub_lims_api):
+    """Test to fetch several samples with all their dates in one batch request"""
+    # GIVEN a LIMS with two samples in the same project
+    lims_stub.add_sample("ACC1", customer="cust000", **{"Received at": "2020-01-03"})
+    lims_stub.add_sample("ACC2", customer="cust000", **{"Delivered at": "2020-01-04"})
+
+    # WHEN fetching the samples in bulk
+    samples = stub_lims_api.samples_bulk(["ACC1", "ACC2"])
+
+    # THEN the samples should be exported with their dates
+    assert samples["ACC1"]["customer"] == "cust000"
+    assert samples["ACC1"]["received"] == dt.date(2020, 1, 3)
+    assert samples["ACC1"]["delivered"] is None
+    assert samples["ACC2"]["delivered"] == dt.date(2020, 1, 4)
+    assert samples["ACC2"]["project"]["name"] == "PRJ1"
+    # THEN the samples should be fetched with one batch request and the project once
+    assert lims_stub.requests == {"POST samples/batch/retrieve": 1, "GET projects": 1}
+
+
+def test_samples_bulk_missing_sample(lims_stub, stub_lims_api):
+    """Test that samples missing in LIMS are left out when fetching in bulk"""
+    # GIVEN a LIMS with one of the requested samples
+    lims_stub.add_sample("ACC1")
+
+    # WHEN fetching an existing and a missing sample in bulk
+    samples = stub_lims_api.samples_bulk(["ACC1", "missing"])
+
+    # THEN only the existing sample should be returned
+    assert list(samples) == ["ACC1"]
+
+
+def test_samples_bulk_without_project(lims_stub, stub_lims_api):
+    """Test that samples without a project, like controls, are fetched in bulk"""
+    # GIVEN a LIMS with a sample in a project and a control without a project
+    lims_stub.add_sample("ACC1")
+    lims_stub.add_sample("CTRL1", project_id=None)
+
+    # WHEN fetching the samples in bulk
+    samples = stub_lims_api.samples_bulk(["ACC1", "CTRL1"])
+
+    # THEN both samples should be returned, the control without a project
+    assert samples["ACC1"]["project"]["name"] == "PRJ1"
+    assert samples["CTRL1"]["project"] is None
+
+
+def test_samples_bulk_methods(lims_stub, stub_lims_api):
+    """Test to fetch the methods of samples in bulk"""
+    # GIVEN a sample prepared with a method
+    lims_stub.add_sample("ACC1")
+    lims_stub.add_method("ACC1", "CG002 - Microbial Library Prep (Nextera)", "1464", "3")
+
+    # WHEN fetching the sample with methods in bulk
+    samples = stub_lims_api.samples_bulk(["ACC1"], methods=True)
+
+    # THEN the prep method should be returned and the other methods should be missing
+    assert samples["ACC1"]["prep_method"] == (
+        "1464:3 - Automated TruSeq DNA PCR-free library preparation method"
+    )
+    assert samples["ACC1"]["sequencing_method"] is None
+
+
+def test_sample_is_cached(lims_stub, stub_lims_api):
+    """Test that fetching a sample again is served from the cache"""
+    # GIVEN a sample that has been fetched
+    lims_stub.add_sample("ACC1", Gender="M")
+    stub_lims_api.sample("ACC1")
+
+    # WHEN fetching the sample again
+    sample = stub_lims_api.sample("ACC1")
+
+    # THEN the sample should be returned without requesting LIMS again
+    assert sample["sex"] == "male"
+    assert lims_stub.requests == {"GET samples": 1, "GET projects": 1}
+    assert stub_lims_api.cache.hits
+
+
+def test_update_sample_invalidates_cache(lims_stub, stub_lims_api):
+    """Test that an updated sample is fetched again from LIMS"""
+    # GIVEN a sample that has been fetched
+    lims_stub.add_sample("ACC1", Gender="M")
+    stub_lims_api.sample("ACC1")
+
+    # WHEN updating the sex of the sample
+    stub_lims_api.update_sample("ACC1", sex="female")
+
+    # THEN the updated sample should be fetched from LIMS
+    assert stub_lims_api.sample("ACC1")["sex"] == "female"
+    assert lims_stub.requests["GET samples"] == 2
+
+
+def test_cached_response_is_not_changed_by_entities(lims_stub, stub_lims_api):
+    """Test that changing the XML of a fetched entity leaves the cached response as it was"""
+    # GIVEN a sample response that has been fetched and changed
+    lims_stub.add_sample("ACC1", Gender="M")
+    uri = f"{lims_stub.base_uri}/samples/ACC1"
+    stub_lims_api.get(uri).find("name").text = "changed"
+
+    # WHEN fetching the sample response again
+    root = stub_lims_api.get(uri)
+
+    # THEN the response should be served from the cache as LIMS returned it
+    assert root.find("name").text == "ACC1-name"
+    assert lims_stub.requests == {"GET samples": 1}
+
+
+def test_failed_update_sample_invalidates_cache(lims_stub, stub_lims_api):
+    """Test that a sample is fetched again from LIMS when updating it fails"""
+    # GIVEN a sample that has been fetched
+    lims_stub.add_sample("ACC1", Gender="M")
+    stub_lims_api.sample("ACC1")
+
+    # WHEN updating the sex of the sample together with an unknown field
+    with pytest.raises(LimsDataError):
+        stub_lims_api.update_sample("ACC1", sex="female", unknown_field="value")
+
+    # THEN the sample should be fetched from LIMS without the unsaved sex
+    assert stub_lims_api.sample("ACC1")["sex"] == "male"
+    assert lims_stub.requests["GET samples"] == 2
+    assert not lims_stub.requests["PUT samples"]
+
+
+def test_samples_modified_since(lims_stub, stub_lims_api):
+    """Test to get the samples of the processes modified in LIMS since a point in time"""
+    # GIVEN a process modified before and a process modified after a point in time
+    lims_stub.add_process("24-1", "2020-01-01T00:00:00Z", inputs={"ART1": "ACC1"})
+    lims_stub.add_process("24-2", "2020-02-01T00:00:00Z", inputs={"ART2": "ACC2", "ART3": "ACC3"})
+
+    # WHEN getting the samples modified since the point in time
+    lims_ids = stub_lims_api.samples_modified_since(dt.datetime(2020, 1, 15))
+
+    # THEN the samples of the later process should be returned
+    assert lims_ids == {"ACC2", "ACC3"}
+    # THEN the input artifacts should be fetched in one batch request
+    assert lims_stub.requests["POST artifacts/batch/retrieve"] == 1
+    assert lims_stub.requests["GET artifacts"] == 0
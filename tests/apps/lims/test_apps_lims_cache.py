@@ -0,0 +1,63 @@
+"""Test the cache of LIMS entities and responses"""
+from cg.apps.lims.cache import LimsCache, entity_type
+
+SAMPLE_URI = "http://lims/api/v2/samples/ACC1"
+
+
+def test_entity_type():
+    """Test to get the entity type of LIMS uris"""
+    # GIVEN uris of an entity, a query and something else
+
+    # WHEN getting the entity types
+    # THEN the collection of the entity should be returned
+    assert entity_type(SAMPLE_URI) == "samples"
+    assert entity_type("http://lims/api/v2/artifacts") == "artifacts"
+    assert entity_type("http://lims/other") == ""
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted when the cache is full"""
+    # GIVEN a full cache where the first entry has been used last
+    cache = LimsCache(max_size=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+
+    # WHEN adding another entry
+    cache["c"] = 3
+
+    # THEN the least recently used entry should be evicted
+    assert set(cache) == {"a", "c"}
+
+
+def test_cache_expires_entries(mocker):
+    """Test that entries expire after the time to live of their entity type"""
+    # GIVEN a cache with a sample and a process
+    monotonic = mocker.patch("cg.apps.lims.cache.time.monotonic", return_value=0)
+    cache = LimsCache(ttls={"samples": 10, "processes": 100})
+    cache[SAMPLE_URI] = "sample"
+    cache[("http://lims/api/v2/processes/24-1", "")] = "process"
+
+    # WHEN the time to live of samples has passed
+    monotonic.return_value = 50
+
+    # THEN only the process should be returned
+    assert cache.get(SAMPLE_URI) is None
+    assert cache.get(("http://lims/api/v2/processes/24-1", "")) == "process"
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_cache_invalidate():
+    """Test that invalidating an entity drops it and the responses of its type"""
+    # GIVEN a cache with a sample, a sample query and a project
+    cache = LimsCache()
+    cache[SAMPLE_URI] = "sample"
+    cache[(SAMPLE_URI, "")] = "sample response"
+    cache[("http://lims/api/v2/samples", "name=sample")] = "query response"
+    cache["http://lims/api/v2/projects/PRJ1"] = "project"
+
+    # WHEN invalidating the sample
+    cache.invalidate(SAMPLE_URI)
+
+    # THEN only the project should be left
+    assert list(cache) == ["http://lims/api/v2/projects/PRJ1"]
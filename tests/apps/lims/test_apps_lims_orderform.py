@@ -1,4 +1,7 @@
+import pytest
+
 from cg.apps.lims import orderform
+from cg.exc import OrderFormError
 
 
 def test_parsing_rml_orderform(rml_orderform):
@@ -456,3 +459,57 @@ def test_parse_mip_combined_with_balsamic(skeleton_orderform_sample: dict):
 
     # THEN data_analysis is both mip and balsamic
     assert parsed_sample["analysis"] == "mip_balsamic"
+
+
+def test_relevant_rows_reads_cell_values():
+    # GIVEN the cell values of an order form sheet with numbers, empty and short rows
+    rows = [
+        ("<TABLE HEADER>",),
+        ("Sample/Name", "UDF/Volume (uL)", "UDF/Comment"),
+        ("<SAMPLE ENTRIES>", None, None),
+        ("sample1", 20, None),
+        ("sample2",),
+        (None, None, None),
+        ("</SAMPLE ENTRIES>",),
+        ("not a sample", 1, None),
+    ]
+
+    # WHEN reading the sample rows
+    raw_samples = list(orderform.relevant_rows(iter(rows)))
+
+    # THEN the values should be text and the short rows as wide as the header
+    assert raw_samples == [
+        {"Sample/Name": "sample1", "UDF/Volume (uL)": "20.0", "UDF/Comment": ""},
+        {"Sample/Name": "sample2", "UDF/Volume (uL)": "", "UDF/Comment": ""},
+    ]
+
+
+def test_relevant_rows_rejects_data_after_empty_rows():
+    # GIVEN sample rows with an empty row between the samples
+    rows = [
+        ("<TABLE HEADER>",),
+        ("Sample/Name",),
+        ("<SAMPLE ENTRIES>",),
+        ("sample1",),
+        (None,),
+        ("sample2",),
+    ]
+
+    # WHEN reading the sample rows
+    # THEN it should complain about the data after the empty row
+    with pytest.raises(OrderFormError):
+        list(orderform.relevant_rows(iter(rows)))
+
+
+def test_expand_case_rejects_mixed_priorities(skeleton_orderform_sample: dict):
+    # GIVEN a case with two samples of different priorities
+    skeleton_orderform_sample["UDF/Data Analysis"] = "MIP"
+    samples = []
+    for priority in ("standard", "priority"):
+        raw_sample = dict(skeleton_orderform_sample, **{"UDF/priority": priority})
+        samples.append(orderform.parse_sample(raw_sample))
+
+    # WHEN expanding the case
+    # THEN it should complain about the priorities
+    with pytest.raises(OrderFormError):
+        orderform.expand_case("case1", {"samples": samples})
@@ -0,0 +1,66 @@
+"""Fixtures for the cgstats tests"""
+import datetime as dt
+from pathlib import Path
+
+import pytest
+
+from cg.apps.stats import StatsAPI
+
+# samplename, flowcell, lanes, fastq directory suffixes
+STATS_SAMPLES = [
+    ("ACC1A1_XTC01", "HJKMYBCXX", [1], [""]),
+    ("ACC2A1_XTC02", "HJKMYBCXX", [2], ["", "_nxdual9"]),
+    ("ACC3A1_XTC03", "HJKMYBCXX", [2], [""]),
+    ("ACC3A1_XTC03", "HGKMYBCXX", [1], [""]),
+]
+
+
+def add_demux_dir(root: Path, flowcell: str, samplename: str, lanes: list, suffixes: list):
+    """Add the FASTQ files of a sample to a demux tree."""
+    for suffix in suffixes:
+        sample_dir = (
+            root / f"160219_D00410_0217_A{flowcell}" / "Unaligned" / "Project_337334"
+        ) / f"Sample_{samplename}{suffix}"
+        sample_dir.mkdir(parents=True, exist_ok=True)
+        for lane in lanes:
+            for read in (1, 2):
+                (sample_dir / f"{samplename}_L00{lane}_R{read}_001.fastq.gz").touch()
+                (sample_dir / f"Undetermined_L00{lane}_R{read}_001.fastq.gz").touch()
+
+
+@pytest.fixture(name="demux_root")
+def fixture_demux_root(tmpdir) -> Path:
+    """Return a demux tree with FASTQ files for the samples"""
+    root = Path(tmpdir)
+    for samplename, flowcell, lanes, suffixes in STATS_SAMPLES:
+        add_demux_dir(root, flowcell, samplename, lanes, suffixes)
+    return root
+
+
+@pytest.yield_fixture(name="stats_api")
+def fixture_stats_api(demux_root):
+    """Return a cgstats api with samples on two flowcells"""
+    _api = StatsAPI({"cgstats": {"database": "sqlite://", "root": str(demux_root)}})
+    _api.create_all()
+    project = _api.Project(projectname="337334", time=dt.datetime.now())
+    samples, demuxes = {}, {}
+    for samplename, flowcell, lanes, _ in STATS_SAMPLES:
+        if samplename not in samples:
+            samples[samplename] = _api.Sample(samplename=samplename, limsid=samplename)
+            samples[samplename].project = project
+        if flowcell not in demuxes:
+            datasource = _api.Datasource(document_path="NA", document_type="html")
+            datasource.supportparams = _api.Supportparams(document_path=flowcell, idstring="NA")
+            demuxes[flowcell] = _api.Demux()
+            demuxes[flowcell].datasource = datasource
+            demuxes[flowcell].flowcell = _api.Flowcell(
+                flowcellname=flowcell, flowcell_pos="A", hiseqtype="hiseqx", time=dt.datetime.now()
+            )
+        for lane in lanes:
+            unaligned = _api.Unaligned(lane=lane, readcounts=1000, q30_bases_pct=85)
+            unaligned.sample = samples[samplename]
+            unaligned.demux = demuxes[flowcell]
+            _api.add(unaligned)
+    _api.commit()
+    yield _api
+    _api.drop_all()
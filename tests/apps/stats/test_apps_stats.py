@@ -0,0 +1,104 @@
+"""Tests for the flowcell summary of the cgstats api"""
+from sqlalchemy import event
+
+from cg.apps.stats import StatsAPI
+
+
+def flowcell_sample_by_sample(stats_api: StatsAPI, flowcell_name: str) -> list:
+    """Summarize the samples of a flowcell with a query and a glob per sample"""
+    record = stats_api.Flowcell.query.filter_by(flowcellname=flowcell_name).first()
+    samples = []
+    for sample_obj in stats_api.flowcell_samples(record):
+        sample_data = {
+            "name": sample_obj.samplename.split("_", 1)[0].rstrip("AB"),
+            "reads": 0,
+            "fastqs": [],
+        }
+        for fc_data in stats_api.sample_reads(sample_obj):
+            sample_data["reads"] += fc_data.reads
+            for fastq_path in stats_api.fastqs(fc_data.name, sample_obj):
+                if stats_api.is_lane_pooled(flowcell_obj=record, lane=fc_data.lane):
+                    if "Undetermined" in str(fastq_path):
+                        continue
+                sample_data["fastqs"].append(str(fastq_path))
+        samples.append(sample_data)
+    return samples
+
+
+def test_flowcell_matches_sample_by_sample(stats_api: StatsAPI):
+    """Test that the set based flowcell summary equals the summary built sample by sample"""
+
+    # GIVEN a flowcell with a pooled lane and a sample that is also on another flowcell
+    expected = flowcell_sample_by_sample(stats_api, "HJKMYBCXX")
+
+    # WHEN summarizing the flowcell
+    data = stats_api.flowcell("HJKMYBCXX")
+
+    # THEN the samples should have the same reads and FASTQ files
+    assert len(data["samples"]) == 3
+    assert sorted(data["samples"], key=lambda sample: sample["name"]) == sorted(
+        expected, key=lambda sample: sample["name"]
+    )
+    # THEN the sample on both flowcells should have the reads of both
+    reads = {sample["name"]: sample["reads"] for sample in data["samples"]}
+    assert reads["ACC3A1"] == 2000
+
+
+def test_flowcell_skips_undetermined_on_pooled_lanes(stats_api: StatsAPI):
+    """Test that Undetermined files are only kept on lanes that are not pooled"""
+
+    # GIVEN a flowcell with one sample on lane 1 and two samples on lane 2
+
+    # WHEN summarizing the flowcell
+    data = stats_api.flowcell("HJKMYBCXX")
+
+    # THEN the pooled samples should have no Undetermined files
+    fastqs = {sample["name"]: sample["fastqs"] for sample in data["samples"]}
+    assert any("Undetermined" in fastq for fastq in fastqs["ACC1A1"])
+    assert not any("Undetermined" in fastq for fastq in fastqs["ACC2A1"])
+
+
+def test_flowcell_query_count(stats_api: StatsAPI):
+    """Test that the flowcell summary does not query per sample"""
+
+    # GIVEN a flowcell with samples
+    statements = []
+
+    def count_query(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(stats_api.engine, "before_cursor_execute", count_query)
+
+    # WHEN summarizing the flowcell
+    stats_api.flowcell("HJKMYBCXX")
+    event.remove(stats_api.engine, "before_cursor_execute", count_query)
+
+    # THEN the flowcell, its demux, its datasource and the sample reads take four queries
+    assert len(statements) == 4
+
+
+def test_fastq_index_matches_fastqs(stats_api: StatsAPI):
+    """Test that the FASTQ index finds the same files as globbing per sample"""
+
+    # GIVEN a sample with FASTQ files in two sample directories
+    sample_obj = stats_api.Sample.query.filter_by(samplename="ACC2A1_XTC02").first()
+
+    # WHEN indexing the FASTQ files of the flowcell
+    index = stats_api.fastq_index("HJKMYBCXX")
+
+    # THEN the sample should have the files of both directories in glob order
+    assert index["ACC2A1_XTC02"] == list(stats_api.fastqs("HJKMYBCXX", sample_obj))
+    assert len(index["ACC2A1_XTC02"]) == 8
+
+
+def test_fastq_index_missing_root(stats_api: StatsAPI, tmpdir):
+    """Test that a missing demux root gives an empty index"""
+
+    # GIVEN a demux root that does not exist
+    stats_api.root_dir = stats_api.root_dir / "missing"
+
+    # WHEN indexing the FASTQ files of a flowcell
+    index = stats_api.fastq_index("HJKMYBCXX")
+
+    # THEN the index should be empty
+    assert index == {}
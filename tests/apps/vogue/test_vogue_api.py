@@ -1,11 +1,21 @@
 """
     Tests for VogueAPI
 """
-import subprocess
 import logging
 
 from unittest import mock
 from cg.apps.vogue import VogueAPI
+from cg.utils import commands
+from cg.utils.commands import ProcessResult
+
+
+def mock_execute(stdout: str, stderr: str, returncode: int):
+    """Return a replacement of commands.execute that finishes with the given output"""
+
+    async def execute(command, **kwargs):
+        return ProcessResult(command, returncode, stdout, stderr, 0.0, 0.0, 0)
+
+    return execute
 
 
 def test_instatiate(vogue_config):
@@ -42,10 +52,8 @@ def test_load_bioinfo_sample(vogue_config, caplog):
     caplog.set_level(logging.INFO)
 
     # WHEN instantiating a vogue api and input data
-    with mock.patch.object(subprocess, "run") as mocked:
-        mocked.return_value.stdout = dummy_stdout.encode("utf-8")
-        mocked.return_value.stderr = dummy_stderr.encode("utf-8")
-        mocked.return_value.returncode = dummy_returncode_success
+    fake_execute = mock_execute(dummy_stdout, dummy_stderr, dummy_returncode_success)
+    with mock.patch.object(commands, "execute", fake_execute):
         vogue_api.load_bioinfo_sample(load_bioinfo_inputs=test_load_bioinfo_sample_inputs)
 
         # THEN assert that command is in log output
@@ -94,10 +102,8 @@ def test_load_bioinfo_raw(vogue_config, caplog):
     caplog.set_level(logging.INFO)
 
     # WHEN instantiating a vogue api and input data
-    with mock.patch.object(subprocess, "run") as mocked:
-        mocked.return_value.stdout = dummy_stdout.encode("utf-8")
-        mocked.return_value.stderr = dummy_stderr.encode("utf-8")
-        mocked.return_value.returncode = dummy_returncode_success
+    fake_execute = mock_execute(dummy_stdout, dummy_stderr, dummy_returncode_success)
+    with mock.patch.object(commands, "execute", fake_execute):
         vogue_api.load_bioinfo_raw(load_bioinfo_inputs=test_load_bioinfo_raw_inputs)
 
         # THEN assert that command is in log output
@@ -141,10 +147,8 @@ def test_load_bioinfo_process(vogue_config, caplog):
     caplog.set_level(logging.INFO)
 
     # WHEN instantiating a vogue api and input data
-    with mock.patch.object(subprocess, "run") as mocked:
-        mocked.return_value.stdout = dummy_stdout.encode("utf-8")
-        mocked.return_value.stderr = dummy_stderr.encode("utf-8")
-        mocked.return_value.returncode = dummy_returncode_success
+    fake_execute = mock_execute(dummy_stdout, dummy_stderr, dummy_returncode_success)
+    with mock.patch.object(commands, "execute", fake_execute):
         vogue_api.load_bioinfo_process(
             load_bioinfo_inputs=test_load_bioinfo_process_inputs, cleanup_flag=True,
         )
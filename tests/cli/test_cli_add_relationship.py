@@ -26,6 +26,32 @@ def test_add_relationship_required(invoke_cli, disk_store: Store, helpers):
     assert disk_store.FamilySample.query.first().sample.internal_id == sample_id
 
 
+def test_add_relationship_refreshes_case_status(invoke_cli, disk_store: Store, helpers):
+    """Test that the case status of the family includes the related sample"""
+    # GIVEN a database with a sample and a family without samples
+    sample = helpers.add_sample(disk_store)
+    family = helpers.add_family(disk_store)
+
+    # WHEN adding a relationship
+    result = invoke_cli(
+        [
+            "--database",
+            disk_store.uri,
+            "add",
+            "relationship",
+            family.internal_id,
+            sample.internal_id,
+            "-s",
+            "affected",
+        ]
+    )
+
+    # THEN the case status of the family should count the sample
+    assert result.exit_code == 0
+    assert disk_store.CaseStatus.query.get(family.id).total_samples == 1
+    assert disk_store.cases()[0]["total_samples"] == 1
+
+
 def test_add_relationship_bad_sample(invoke_cli, disk_store: Store, helpers):
     """Test to add a relationship using a non-existing sample"""
     # GIVEN an empty database
@@ -0,0 +1,118 @@
+"""Tests for exporting records and whole tables from status-db"""
+import csv
+import datetime as dt
+import io
+import json
+
+import pytest
+
+from cg.store import Store
+
+
+def add_samples(store: Store, helpers) -> list:
+    """Add samples received on different days"""
+    samples = []
+    for day, sample_id in enumerate(["ACC1", "ACC2", "ACC3"], start=1):
+        samples.append(
+            helpers.add_sample(store, sample_id, received_at=dt.datetime(2020, 1, day, 10))
+        )
+    return samples
+
+
+def test_export_record(invoke_cli, disk_store: Store, helpers):
+    # GIVEN a database with a sample
+    sample = helpers.add_sample(disk_store)
+
+    # WHEN exporting the sample without a subcommand
+    result = invoke_cli(["--database", disk_store.uri, "export", "sample", sample.internal_id])
+
+    # THEN the sample should be printed
+    assert result.exit_code == 0
+    assert f"'internal_id': '{sample.internal_id}'" in result.output
+
+
+def test_export_bulk_csv(invoke_cli, disk_store: Store, helpers):
+    # GIVEN a database with samples received on different days
+    add_samples(disk_store, helpers)
+
+    # WHEN exporting some columns of the samples received after the first day
+    result = invoke_cli(
+        [
+            "--database",
+            disk_store.uri,
+            "export",
+            "bulk",
+            "--table",
+            "samples",
+            "--columns",
+            "name,received_at",
+            "--where",
+            "received_at>=2020-01-02",
+        ]
+    )
+
+    # THEN the filtered rows should be written as csv
+    assert result.exit_code == 0
+    rows = list(csv.reader(io.StringIO(result.output)))
+    assert rows == [
+        ["name", "received_at"],
+        ["ACC2", "2020-01-02 10:00:00"],
+        ["ACC3", "2020-01-03 10:00:00"],
+    ]
+
+
+def test_export_bulk_jsonl(invoke_cli, disk_store: Store, helpers):
+    # GIVEN a database with samples
+    add_samples(disk_store, helpers)
+
+    # WHEN exporting the samples as json lines
+    result = invoke_cli(
+        ["--database", disk_store.uri, "export", "bulk", "--table", "samples", "--format", "jsonl"]
+    )
+
+    # THEN every sample should be a json object with all the columns
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [record["name"] for record in records] == ["ACC1", "ACC2", "ACC3"]
+    assert records[0]["received_at"] == "2020-01-01T10:00:00"
+    assert "application_version_id" in records[0]
+
+
+def test_export_bulk_invalid_filter(invoke_cli, disk_store: Store):
+    # GIVEN a database
+
+    # WHEN exporting with a filter on a column that does not exist
+    result = invoke_cli(
+        ["--database", disk_store.uri, "export", "bulk", "--table", "samples", "--where", "x=1"]
+    )
+
+    # THEN the export should be aborted
+    assert result.exit_code != 0
+
+
+def test_export_bulk_parquet(invoke_cli, disk_store: Store, helpers):
+    # GIVEN a database with samples and pyarrow installed
+    parquet = pytest.importorskip("pyarrow.parquet")
+    add_samples(disk_store, helpers)
+
+    # WHEN exporting the samples to a parquet file
+    result = invoke_cli(
+        [
+            "--database",
+            disk_store.uri,
+            "export",
+            "bulk",
+            "--table",
+            "samples",
+            "--format",
+            "parquet",
+            "--output",
+            "samples.parquet",
+        ]
+    )
+
+    # THEN the file should hold the samples with typed columns
+    assert result.exit_code == 0
+    table = parquet.read_table("samples.parquet")
+    assert table.column("name").to_pylist() == ["ACC1", "ACC2", "ACC3"]
+    assert table.column("received_at").to_pylist()[0] == dt.datetime(2020, 1, 1, 10)
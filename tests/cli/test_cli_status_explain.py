@@ -0,0 +1,18 @@
+"""Tests for the cli command that explains the status queries"""
+
+from cg.cli.status import explain
+from cg.store import Store
+
+
+def test_explain_lists_status_queries(cli_runner, base_context, base_store: Store):
+    """Test that explain reports every status query"""
+
+    # GIVEN a database
+
+    # WHEN explaining the status queries
+    result = cli_runner.invoke(explain, obj=base_context)
+
+    # THEN every status query should be listed
+    assert result.exit_code == 0
+    for name in base_store.status_queries():
+        assert name in result.output
@@ -0,0 +1,19 @@
+"""Tests for the cli command that rebuilds the case status table"""
+
+from cg.cli.status import rebuild
+from cg.store import Store
+
+
+def test_rebuild_summarizes_cases(cli_runner, base_context, base_store: Store, helpers):
+    """Test that rebuild summarizes the progress of every case"""
+
+    # GIVEN a database with a case
+    family = helpers.add_family(base_store)
+
+    # WHEN rebuilding the case status table
+    result = cli_runner.invoke(rebuild, obj=base_context)
+
+    # THEN the case should be summarized
+    assert result.exit_code == 0
+    assert "1 cases" in result.output
+    assert base_store.CaseStatus.query.get(family.id)
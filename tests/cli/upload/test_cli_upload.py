@@ -1,10 +1,41 @@
 """ Test cg.cli.upload module """
 from datetime import datetime, timedelta
+from pathlib import Path
 
+import click
+
+from cg.cli.upload import base as upload_base
 from cg.cli.upload.utils import LinkHelper
+from cg.meta.upload.auto import UPLOAD_STEPS
 from cg.store import Store
 
 
+def stub_step_commands(monkeypatch, log_path: Path, failing_step: str = None):
+    """Replace the upload commands of the steps with commands that log their calls.
+
+    The stubs take the parameters of the real commands, the failing step exits like a command
+    that aborts. The apis of the upload commands are not set up.
+    """
+
+    def stub_command(command: click.Command, step: str) -> click.Command:
+        @click.pass_context
+        def callback(context, **kwargs):
+            assert set(kwargs) == {param.name for param in command.params}
+            assert isinstance(context.obj["status"], Store)
+            case_id = kwargs.get("family_id") or kwargs.get("case_id")
+            with open(log_path, "a") as log_file:
+                log_file.write(f"{step} {case_id}\n")
+            if step == failing_step:
+                context.exit(1)
+
+        return click.Command(command.name, params=command.params, callback=callback)
+
+    # the upload commands invoked by STEP_COMMANDS are named like their steps
+    for step in UPLOAD_STEPS:
+        monkeypatch.setattr(upload_base, step, stub_command(getattr(upload_base, step), step))
+    monkeypatch.setattr(upload_base, "_add_upload_apis", lambda context_obj: None)
+
+
 def test_all_samples_are_non_tumor(analysis_store, case_id):
     """Test that all samples are non tumor"""
 
@@ -128,3 +159,56 @@ def test_upload_uploaded_fails_hard(invoke_cli, disk_store: Store, helpers):
     # THEN it fails hard and reports that it is already uploaded
     assert result.exit_code != 0
     assert "already uploaded" in result.output
+
+
+def test_upload_auto_in_worker_processes(
+    invoke_cli, disk_store: Store, helpers, tmpdir, monkeypatch
+):
+    """Test that auto uploads the cases through the step commands in worker processes"""
+
+    # GIVEN two completed analyses and upload commands that log their calls
+    case_ids = []
+    for case_name in ("case1", "case2"):
+        family = helpers.add_family(disk_store, family_id=case_name)
+        helpers.add_analysis(disk_store, family=family, completed_at=datetime.now())
+        case_ids.append(family.internal_id)
+    log_path = Path(tmpdir) / "steps.log"
+    stub_step_commands(monkeypatch, log_path)
+
+    # WHEN uploading all analyses in two worker processes
+    result = invoke_cli(["--database", disk_store.uri, "upload", "auto", "--workers", "2"])
+
+    # THEN every step command should be invoked for both cases
+    assert result.exit_code == 0
+    assert sorted(log_path.read_text().splitlines()) == sorted(
+        f"{step} {case_id}" for step in UPLOAD_STEPS for case_id in case_ids
+    )
+    # THEN both analyses should be uploaded
+    status_db = Store(disk_store.uri)
+    for case_id in case_ids:
+        assert status_db.family(case_id).analyses[0].uploaded_at is not None
+
+
+def test_upload_auto_records_exiting_step(
+    invoke_cli, disk_store: Store, helpers, tmpdir, monkeypatch
+):
+    """Test that a step command that exits fails the step and not the whole upload"""
+
+    # GIVEN a completed analysis and a genotypes upload that exits
+    family = helpers.add_family(disk_store)
+    helpers.add_analysis(disk_store, family=family, completed_at=datetime.now())
+    log_path = Path(tmpdir) / "steps.log"
+    stub_step_commands(monkeypatch, log_path, failing_step="genotypes")
+
+    # WHEN uploading the analyses with the steps one after another in this process
+    result = invoke_cli(
+        ["--database", disk_store.uri, "upload", "auto", "--workers", "1", "--step-workers", "1",]
+    )
+
+    # THEN the upload should fail
+    assert result.exit_code == 1
+    # THEN the steps after genotypes should still run and be recorded
+    analysis_obj = Store(disk_store.uri).family(family.internal_id).analyses[0]
+    assert set(analysis_obj.upload_steps) == set(UPLOAD_STEPS) - {"genotypes"}
+    assert analysis_obj.upload_started_at is None
+    assert analysis_obj.uploaded_at is None
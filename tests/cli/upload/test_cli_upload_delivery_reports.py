@@ -0,0 +1,57 @@
+"""Test generating delivery reports for many cases"""
+import threading
+from types import SimpleNamespace
+
+import click
+import pytest
+
+from cg.cli.upload import delivery_report as delivery_report_module
+from cg.exc import DeliveryReportError
+
+CASE_IDS = ["case1", "case2", "case3", "case4"]
+
+
+class MockStatus:
+    """Return analyses that need a delivery report"""
+
+    def analyses_to_delivery_report(self):
+        return [
+            SimpleNamespace(family=SimpleNamespace(internal_id=case_id)) for case_id in CASE_IDS
+        ]
+
+
+@pytest.fixture(name="reported_cases")
+def fixture_reported_cases(monkeypatch) -> list:
+    """Replace the delivery report command with one that records the cases, case3 fails"""
+    reported_cases = []
+    lock = threading.Lock()
+
+    @click.command()
+    @click.option("--family-id")
+    @click.option("--print-console", is_flag=True)
+    @click.option("--force-report", is_flag=True)
+    def delivery_report(family_id, print_console, force_report):
+        with lock:
+            reported_cases.append(family_id)
+        if family_id == "case3":
+            raise DeliveryReportError("missing data")
+
+    monkeypatch.setattr(delivery_report_module, "delivery_report", delivery_report)
+    return reported_cases
+
+
+@pytest.mark.parametrize("workers", ["1", "3"])
+def test_delivery_reports(cli_runner, reported_cases, workers):
+    # GIVEN cases that need a delivery report, one of them is missing data
+
+    # WHEN generating the delivery reports
+    result = cli_runner.invoke(
+        delivery_report_module.delivery_reports,
+        ["--workers", workers],
+        obj={"status": MockStatus()},
+    )
+
+    # THEN a report should be generated for every case
+    assert sorted(reported_cases) == CASE_IDS
+    # THEN the command should fail since one report failed
+    assert result.exit_code == 1
@@ -4,10 +4,12 @@
 import datetime as dt
 import logging
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
 
 import pytest
 import ruamel.yaml
+from sqlalchemy import event
 from trailblazer.mip import files as mip_dna_files_api
 
 from cg.apps.mip_rna import files as mip_rna_files_api
@@ -428,6 +430,30 @@ def fixture_store() -> Store:
     _store.drop_all()
 
 
+@pytest.fixture(name="query_budget")
+def fixture_query_budget():
+    """Return a context manager that fails when a store runs more queries than budgeted"""
+
+    @contextmanager
+    def _query_budget(store: Store, max_queries: int):
+        statements = []
+
+        def _count_query(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(store.engine, "before_cursor_execute", _count_query)
+        try:
+            yield statements
+        finally:
+            event.remove(store.engine, "before_cursor_execute", _count_query)
+        assert len(statements) <= max_queries, (
+            f"{len(statements)} queries exceeds the budget of {max_queries}:\n"
+            + "\n".join(statements)
+        )
+
+    return _query_budget
+
+
 @pytest.yield_fixture(scope="function", name="base_store")
 def fixture_base_store(store) -> Store:
     """Setup and example store."""
@@ -156,3 +156,31 @@ def test_to_lims_mip_balsamic(mip_balsamic_order_to_submit):
     assert first_sample["udfs"]["formalin_fixation_time"] == "1"
     assert first_sample["udfs"]["post_formalin_fixation_time"] == "2"
     assert first_sample["udfs"]["tissue_block_size"] == "large"
+
+
+def test_process_lims_maps_the_submitted_samples(fastq_order_to_submit):
+    # GIVEN a LIMS that returns the ids of the submitted samples with the project
+    class SubmittingLims:
+        @staticmethod
+        def submit_project(project_name, samples):
+            return {
+                "id": "ADM1",
+                "name": project_name,
+                "date": None,
+                "samples": {sample["name"]: f"ADM1A{nr}" for nr, sample in enumerate(samples)},
+            }
+
+    lims_handler = LimsHandler()
+    lims_handler.lims = SubmittingLims()
+    fastq_order_to_submit["ticket"] = 123456
+
+    # WHEN submitting the samples
+    project_data, lims_map = lims_handler.process_lims(
+        fastq_order_to_submit, fastq_order_to_submit["samples"]
+    )
+
+    # THEN the samples should be mapped by name without asking LIMS again
+    assert project_data == {"id": "ADM1", "name": 123456, "date": None}
+    assert lims_map == {
+        sample["name"]: f"ADM1A{nr}" for nr, sample in enumerate(fastq_order_to_submit["samples"])
+    }
@@ -1,8 +1,10 @@
+import copy
 import datetime as dt
 
 import pytest
 from cg.exc import OrderError
 from cg.meta.orders.status import StatusHandler
+from cg.store import models
 
 
 def test_pools_to_status(rml_order_to_submit):
@@ -527,3 +529,89 @@ def test_store_cancer_samples(orders_api, base_store, balsamic_status_data):
     assert base_store.deliveries().count() == base_store.samples().count()
     for link in new_family.links:
         assert len(link.sample.deliveries) == 1
+
+
+def test_store_cases_queries_do_not_grow_with_the_samples(
+    orders_api, base_store, mip_status_data, query_budget
+):
+    # GIVEN a large order of trios with sample ids from LIMS
+    trio = mip_status_data["families"][0]
+    cases = []
+    for case_nr in range(32):
+        case = copy.deepcopy(trio)
+        case["name"] = f"family{case_nr}"
+        for sample in case["samples"]:
+            sample["internal_id"] = f"ACC{case_nr}{sample['name']}"
+        cases.append(case)
+
+    # WHEN storing the order, families and samples are inserted one by one to get their ids
+    with query_budget(base_store, max_queries=32 + 96 + 14) as statements:
+        orders_api.store_cases(
+            customer=mip_status_data["customer"],
+            order=mip_status_data["order"],
+            ordered=dt.datetime.now(),
+            ticket=123456,
+            cases=cases,
+        )
+
+    # THEN the existing records should be looked up and the new cases summarized in a few queries
+    assert len([statement for statement in statements if statement.startswith("SELECT")]) < 13
+    # THEN every sample should be linked and get a delivery
+    assert base_store.families().count() == 32
+    assert base_store.deliveries().count() == base_store.samples().count() == 96
+    assert all(len(family_obj.links) == 3 for family_obj in base_store.families())
+
+
+def test_store_cases_updates_existing_cases(orders_api, base_store, mip_status_data):
+    # GIVEN a stored order
+    orders_api.store_cases(
+        customer=mip_status_data["customer"],
+        order=mip_status_data["order"],
+        ordered=dt.datetime.now(),
+        ticket=123456,
+        cases=mip_status_data["families"],
+    )
+    nr_links = base_store.FamilySample.query.count()
+
+    # WHEN the same cases are ordered again with the stored samples and new panels
+    for case in mip_status_data["families"]:
+        case["panels"] = ["OMIM-AUTO"]
+        for sample in case["samples"]:
+            sample["internal_id"] = (
+                base_store.samples().filter_by(name=sample["name"]).one().internal_id
+            )
+    new_families = orders_api.store_cases(
+        customer=mip_status_data["customer"],
+        order=mip_status_data["order"],
+        ordered=dt.datetime.now(),
+        ticket=123457,
+        cases=mip_status_data["families"],
+    )
+
+    # THEN the existing families should be updated without new samples or links
+    assert new_families == []
+    assert all(family_obj.panels == ["OMIM-AUTO"] for family_obj in base_store.families())
+    assert base_store.FamilySample.query.count() == nr_links
+    assert base_store.deliveries().count() == base_store.samples().count()
+
+
+def test_store_cases_does_not_link_microbial_samples(
+    orders_api, base_store, mip_status_data, helpers
+):
+    # GIVEN a case with a sample id that belongs to a microbial sample
+    microbial_id = helpers.add_microbial_sample_and_order(base_store).internal_id
+    case = mip_status_data["families"][0]
+    case["samples"][0]["internal_id"] = microbial_id
+
+    # WHEN storing the case
+    new_families = orders_api.store_cases(
+        customer=mip_status_data["customer"],
+        order=mip_status_data["order"],
+        ordered=dt.datetime.now(),
+        ticket=123456,
+        cases=[case],
+    )
+
+    # THEN the case should only be linked to samples
+    assert all(isinstance(link_obj.sample, models.Sample) for link_obj in new_families[0].links)
+    assert base_store.sample(microbial_id) is not None
@@ -1,4 +1,5 @@
 import json
+import threading
 from datetime import datetime, timedelta
 
 import pytest
@@ -52,6 +53,15 @@ class MockLims(LimsAPI):
 
         return None
 
+    def samples_bulk(self, lims_ids, methods=False):
+        """Fetch information about several samples."""
+
+        return {
+            lims_id: self.sample(lims_id)
+            for lims_id in lims_ids
+            if self.sample(lims_id) is not None
+        }
+
 
 class MockFile:
     def __init__(self, path):
@@ -76,11 +86,33 @@ class MockChanjo:
 
         return data
 
+    def samples_coverage(self, sample_ids: list, panel_genes: list) -> dict:
+        """Calculate coverage for several samples."""
+        return {sample_id: self.sample_coverage(sample_id, panel_genes) for sample_id in sample_ids}
+
     def sample(self, sample_id: str) -> dict:
         """Fetch sample from the database."""
         return {"id": sample_id}
 
 
+class BlockingChanjo(MockChanjo):
+    """Chanjo that keeps the coverage calls running until it is released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def samples_coverage(self, sample_ids: list, panel_genes: list) -> dict:
+        self.calls.append(sample_ids)
+        self.release.wait(5)
+        return super(BlockingChanjo, self).samples_coverage(sample_ids, panel_genes)
+
+
+@pytest.fixture
+def blocking_chanjo():
+    return BlockingChanjo()
+
+
 class MockPath:
     _path = None
 
@@ -152,9 +184,9 @@ class MockDB(Store):
     def __init__(self, store):
         self.store = store
 
-    def family_samples(self, family_id: str):
+    def family_samples(self, family_id: str, profile: str = None):
 
-        family_samples = self.store.family_samples(family_id)
+        family_samples = self.store.family_samples(family_id, profile=profile)
 
         if self.family_samples_returns_no_reads:
             for family_sample in family_samples:
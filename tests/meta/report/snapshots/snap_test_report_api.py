@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# snapshottest: v1 - https://goo.gl/zC4yUc
+from __future__ import unicode_literals
+
+from snapshottest import Snapshot
+
+
+snapshots = Snapshot()
+
+snapshots[
+    "test_delivery_data_snapshot 1"
+] = "{'case': 'family', 'pipeline': 'dummy_pipeline', 'pipeline_version': '1.0', 'customer_name': 'Production', 'customer_internal_id': 'cust000', 'customer_invoice_address': 'Test street', 'scout_access': True, 'report_version': 2, 'previous_report_version': 1, 'samples': [{'internal_id': 'ADM1', 'ticket': 123456, 'status': 'affected', 'received_at': '<datetime>', 'prepared_at': '<datetime>', 'sequenced_at': '<datetime>', 'delivered_at': '<datetime>', 'processing_time': 1, 'ordered_at': '<datetime>', 'million_read_pairs': 2.5, 'capture_kit': 'GMSmyeloid', 'data_analysis': 'mip', 'name': '2018-20203', 'sex': 'male', 'source': 'blood', 'application': 'WGTPCFC030', 'application_version': '1', 'prep_method': 'CG002 - End repair Size selection A-tailing and Adapter ligation (TruSeq PCR-free DNA)', 'sequencing_method': 'CG002 - Cluster Generation (HiSeq X)', 'target_coverage': 38.342, 'target_completeness': 99.1, 'analysis_sex': 'female', 'mapped_reads': 98.8, 'duplicates': 13.525}, {'internal_id': 'ADM2', 'ticket': 123456, 'status': 'unaffected', 'received_at': '<datetime>', 'prepared_at': '<datetime>', 'sequenced_at': '<datetime>', 'delivered_at': '<datetime>', 'processing_time': 1, 'ordered_at': '<datetime>', 'million_read_pairs': 3.0, 'capture_kit': 'GMSmyeloid', 'data_analysis': 'mip', 'name': '2018-20204', 'sex': 'female', 'source': 'blood', 'application': 'WGTPCFC030', 'application_version': '1', 'prep_method': 'CG002 - End repair Size selection A-tailing and Adapter ligation (TruSeq PCR-free DNA)', 'sequencing_method': 'CG002 - Cluster Generation (HiSeq X)', 'target_coverage': 37.342, 'target_completeness': 97.1, 'analysis_sex': 'female', 'mapped_reads': 99.8, 'duplicates': 12.525}, {'internal_id': 'ADM3', 'ticket': 123456, 'status': 'unaffected', 'received_at': '<datetime>', 'prepared_at': '<datetime>', 'sequenced_at': '<datetime>', 'delivered_at': '<datetime>', 'processing_time': 1, 'ordered_at': '<datetime>', 'million_read_pairs': 3.5, 'capture_kit': 'GMSmyeloid', 'data_analysis': 'mip', 'name': '2018-20209', 'sex': 'female', 'source': 'blood', 'application': 'WGTPCFC030', 'application_version': '1', 'prep_method': 'CG002 - End repair Size selection A-tailing and Adapter ligation (TruSeq PCR-free DNA)', 'sequencing_method': 'CG002 - Cluster Generation (HiSeq X)', 'target_coverage': 39.342, 'target_completeness': 98.1, 'analysis_sex': 'female', 'mapped_reads': 97.8, 'duplicates': 14.525}], 'panels': ['IEM', 'EP'], 'genome_build': 'hg19', 'today': '<datetime>', 'applications': [{'tag': 'WGTPCFC030', 'description': 'WGS trio', 'limitations': 'some'}], 'accredited': True}"
@@ -1,7 +1,10 @@
 import datetime
 import os
+import threading
 from pathlib import Path
 
+from snapshottest import Snapshot
+
 from cg.meta.report.api import ReportAPI
 
 
@@ -322,3 +325,81 @@ def test_get_application_data_from_status_db_none_accredited(report_samples, rep
 
     # THEN the generated data has a property accredited with a value
     assert application_data["accredited"] is False
+
+
+def stable_delivery_data(delivery_data: dict) -> str:
+    """Return the delivery data with the dates of today replaced, in insertion order"""
+
+    def stable(value):
+        if isinstance(value, dict):
+            return {key: stable(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [stable(item) for item in value]
+        if isinstance(value, datetime.datetime):
+            return "<datetime>"
+        return value
+
+    return repr(stable(delivery_data))
+
+
+def test_delivery_data_snapshot(report_api, case_id, snapshot: Snapshot):
+    # GIVEN a report api with stubbed LIMS, chanjo, scout and trending backends
+
+    # WHEN collecting the delivery data
+    delivery_data = report_api._get_delivery_data(case_id=case_id)
+
+    # THEN the data should be identical to the golden file, in the same order
+    snapshot.assert_match(stable_delivery_data(delivery_data))
+
+
+def test_coverage_is_fetched_in_one_call(report_api, case_id, blocking_chanjo):
+    # GIVEN a chanjo that is slow to answer
+    chanjo = blocking_chanjo
+    report_api.chanjo = chanjo
+    threading.Timer(0.5, chanjo.release.set).start()
+
+    # WHEN collecting the delivery data
+    delivery_data = report_api._get_delivery_data(case_id=case_id)
+
+    # THEN the coverage of all samples should have been fetched in one call
+    sample_ids = [sample["internal_id"] for sample in delivery_data["samples"]]
+    assert chanjo.calls == [sample_ids]
+    assert all(sample["target_coverage"] for sample in delivery_data["samples"])
+
+
+def test_source_timeout_is_missing_data(report_api, case_id, blocking_chanjo):
+    # GIVEN a chanjo that does not answer within the source timeout
+    chanjo = blocking_chanjo
+    report_api.chanjo = chanjo
+    report_api.source_timeout = 0.1
+
+    # WHEN collecting the delivery data
+    delivery_data = report_api._get_delivery_data(case_id=case_id)
+    chanjo.release.set()
+
+    # THEN the coverage should be missing and the other sources included
+    assert "chanjo did not respond within 0.1 s" in report_api.log.get_warnings()
+    for sample in delivery_data["samples"]:
+        assert sample["target_coverage"] is None
+        assert sample["prep_method"]
+        assert sample["mapped_reads"]
+
+
+def test_panel_genes_are_fetched_once(report_api):
+    # GIVEN a report api that counts the panels fetched from scout
+    fetched = []
+
+    def get_genes(panel_id: str, version: str = None) -> list:
+        fetched.append(panel_id)
+        return [{"hgnc_id": 1}]
+
+    report_api.scout.get_genes = get_genes
+
+    # WHEN fetching the genes of the panels of two cases
+    first = report_api._get_genes_from_scout(["IEM", "EP"])
+    second = report_api._get_genes_from_scout(["EP"])
+
+    # THEN each panel should be fetched once
+    assert first == [1, 1]
+    assert second == [1]
+    assert fetched == ["IEM", "EP"]
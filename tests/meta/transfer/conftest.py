@@ -2,6 +2,7 @@ import datetime as dt
 
 import pytest
 
+from cg.apps.hk import HousekeeperAPI
 from cg.apps.lims import LimsAPI
 from cg.apps.stats import StatsAPI
 from cg.meta.transfer import TransferLims
@@ -86,6 +87,17 @@ def transfer_flowcell_api(flowcell_store, housekeeper_api, base_store_stats):
     yield transfer_api
 
 
+@pytest.yield_fixture(scope="function", name="store_housekeeper_api")
+def fixture_store_housekeeper_api(root_path):
+    """Setup a Housekeeper store in memory to store FASTQ files in."""
+    _api = HousekeeperAPI(
+        {"housekeeper": {"database": "sqlite:///:memory:", "root": str(root_path)}}
+    )
+    _api.initialise_db()
+    yield _api
+    _api.destroy_db()
+
+
 @pytest.yield_fixture(scope="function")
 def transfer_lims_api(sample_store):
     """Setup flowcell transfer API."""
@@ -110,6 +122,20 @@ class MockLims(LimsAPI):
                 received_date = sample.received_at
         return received_date
 
+    def samples_bulk(self, lims_ids, methods=False):
+
+        lims_ids = set(lims_ids)
+        return {
+            sample.internal_id: {"received": sample.received_at}
+            for sample in self._samples
+            if sample.internal_id in lims_ids
+        }
+
+    def samples_modified_since(self, since):
+
+        self.modified_since = since
+        return {sample.internal_id for sample in self._samples}
+
     def mock_set_samples(self, samples):
         self._samples = samples
 
@@ -1,9 +1,12 @@
 """Tests for transfer flowcell data"""
 import datetime as dt
+import gzip
 import warnings
 
 from sqlalchemy import exc as sa_exc
 
+from cg.meta.transfer.flowcell import TransferFlowcell
+
 
 def test_transfer_flowcell(flowcell_store, transfer_flowcell_api):
 
@@ -33,3 +36,71 @@ def test_transfer_flowcell(flowcell_store, transfer_flowcell_api):
 
     for hk_file in hk_bundle.versions[0].files:
         assert hk_file.path.endswith("fastq.gz")
+
+
+def test_store_fastqs_in_bulk(flowcell_store, store_housekeeper_api, base_store_stats, tmpdir):
+    # GIVEN FASTQ files of two samples, one of the files already stored in housekeeper
+    flowcell_id = "HJKMYBCXX"
+    housekeeper_api = store_housekeeper_api
+    for tag_name in ("fastq", flowcell_id):
+        housekeeper_api.add_commit(housekeeper_api.new_tag(tag_name))
+    sample_fastqs = {
+        sample_id: [
+            write_fastq(tmpdir.join(f"{sample_id}_L00{lane}_R1.fastq.gz")) for lane in (1, 2)
+        ]
+        for sample_id in ("ADM1", "ADM2")
+    }
+    transfer_api = TransferFlowcell(flowcell_store, base_store_stats, housekeeper_api)
+    transfer_api.store_fastqs(flowcell=flowcell_id, sample_fastqs={"ADM1": []})
+    stored_file = sample_fastqs["ADM1"][0]
+    housekeeper_api.add_file(stored_file, housekeeper_api.bundle("ADM1").versions[0], "fastq")
+    housekeeper_api.commit()
+
+    # WHEN storing the FASTQ files of the flowcell
+    transfer_api.store_fastqs(flowcell=flowcell_id, sample_fastqs=sample_fastqs)
+
+    # THEN every file should be stored once, the new files with the FASTQ and flowcell tags
+    for sample_id, fastqs in sample_fastqs.items():
+        hk_files = housekeeper_api.bundle(sample_id).versions[0].files
+        assert sorted(hk_file.path for hk_file in hk_files) == sorted(fastqs)
+        for hk_file in hk_files:
+            if hk_file.path != stored_file:
+                assert {tag.name for tag in hk_file.tags} == {"fastq", flowcell_id}
+    # THEN the headers of the new files should be indexed
+    new_files = [
+        path for fastqs in sample_fastqs.values() for path in fastqs if path != stored_file
+    ]
+    assert set(flowcell_store.fastq_headers(new_files)) == set(new_files)
+
+
+def test_transfer_leaves_commit_to_caller(flowcell_store, transfer_flowcell_api):
+
+    # GIVEN a store with a case with a received but not sequenced sample
+    flowcell_id = "HJKMYBCXX"
+    sample_obj = flowcell_store.samples().first()
+    family_obj = flowcell_store.add_family(name="family", panels=["panel"])
+    family_obj.customer = sample_obj.customer
+    flowcell_store.add_commit(flowcell_store.relate_sample(family_obj, sample_obj, "unknown"))
+
+    # WHEN transferring the flowcell containing the sample and rolling back
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=sa_exc.SAWarning)
+        transfer_flowcell_api.transfer(flowcell_id)
+        flowcell_store.rollback()
+
+        # THEN nothing should be stored
+        assert flowcell_store.flowcells().count() == 0
+
+        # WHEN transferring the flowcell again and committing
+        transfer_flowcell_api.transfer(flowcell_id)
+        flowcell_store.commit()
+
+    # THEN the flowcell should be stored and the case status refreshed by the commit
+    assert flowcell_store.flowcells().count() == 1
+    assert flowcell_store.CaseStatus.query.get(family_obj.id).flowcells_on_disk == 1
+
+
+def write_fastq(path) -> str:
+    with gzip.open(str(path), "wt") as handle:
+        handle.write("@EAS139:136:HJKMYBCXX:2:2104:15343:197393 1:Y:18:ATCACG\nACGT\n+\nIIII\n")
+    return str(path)
@@ -1,6 +1,6 @@
 import datetime as dt
 
-from cg.meta.transfer.lims import IncludeOptions, SampleState
+from cg.meta.transfer.lims import MARK_OVERLAP, IncludeOptions, SampleState
 
 
 def has_same_received_at(lims, sample_obj):
@@ -58,6 +58,31 @@ def test_transfer_samples_all(transfer_lims_api):
     assert has_same_received_at(lims_api, sample)
 
 
+def test_transfer_samples_refreshes_case_status(transfer_lims_api, helpers):
+
+    # GIVEN a summarized case with a sample that has another received_at date in lims
+    lims_api = transfer_lims_api.lims
+    sample_store = transfer_lims_api.status
+    sample = sample_store.samples_to_deliver().first()
+    family = helpers.add_family(sample_store)
+    sample_store.add_commit(sample_store.relate_sample(family, sample, "unknown"))
+    sample_store.rebuild_case_status()
+    new_date = dt.datetime.today()
+    lims_samples = [
+        sample_store.add_sample(
+            name=sample.name, sex=sample.sex, internal_id=sample.internal_id, received=new_date,
+        )
+    ]
+    lims_api.mock_set_samples(lims_samples)
+
+    # WHEN transfer_samples has been called
+    transfer_lims_api.transfer_samples(SampleState.RECEIVED, IncludeOptions.ALL.value)
+
+    # THEN the case status should have the received_at date from lims
+    case_status = sample_store.CaseStatus.query.get(family.id)
+    assert case_status.samples_received_at == sample.received_at
+
+
 def test_transfer_samples_include_unset_received_at(transfer_lims_api):
 
     sample_store = transfer_lims_api.status
@@ -105,3 +130,50 @@ def test_transfer_samples_include_unset_received_at(transfer_lims_api):
     # THEN the sample that was not set has been set and the other sample was not touched
     assert has_same_received_at(lims_api, untransfered_sample)
     assert not has_same_received_at(lims_api, transfered_sample)
+
+
+def test_transfer_samples_since_mark(transfer_lims_api):
+
+    # GIVEN two samples without received_at that both have a received date in lims
+    sample_store = transfer_lims_api.status
+    lims_api = transfer_lims_api.lims
+    samples = sample_store.samples()[:2]
+    for sample_obj in samples:
+        sample_obj.received_at = None
+    sample_store.commit()
+    lims_api.mock_set_samples(
+        [
+            sample_store.add_sample(
+                name=sample_obj.name,
+                sex=sample_obj.sex,
+                internal_id=sample_obj.internal_id,
+                received=dt.datetime.today(),
+            )
+            for sample_obj in samples
+        ]
+    )
+
+    # WHEN transferring for the first time
+    transfer_lims_api.transfer_samples_since_mark(SampleState.RECEIVED)
+
+    # THEN all samples should be checked and the time of the transfer marked
+    assert all(sample_obj.received_at for sample_obj in samples)
+    mark = sample_store.transfer_mark("lims-sample-received")
+    assert mark.marked_at
+
+    # GIVEN only the first sample has been processed in LIMS since then
+    first_marked_at = mark.marked_at
+    for sample_obj in samples:
+        sample_obj.received_at = None
+    sample_store.commit()
+    lims_api.mock_set_samples(lims_api._samples[:1])
+
+    # WHEN transferring again
+    transfer_lims_api.transfer_samples_since_mark(SampleState.RECEIVED)
+
+    # THEN LIMS should be asked for samples modified since the mark, with an overlap
+    assert lims_api.modified_since == first_marked_at - MARK_OVERLAP
+    # THEN only the processed sample should be updated and the mark moved
+    assert samples[0].received_at
+    assert samples[1].received_at is None
+    assert sample_store.transfer_mark("lims-sample-received").marked_at >= first_marked_at
@@ -1,6 +1,8 @@
 """Fixtures for meta/upload tests"""
 
+import datetime as dt
 import json
+from pathlib import Path
 
 import pytest
 
@@ -9,6 +11,7 @@ from cg.meta.upload.coverage import UploadCoverageApi
 from cg.meta.upload.mutacc import UploadToMutaccAPI
 from cg.meta.upload.observations import UploadObservationsAPI
 from cg.meta.upload.scoutapi import UploadScoutAPI
+from cg.store import Store
 
 
 class MockAnalysis:
@@ -216,3 +219,41 @@ def analysis(analysis_store, case_id):
     _analysis.family = analysis_store.family(case_id)
     _analysis.config_path = "dummy_path"
     yield _analysis
+
+
+STUB_BINARY = """#!/bin/sh
+start=$(date +%s.%N)
+sleep 0.2
+echo "$1 $2 $start $(date +%s.%N)" >> "$(dirname "$0")/calls.log"
+if [ -e "$(dirname "$0")/fail-$1" ]; then
+    exit 1
+fi
+"""
+
+
+@pytest.fixture(name="stub_bin_dir")
+def fixture_stub_bin_dir(tmpdir) -> Path:
+    """Return a directory with stub binaries for the upload steps.
+
+    Each stub logs its step, case, start and end time to calls.log, it fails when there is a file
+    fail-<step>.
+    """
+    bin_dir = Path(tmpdir) / "bin"
+    bin_dir.mkdir()
+    for binary in ("chanjo", "genotype", "loqusdb", "scout"):
+        binary_path = bin_dir / binary
+        binary_path.write_text(STUB_BINARY)
+        binary_path.chmod(0o755)
+    return bin_dir
+
+
+@pytest.yield_fixture(name="upload_disk_store")
+def fixture_upload_disk_store(tmpdir, helpers):
+    """Return a store on disk with two completed analyses to upload"""
+    _store = Store(f"sqlite:///{Path(tmpdir) / 'upload.sqlite3'}")
+    _store.create_all()
+    for case_name in ("case1", "case2"):
+        family = helpers.add_family(_store, family_id=case_name)
+        helpers.add_analysis(_store, family=family, completed_at=dt.datetime.now())
+    yield _store
+    _store.drop_all()
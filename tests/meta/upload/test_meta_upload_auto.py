@@ -0,0 +1,147 @@
+"""Tests for uploading cases concurrently and resuming failed uploads"""
+import functools
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from cg.meta.upload.auto import UPLOAD_STEPS, UploadCaseAPI, run_steps, upload_cases
+from cg.store import Store
+
+STEP_BINARIES = {
+    "coverage": "chanjo",
+    "validate": "chanjo",
+    "genotypes": "genotype",
+    "observations": "loqusdb",
+    "scout": "scout",
+}
+
+
+def run_stub(bin_dir: Path, case_id: str, step: str):
+    """Run the stub binary of an upload step"""
+    subprocess.run([str(Path(bin_dir) / STEP_BINARIES[step]), step, case_id], check=True)
+
+
+def upload_with_stubs(database: str, bin_dir: Path, case_id: str) -> List[str]:
+    """Upload a case with the stub binaries in a worker process"""
+    return UploadCaseAPI(Store(database), functools.partial(run_stub, bin_dir)).upload(case_id)
+
+
+def calls(bin_dir: Path) -> List[str]:
+    """Return the logged calls of the stub binaries"""
+    return (bin_dir / "calls.log").read_text().splitlines()
+
+
+def step_intervals(bin_dir: Path) -> Dict[str, Tuple[float, float]]:
+    """Return the start and end time of the steps run by the stub binaries"""
+    intervals = {}
+    for call in calls(bin_dir):
+        step, _, start, end = call.split()
+        intervals[step] = (float(start), float(end))
+    return intervals
+
+
+def test_upload_runs_independent_steps_in_parallel(upload_disk_store: Store, stub_bin_dir):
+    """Test that independent steps run at the same time and validate waits for coverage"""
+
+    # GIVEN a case to upload and stub binaries that take 0.2 s each
+    case_id = upload_disk_store.families().first().internal_id
+    upload_api = UploadCaseAPI(upload_disk_store, functools.partial(run_stub, stub_bin_dir))
+
+    # WHEN uploading the case with three step workers
+    failed = upload_api.upload(case_id)
+
+    # THEN all steps should be uploaded
+    assert failed == []
+    analysis_obj = upload_disk_store.family(case_id).analyses[0]
+    assert set(analysis_obj.upload_steps) == set(UPLOAD_STEPS)
+    assert analysis_obj.uploaded_at is not None
+    # THEN the first independent steps should run at the same time
+    intervals = step_intervals(stub_bin_dir)
+    first_steps = [intervals[step] for step in ("coverage", "genotypes", "observations")]
+    assert max(start for start, _ in first_steps) < min(end for _, end in first_steps)
+    # THEN validate should start after coverage is done
+    assert intervals["validate"][0] >= intervals["coverage"][1]
+
+
+def test_upload_resumes_after_completed_steps(upload_disk_store: Store, stub_bin_dir):
+    """Test that a failed upload records the completed steps and resumes after them"""
+
+    # GIVEN a case and a coverage upload that fails
+    case_id = upload_disk_store.families().first().internal_id
+    upload_api = UploadCaseAPI(upload_disk_store, functools.partial(run_stub, stub_bin_dir))
+    (stub_bin_dir / "fail-coverage").touch()
+
+    # WHEN uploading the case
+    failed = upload_api.upload(case_id)
+
+    # THEN coverage should fail and validate, that waits for it, should not run
+    assert failed == ["coverage"]
+    assert "validate" not in " ".join(calls(stub_bin_dir))
+    # THEN the other steps should be recorded and the upload can be started again
+    analysis_obj = upload_disk_store.family(case_id).analyses[0]
+    assert set(analysis_obj.upload_steps) == {"genotypes", "observations", "scout"}
+    assert analysis_obj.upload_started_at is None
+    assert analysis_obj.uploaded_at is None
+
+    # WHEN the coverage upload works again and the case is uploaded again
+    (stub_bin_dir / "fail-coverage").unlink()
+    (stub_bin_dir / "calls.log").unlink()
+    failed = upload_api.upload(case_id)
+
+    # THEN only coverage and validate should run
+    assert failed == []
+    assert sorted(call.split()[0] for call in calls(stub_bin_dir)) == ["coverage", "validate"]
+    assert upload_disk_store.family(case_id).analyses[0].uploaded_at is not None
+
+
+def test_upload_cases_in_worker_processes(upload_disk_store: Store, stub_bin_dir):
+    """Test that cases are uploaded in worker processes"""
+
+    # GIVEN two cases to upload
+    case_ids = [family_obj.internal_id for family_obj in upload_disk_store.families()]
+    assert len(case_ids) == 2
+
+    # WHEN uploading the cases in two worker processes
+    upload_case = functools.partial(upload_with_stubs, upload_disk_store.uri, stub_bin_dir)
+    failed_cases = upload_cases(case_ids, upload_case, max_workers=2)
+
+    # THEN both cases should be uploaded
+    assert failed_cases == []
+    upload_disk_store.session.expire_all()
+    for case_id in case_ids:
+        assert upload_disk_store.family(case_id).analyses[0].uploaded_at is not None
+    assert len(calls(stub_bin_dir)) == 2 * len(UPLOAD_STEPS)
+
+
+def test_upload_cases_reports_failed_cases(upload_disk_store: Store, stub_bin_dir):
+    """Test that a case with a failed step is reported as failed"""
+
+    # GIVEN two cases and a scout upload that fails
+    case_ids = [family_obj.internal_id for family_obj in upload_disk_store.families()]
+    (stub_bin_dir / "fail-scout").touch()
+
+    # WHEN uploading the cases one after another
+    upload_case = functools.partial(upload_with_stubs, upload_disk_store.uri, stub_bin_dir)
+    failed_cases = upload_cases(case_ids, upload_case, max_workers=1)
+
+    # THEN both cases should be reported as failed
+    assert sorted(failed_cases) == sorted(case_ids)
+
+
+def test_run_steps_records_exiting_step():
+    """Test that a step that exits, like an aborted click command, is recorded as failed"""
+
+    # GIVEN steps where coverage exits and validate waits for it
+    def run_step(step: str):
+        if step == "coverage":
+            sys.exit(1)
+
+    done = []
+
+    # WHEN running the steps one after another in this thread
+    failed = run_steps(run_step, UPLOAD_STEPS, done=set(), on_done=done.append, max_workers=1)
+
+    # THEN coverage should fail, validate should be skipped and the other steps should run
+    assert failed == ["coverage"]
+    assert sorted(done) == ["genotypes", "observations", "scout"]
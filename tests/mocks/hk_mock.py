@@ -260,6 +260,12 @@ class MockHousekeeperAPI:
         self._bundles.append(bundle_obj)
         return bundle_obj
 
+    def bundles_by_name(self, names):
+        """ Fetch the bundles with the given names """
+        return {
+            bundle_obj.name: bundle_obj for bundle_obj in self._bundles if bundle_obj.name in names
+        }
+
     def version(self, *args, **kwargs):
         """ Fetch a version """
         return self._version_obj
@@ -324,6 +330,19 @@ class MockHousekeeperAPI:
         self._file_added = True
         return mocked_file
 
+    def existing_paths(self, paths):
+        """ Return the paths that are already stored as files """
+        return {file_obj.path for file_obj in self._files if file_obj.path in paths}
+
+    def add_files_bulk(self, version_paths, tags):
+        """ Add files in versions, all with the same tags """
+        for version_obj, path in version_paths:
+            version_obj.files.append(self.new_file(path, tags=tags))
+
+    def add(self, *args, **kwargs):
+        """ Wrap method in Housekeeper Store """
+        return True
+
     def add_commit(self, *args, **kwargs):
         """ Wrap method in Housekeeper Store """
         return True
@@ -1,8 +1,11 @@
 """Test fixtures for cg/server tests"""
 import os
+import tempfile
 
 import pytest
+from cg.server import ext
 from cg.server.app import create_app
+from cg.server.auth import DEFAULT_MAX_AGE
 
 os.environ["CG_SQL_DATABASE_URI"] = "dummy_value"
 os.environ["LIMS_HOST"] = "dummy_value"
@@ -10,6 +13,13 @@ os.environ["LIMS_USERNAME"] = "dummy_value"
 os.environ["LIMS_PASSWORD"] = "dummy_value"
 os.environ["GOOGLE_OAUTH_CLIENT_ID"] = "dummy_value"
 os.environ["GOOGLE_OAUTH_CLIENT_SECRET"] = "dummy_value"
+os.environ["CG_GOOGLE_CERTS_CACHE"] = os.path.join(tempfile.mkdtemp(), "google-certs.json")
+
+
+@pytest.fixture(autouse=True)
+def fixture_offline_key_store(monkeypatch):
+    """Keep the app from fetching the Google certificates"""
+    monkeypatch.setattr(ext.key_store, "fetch", lambda: ({}, DEFAULT_MAX_AGE))
 
 
 @pytest.fixture
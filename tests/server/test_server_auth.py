@@ -0,0 +1,261 @@
+"""Tests for verifying JSON Web Tokens with cached certificates"""
+import json
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from cg.server import auth
+from cg.server.auth import KeyStore, UserCache
+
+CERTS = {"key1": "-----BEGIN CERTIFICATE-----"}
+
+
+class StubFetch:
+    """Return certificates and count the fetches"""
+
+    def __init__(self, certs: dict = None, seconds: int = 3600):
+        self.certs = CERTS if certs is None else certs
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.certs, self.seconds
+
+
+@pytest.fixture(name="cache_path")
+def fixture_cache_path(tmpdir) -> str:
+    """Return the path of a certificate cache file"""
+    return str(tmpdir.join("certs.json"))
+
+
+def flask_app(cache_path: str) -> Flask:
+    app = Flask(__name__)
+    app.config["GOOGLE_CERTS_CACHE"] = cache_path
+    return app
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Cache-Control": "public, max-age=19929, must-revalidate, no-transform"}, 19929),
+        ({"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"}, 0),
+        ({"Expires": "garbage"}, auth.DEFAULT_MAX_AGE),
+        ({}, auth.DEFAULT_MAX_AGE),
+    ],
+)
+def test_max_age(headers, expected):
+    # GIVEN the cache headers of a response
+
+    # WHEN reading how long the response may be cached
+    seconds = auth.max_age(headers)
+
+    # THEN the max-age should be used, then the Expires date, then the default
+    assert seconds == expected
+
+
+def test_init_app_uses_cached_certs(cache_path):
+    # GIVEN certificates cached on disk that have not expired
+    with open(cache_path, "w") as cache_file:
+        json.dump({"certs": CERTS, "expires_at": time.time() + 60}, cache_file)
+    fetch = StubFetch()
+
+    # WHEN starting the app
+    key_store = KeyStore(fetch=fetch, app=flask_app(cache_path))
+
+    # THEN the cached certificates should be used without fetching them
+    assert key_store.certs() == CERTS
+    assert fetch.calls == 0
+
+
+def test_expired_certs_are_refreshed_in_background(cache_path):
+    # GIVEN expired certificates cached on disk
+    with open(cache_path, "w") as cache_file:
+        json.dump({"certs": {"old": "cert"}, "expires_at": time.time() - 1}, cache_file)
+    fetch = StubFetch()
+
+    # WHEN starting the app
+    key_store = KeyStore(fetch=fetch, app=flask_app(cache_path))
+    key_store.refresh_in_background().join()
+
+    # THEN the certificates should be fetched and cached with their expiry
+    assert fetch.calls == 1
+    assert key_store.certs() == CERTS
+    with open(cache_path) as cache_file:
+        cached = json.load(cache_file)
+    assert cached["certs"] == CERTS
+    assert cached["expires_at"] > time.time() + 3000
+
+
+def test_refreshed_certs_are_cached_for_the_owner_only(cache_path):
+    # GIVEN a key store without cached certificates
+    key_store = KeyStore(fetch=StubFetch(), cache_path=cache_path)
+
+    # WHEN refreshing the certificates
+    key_store.refresh()
+
+    # THEN the cache file should only be readable and writable by its owner
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+
+
+@pytest.mark.parametrize("mode", [0o620, 0o602], ids=["group", "world"])
+def test_cached_certs_writable_by_others_are_ignored(cache_path, mode):
+    # GIVEN cached certificates that other users can write to
+    with open(cache_path, "w") as cache_file:
+        json.dump({"certs": {"forged": "cert"}, "expires_at": time.time() + 60}, cache_file)
+    os.chmod(cache_path, mode)
+    fetch = StubFetch()
+
+    # WHEN starting the app
+    key_store = KeyStore(fetch=fetch, app=flask_app(cache_path))
+    key_store.refresh_in_background().join()
+
+    # THEN the cached certificates should be ignored and the certificates fetched
+    assert fetch.calls == 1
+    assert key_store.certs() == CERTS
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason="changing the owner of a file needs root")
+def test_cached_certs_of_other_users_are_ignored(cache_path):
+    # GIVEN cached certificates that belong to another user
+    with open(cache_path, "w") as cache_file:
+        json.dump({"certs": {"forged": "cert"}, "expires_at": time.time() + 60}, cache_file)
+    os.chmod(cache_path, 0o600)
+    os.chown(cache_path, 12345, -1)
+
+    # WHEN loading the cached certificates
+    key_store = KeyStore(cache_path=cache_path)
+    key_store.load()
+
+    # THEN the certificates should not be used
+    assert key_store.expired
+
+
+def test_certs_are_cached_in_the_instance_folder(tmpdir):
+    # GIVEN an app without a configured cache file
+    app = flask_app(None)
+    app.instance_path = str(tmpdir.join("instance"))
+
+    # WHEN starting the app
+    key_store = KeyStore(fetch=StubFetch(), app=app)
+    key_store.refresh_in_background().join()
+
+    # THEN the certificates should be cached in the instance folder of the app
+    assert key_store.cache_path == os.path.join(app.instance_path, auth.CERTS_CACHE_NAME)
+    assert os.path.exists(key_store.cache_path)
+
+
+def test_failed_fetch_is_not_retried_at_once(cache_path):
+    # GIVEN no cached certificates and a fetch that fails
+    def fetch():
+        fetch.calls += 1
+        raise OSError("no network")
+
+    fetch.calls = 0
+
+    # WHEN asking for the certificates twice
+    key_store = KeyStore(fetch=fetch, app=flask_app(cache_path))
+    first, second = key_store.certs(), key_store.certs()
+
+    # THEN the app should start and the fetch be tried once
+    assert first == second == {}
+    assert fetch.calls == 1
+
+
+def test_decoded_tokens_are_cached(cache_path, monkeypatch):
+    # GIVEN a key store with certificates and a token that expires in a minute
+    decoded = []
+
+    def decode(token, certs):
+        decoded.append(token)
+        return {"email": "user@example.com", "exp": time.time() + 60}
+
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    key_store = KeyStore(fetch=StubFetch(), app=flask_app(cache_path))
+
+    # WHEN decoding the token twice and another token once
+    first = key_store.decode("token")
+    second = key_store.decode("token")
+    key_store.decode("other token")
+
+    # THEN each token should only be verified once
+    assert first is second
+    assert decoded == ["token", "other token"]
+
+
+def test_expired_tokens_are_verified_again(cache_path, monkeypatch):
+    # GIVEN a token that has expired since it was cached
+    decoded = []
+
+    def decode(token, certs):
+        decoded.append(token)
+        return {"email": "user@example.com", "exp": time.time() - 1}
+
+    monkeypatch.setattr(auth.jwt, "decode", decode)
+    key_store = KeyStore(fetch=StubFetch(), app=flask_app(cache_path))
+    key_store.decode("token")
+
+    # WHEN decoding the token again
+    key_store.decode("token")
+
+    # THEN it should be verified again
+    assert decoded == ["token", "token"]
+
+
+@pytest.fixture(name="user_email")
+def fixture_user_email(store, helpers) -> str:
+    """Return the email of a user in the store"""
+    customer = helpers.ensure_customer(store)
+    store.add_commit(store.add_user(customer, "user@example.com", "Paul Anderson"))
+    return "user@example.com"
+
+
+def test_users_are_cached(store, user_email):
+    # GIVEN a user in the store and a cache of users
+    loaded = []
+
+    def load(email):
+        loaded.append(email)
+        return store.user(email)
+
+    user_cache = UserCache(seconds=60)
+
+    # WHEN fetching the user twice
+    first = user_cache.get(user_email, load)
+    second = user_cache.get(user_email, load)
+
+    # THEN the user should be loaded from the store once
+    assert first is second
+    assert loaded == [user_email]
+    assert user_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+    # THEN the user should know its customer without the store session
+    assert first.customer_id == first.customer.id
+    assert first.to_dict()["customer"]["internal_id"] == "cust000"
+
+
+def test_cleared_users_are_loaded_again(store, user_email):
+    # GIVEN a cached user that is made an admin
+    user_cache = UserCache(seconds=60)
+    assert user_cache.get(user_email, store.user).is_admin is False
+    store.user(user_email).is_admin = True
+    store.commit()
+
+    # WHEN the cache is cleared, like the admin views do after an edit
+    user_cache.clear()
+
+    # THEN the user should be loaded again
+    assert user_cache.get(user_email, store.user).is_admin is True
+
+
+def test_unknown_users_are_not_cached(store):
+    # GIVEN a cache of users
+
+    # WHEN fetching a user that is not in the store
+    user_cache = UserCache(seconds=60)
+    current_user = user_cache.get("nobody@example.com", store.user)
+
+    # THEN no user should be returned or cached
+    assert current_user is None
+    assert user_cache.stats()["size"] == 0
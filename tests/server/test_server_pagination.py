@@ -0,0 +1,165 @@
+"""Tests for the keyset pagination of the list endpoints"""
+import datetime as dt
+import threading
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import BadRequest
+
+from cg.server import pagination
+from cg.store import Store, models
+
+
+@pytest.fixture(name="flask_app")
+def fixture_flask_app() -> Flask:
+    """Return a bare flask app to build request contexts from"""
+    pagination._COUNT_CACHE.clear()
+    return Flask(__name__)
+
+
+def test_paginate_walks_all_records(flask_app: Flask, base_store: Store, helpers):
+    """Test that following the cursors returns every record once, newest first"""
+
+    # GIVEN families ordered on different days, two of them on the same date and one undated
+    family_ids = add_families(base_store, helpers, nr_families=5)
+
+    # WHEN fetching two families per page until there is no next page
+    fetched, cursor = [], None
+    while True:
+        with flask_app.test_request_context(query_string=dict(limit=2, cursor=cursor or "")):
+            records, page = pagination.paginate(
+                base_store.families(), models.Family.ordered_at, default_size=30
+            )
+        fetched.extend(record.internal_id for record in records)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # THEN all families should be returned in descending order with the undated last
+    assert fetched == family_ids
+    assert page["total"] == 5
+
+
+def test_page_size_is_capped(flask_app: Flask):
+    """Test that the requested page size is capped by the configured maximum"""
+
+    # GIVEN a max page size in the config
+    flask_app.config["API_MAX_PAGE_SIZE"] = 10
+
+    # WHEN requesting a larger page
+    with flask_app.test_request_context(query_string=dict(limit=1000)):
+        size = pagination.page_size(default=30)
+
+    # THEN the max page size should be used
+    assert size == 10
+
+
+def test_invalid_cursor(flask_app: Flask, base_store: Store):
+    """Test that a malformed cursor is rejected"""
+
+    # GIVEN a request with a cursor not made by the server
+    with flask_app.test_request_context(query_string=dict(cursor="not-a-cursor")):
+
+        # WHEN paginating
+        with pytest.raises(BadRequest):
+            # THEN the request should be rejected
+            pagination.paginate(base_store.families(), models.Family.ordered_at, default_size=30)
+
+
+def test_cached_count(flask_app: Flask, base_store: Store, helpers):
+    """Test that the total count is reused for the same query"""
+
+    # GIVEN a query that has been counted
+    add_families(base_store, helpers, nr_families=2)
+    with flask_app.test_request_context():
+        assert pagination.cached_count(base_store.families()) == 2
+
+    # WHEN a record is added and the query is counted again
+    helpers.add_family(base_store, family_id="added")
+    with flask_app.test_request_context():
+        count = pagination.cached_count(base_store.families())
+
+    # THEN the cached count should be returned
+    assert count == 2
+
+
+def test_queue_page_keeps_labprep_order(flask_app: Flask, base_store: Store, helpers):
+    """Test that the lab prep queue is returned by priority and received date, not ordered date"""
+
+    # GIVEN samples in lab prep where the priority samples were ordered and received first
+    now = dt.datetime.now()
+    queue = [("priority_old", 2, 3), ("priority_new", 2, 2), ("standard_old", 1, 1)]
+    for sample_name, priority, days_ago in queue + [("standard_new", 1, 0)]:
+        sample_obj = helpers.add_sample(base_store, sample_id=sample_name)
+        sample_obj.sequenced_at = None
+        sample_obj.priority = priority
+        sample_obj.received_at = now - dt.timedelta(days=days_ago)
+        sample_obj.ordered_at = now - dt.timedelta(days=days_ago)
+    base_store.commit()
+
+    # WHEN fetching the first three samples of the queue
+    with flask_app.test_request_context(query_string=dict(limit=3)):
+        records, page = pagination.queue_page(base_store.samples_to_prepare(), default_size=50)
+
+    # THEN the samples with the highest priority should come first, the oldest received first
+    assert [record.name for record in records] == [sample_name for sample_name, *_ in queue]
+    assert page == dict(total=4, next_cursor=None)
+
+
+class StubQuery:
+    """A query with a statement to cache the count of"""
+
+    def __init__(self, query_nr: int):
+        self.statement = self
+        self.query_nr = query_nr
+        self.params = {"query_nr": query_nr}
+
+    def compile(self):
+        return self
+
+    def __str__(self):
+        return "SELECT count(*) FROM stub WHERE nr = :query_nr"
+
+    def count(self) -> int:
+        return self.query_nr
+
+
+def test_cached_count_from_many_threads(flask_app: Flask, monkeypatch):
+    """Test that threads counting different queries can fill and evict the cache together"""
+
+    # GIVEN a small count cache
+    monkeypatch.setattr(pagination, "COUNT_CACHE_SIZE", 4)
+    errors = []
+
+    def count_queries(thread_nr: int):
+        try:
+            with flask_app.app_context():
+                for query_nr in range(thread_nr * 1000, thread_nr * 1000 + 500):
+                    assert pagination.cached_count(StubQuery(query_nr)) == query_nr
+        except Exception as error:
+            errors.append(error)
+
+    # WHEN counting different queries from many threads at the same time
+    threads = [threading.Thread(target=count_queries, args=(nr,)) for nr in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # THEN every count should succeed and the cache should stay within its size
+    assert errors == []
+    assert len(pagination._COUNT_CACHE) <= 4
+
+
+def add_families(store: Store, helpers, nr_families: int) -> list:
+    """Add families and return their ids in the expected descending order"""
+    now = dt.datetime.now()
+    families = []
+    for family_nr in range(nr_families):
+        family_obj = helpers.add_family(store, family_id=f"family{family_nr}")
+        family_obj.ordered_at = now - dt.timedelta(days=family_nr // 2)
+        families.append(family_obj)
+    families[-1].ordered_at = None
+    store.commit()
+    dated = sorted(families[:-1], key=lambda family: (family.ordered_at, family.id), reverse=True)
+    return [family.internal_id for family in dated + families[-1:]]
@@ -0,0 +1,99 @@
+"""Tests that the column projection serializes like the to_dict methods of the models"""
+import pytest
+
+from cg.server import projection
+from cg.store import Store, models
+
+
+@pytest.fixture(name="projection_store")
+def fixture_projection_store(analysis_store: Store, helpers, case_id) -> Store:
+    """Return a store with a family with samples on a flowcell and a microbial order"""
+    family_obj = analysis_store.family(case_id)
+    family_obj.priority = 1
+    samples = [link_obj.sample for link_obj in family_obj.links]
+    helpers.add_flowcell(analysis_store, samples=samples)
+    helpers.add_microbial_sample_and_order(analysis_store)
+    analysis_store.session.expunge_all()
+    return analysis_store
+
+
+@pytest.mark.parametrize(
+    "model, serialize, to_dict",
+    [
+        (models.Sample, projection.samples, lambda record: record.to_dict()),
+        (
+            models.Family,
+            lambda rows: projection.families(rows, links=True),
+            lambda record: record.to_dict(links=True),
+        ),
+        (models.Analysis, projection.analyses, lambda record: record.to_dict()),
+        (models.Flowcell, projection.plain, lambda record: record.to_dict()),
+        (
+            models.MicrobialSample,
+            lambda rows: projection.microbial_samples(rows, order=True),
+            lambda record: record.to_dict(order=True),
+        ),
+        (
+            models.MicrobialOrder,
+            lambda rows: projection.microbial_orders(rows, samples=True),
+            lambda record: record.to_dict(samples=True),
+        ),
+    ],
+)
+def test_projection_matches_to_dict(projection_store: Store, model, serialize, to_dict):
+    """Test that the projected rows are serialized like the ORM objects"""
+
+    # GIVEN records of a model and their to_dict serialization
+    query = model.query.order_by(model.id)
+    expected = [to_dict(record) for record in query]
+    assert expected
+
+    # WHEN serializing the projected rows of the same query
+    data = serialize(projection.project(query, model))
+
+    # THEN the serializations should be the same
+    assert data == expected
+
+
+def test_projection_does_not_load_objects(projection_store: Store):
+    """Test that serializing projected rows builds no ORM objects"""
+
+    # GIVEN a store with families
+
+    # WHEN serializing the families with their links
+    projection.families(projection.project(models.Family.query, models.Family), links=True)
+
+    # THEN no objects should have been added to the session
+    assert not list(projection_store.session)
+
+
+def test_analyses_payload_keys(projection_store: Store, helpers):
+    """Test that the analyses payload has the public columns and the family, no private columns"""
+
+    # GIVEN an analysis with completed upload steps
+    analysis_obj = helpers.add_analysis(projection_store)
+    analysis_obj.upload_steps = ["coverage", "genotypes"]
+    projection_store.commit()
+
+    # WHEN serializing the analyses like the analyses endpoint
+    query = projection.project(models.Analysis.query, models.Analysis)
+    records = projection.analyses(query)
+
+    # THEN the keys should be the same as before the upload steps were stored
+    assert set(records[0]) == {
+        "id",
+        "pipeline",
+        "pipeline_version",
+        "started_at",
+        "completed_at",
+        "delivery_report_created_at",
+        "upload_started_at",
+        "uploaded_at",
+        "is_primary",
+        "created_at",
+        "family_id",
+        "family",
+    }
+    # THEN the panels of the family should only be serialized through the property
+    assert "panels" in records[0]["family"]
+    assert not [key for key in records[0]["family"] if key.startswith("_")]
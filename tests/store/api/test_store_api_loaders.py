@@ -0,0 +1,120 @@
+"""Tests for the named loader profiles of the store"""
+import pytest
+
+from cg.store import Store
+
+
+def test_case_full_query_budget(base_store: Store, helpers, query_budget):
+    """Test that a family with all its samples and analyses is serialized in a fixed number of
+    queries"""
+
+    # GIVEN a family with many samples and two analyses
+    family_id = add_family_with_samples(base_store, helpers, nr_samples=10).internal_id
+    base_store.session.expunge_all()
+
+    # WHEN fetching and serializing the family with the case_full profile
+    with query_budget(base_store, 3):
+        family_obj = base_store.family(family_id, profile="case_full")
+        data = family_obj.to_dict(links=True, analyses=True)
+
+    # THEN all samples and analyses should be included
+    assert len(data["links"]) == 10
+    assert len(data["analyses"]) == 2
+
+
+def test_sample_with_app_query_budget(base_store: Store, helpers, query_budget):
+    """Test that listing samples loads their customers and applications in the same query"""
+
+    # GIVEN a store with many samples
+    add_family_with_samples(base_store, helpers, nr_samples=10)
+    base_store.session.expunge_all()
+
+    # WHEN serializing all the samples with the sample_with_app profile
+    with query_budget(base_store, 1):
+        samples_q = base_store.with_profile(base_store.samples(), "sample_with_app")
+        data = [sample_obj.to_dict() for sample_obj in samples_q]
+
+    # THEN all samples should be serialized with their application
+    assert len(data) == 10
+    assert all(sample_data["application"]["tag"] for sample_data in data)
+
+
+def test_samples_by_internal_id_query_budget(base_store: Store, helpers, query_budget):
+    """Test that samples and microbial samples are fetched by id with their applications"""
+
+    # GIVEN a store with samples and a microbial sample
+    sample_ids = [sample_obj.internal_id for sample_obj in helpers.add_samples(base_store)]
+    microbial_id = helpers.add_microbial_sample_and_order(base_store).internal_id
+    base_store.session.expunge_all()
+
+    # WHEN fetching them by id and checking the expected reads of their applications
+    with query_budget(base_store, 2):
+        records = base_store.samples_by_internal_id(sample_ids + [microbial_id, "missing"])
+        expected_reads = [
+            record.application_version.application.expected_reads for record in records.values()
+        ]
+
+    # THEN all existing samples should be returned
+    assert set(records) == set(sample_ids + [microbial_id])
+    assert len(expected_reads) == len(records)
+
+
+@pytest.mark.parametrize("profile, analyses", [("case_with_samples", False), ("case_full", True)])
+def test_profile_keeps_to_dict(base_store: Store, helpers, profile, analyses):
+    """Test that eager loading does not change the serialized family"""
+
+    # GIVEN a family with samples and analyses and its serialization without a loader profile
+    family_id = add_family_with_samples(base_store, helpers, nr_samples=3).internal_id
+    base_store.session.expunge_all()
+    expected = base_store.family(family_id).to_dict(links=True, analyses=analyses)
+    base_store.session.expunge_all()
+
+    # WHEN serializing the family fetched with the loader profile
+    family_obj = base_store.family(family_id, profile=profile)
+    data = family_obj.to_dict(links=True, analyses=analyses)
+
+    # THEN the serialization should be the same
+    assert data == expected
+
+
+def test_sample_full_keeps_to_dict(base_store: Store, helpers):
+    """Test that the sample_full profile does not change the serialized sample"""
+
+    # GIVEN a sample in a family and on a flowcell
+    family_obj = add_family_with_samples(base_store, helpers, nr_samples=2)
+    sample_id = family_obj.links[0].sample.internal_id
+    base_store.session.expunge_all()
+    expected = base_store.sample(sample_id).to_dict(links=True, flowcells=True)
+    base_store.session.expunge_all()
+
+    # WHEN serializing the sample fetched with the sample_full profile
+    data = base_store.sample(sample_id, profile="sample_full").to_dict(links=True, flowcells=True)
+
+    # THEN the serialization should be the same
+    assert data == expected
+    assert data["flowcells"]
+
+
+def test_unknown_profile(base_store: Store):
+    """Test that an unknown loader profile is reported"""
+
+    # GIVEN a store
+
+    # WHEN using a profile that does not exist
+    with pytest.raises(ValueError):
+        # THEN a ValueError should be raised
+        base_store.family("family_test", profile="unknown")
+
+
+def add_family_with_samples(store: Store, helpers, nr_samples: int):
+    """Add a family with samples sequenced on one flowcell and two analyses"""
+    family_obj = helpers.add_family(store)
+    samples = []
+    for sample_nr in range(nr_samples):
+        sample_obj = helpers.add_sample(store, sample_id=f"sample{sample_nr}")
+        helpers.add_relationship(store, sample=sample_obj, family=family_obj)
+        samples.append(sample_obj)
+    helpers.add_flowcell(store, samples=samples)
+    helpers.add_analysis(store, family=family_obj, pipeline="first")
+    helpers.add_analysis(store, family=family_obj, pipeline="second")
+    return family_obj
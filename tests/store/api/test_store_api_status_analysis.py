@@ -175,6 +175,25 @@ def test_one_of_one_sequenced_samples(base_store: Store):
     assert test_family in families
 
 
+def test_limit_skips_families_not_sequenced(base_store: Store):
+    """Test that the limit counts only families where all samples are sequenced"""
+
+    # GIVEN a database with a high priority family that is not sequenced and two sequenced
+    # families ordered at different dates
+    not_sequenced_family = add_family_with_samples(base_store, "not_sequenced", 2, sequenced=False)
+    not_sequenced_family.priority = 2
+    old_family = add_family_with_samples(base_store, "old", 2, sequenced=True)
+    old_family.ordered_at = datetime.now() - timedelta(days=7)
+    add_family_with_samples(base_store, "new", 2, sequenced=True)
+    base_store.commit()
+
+    # WHEN getting one family to analyse
+    families = base_store.cases_to_mip_analyze(limit=1)
+
+    # THEN the sequenced family ordered first should be returned
+    assert families == [old_family]
+
+
 def ensure_application_version(disk_store, application_tag="dummy_tag"):
     """utility function to return existing or create application version for tests"""
     application = disk_store.application(tag=application_tag)
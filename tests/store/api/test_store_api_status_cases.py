@@ -2,7 +2,7 @@
 from datetime import datetime, timedelta
 
 from cg.constants import FAMILY_ACTIONS, PRIORITY_OPTIONS
-from cg.store import Store
+from cg.store import Store, models
 
 
 def test_delivered_at_affects_tat(base_store: Store):
@@ -1080,6 +1080,85 @@ def test_exclude_analysed_cases(base_store: Store):
     assert not cases
 
 
+def test_exclude_received_keeps_family_without_samples(base_store: Store):
+    """Test that excluding received cases keeps cases without samples"""
+
+    # GIVEN a database with a family without samples
+    family = add_family(base_store)
+
+    # WHEN getting active cases excluding received
+    cases = base_store.cases(exclude_received=True)
+
+    # THEN cases should contain the family without samples
+    assert [case["internal_id"] for case in cases] == [family.internal_id]
+
+
+def test_sample_filters_match_same_sample(base_store: Store):
+    """Test that data analysis and sample id filters has to match the same sample"""
+
+    # GIVEN a database with a family with one MIP sample and one Balsamic sample
+    family = add_family(base_store)
+    mip_sample = add_sample(base_store, sample_name="mip_sample", data_analysis="MIP")
+    balsamic_sample = add_sample(base_store, sample_name="bal_sample", data_analysis="Balsamic")
+    base_store.relate_sample(family, mip_sample, "unknown")
+    base_store.relate_sample(family, balsamic_sample, "unknown")
+
+    # WHEN filtering on Balsamic and the id of the MIP sample
+    cases = base_store.cases(data_analysis="Balsamic", sample_id=mip_sample.internal_id)
+
+    # THEN no case should be returned
+    assert not cases
+
+    # WHEN filtering on MIP and the id of the MIP sample
+    cases = base_store.cases(data_analysis="MIP", sample_id=mip_sample.internal_id)
+
+    # THEN the case should be returned with all its samples
+    assert len(cases) == 1
+    assert cases[0]["total_samples"] == 2
+    assert set(cases[0]["samples_data_analyses"]) == {"MIP", "Balsamic"}
+
+
+def test_latest_analysis(base_store: Store):
+    """Test that the case displays the first analysis of the family"""
+
+    # GIVEN a database with a family with an old and a new analysis
+    old_analysis = add_analysis(base_store, completed=True, pipeline="old")
+    old_analysis.completed_at = datetime.now() - timedelta(days=400)
+    family = old_analysis.family
+    new_analysis = base_store.add_analysis(pipeline="new", version="", completed_at=datetime.now())
+    family.analyses.append(new_analysis)
+    base_store.add_commit(old_analysis, new_analysis)
+
+    # WHEN getting active cases
+    cases = base_store.cases()
+
+    # THEN the case should display the new analysis
+    assert len(cases) == 1
+    assert cases[0]["analysis_pipeline"] == family.analyses[0].pipeline == "new"
+    assert cases[0]["is_rerun"]
+
+
+def test_max_tat(base_store: Store):
+    """Test that max tat is the longest turnaround time of the samples applications"""
+
+    # GIVEN a database with a family with samples of applications with different turnaround times
+    family = add_family(base_store)
+    internal_sample = add_sample(base_store, sample_name="internal")
+    internal_sample.application_version.application.turnaround_time = 20
+    external_sample = add_sample(base_store, sample_name="external", is_external=True)
+    external_sample.application_version.application.turnaround_time = 10
+    base_store.relate_sample(family, internal_sample, "unknown")
+    base_store.relate_sample(family, external_sample, "unknown")
+
+    # WHEN getting active cases
+    cases = base_store.cases()
+
+    # THEN max tat should be the longest turnaround time
+    assert cases
+    for case in cases:
+        assert case.get("max_tat") == 20
+
+
 def test_all_days(base_store: Store):
     """Test to that cases filter in family in database"""
 
@@ -1579,6 +1658,134 @@ def ensure_panel(disk_store, panel_id="panel_test", customer_id="cust_test"):
     return panel
 
 
+def test_cases_reads_case_status(base_store: Store, query_budget):
+    """Test that the progress of summarized cases is read with one query"""
+
+    # GIVEN a case with a received sample that has been summarized
+    family = add_family(base_store)
+    sample = add_sample(base_store, received=True)
+    base_store.relate_sample(family, sample, "unknown")
+    base_store.rebuild_case_status()
+
+    # WHEN getting the cases
+    with query_budget(base_store, 2):
+        cases = base_store.cases()
+
+    # THEN the progress should be read from the case status table
+    assert cases[0]["samples_received"] == 1
+
+
+def test_cases_aggregate_cases_not_summarized(base_store: Store):
+    """Test that cases without a case status are aggregated when read, without writing"""
+
+    # GIVEN a case with a sample that has not been committed
+    family = add_family(base_store)
+    sample = add_sample(base_store)
+    base_store.relate_sample(family, sample, "unknown")
+
+    # WHEN getting the cases
+    cases = base_store.cases()
+
+    # THEN the case should be aggregated from its samples
+    assert cases[0]["total_samples"] == 1
+    # THEN the case status should not be written by reading
+    assert base_store.CaseStatus.query.get(family.id).total_samples == 0
+
+
+def test_commit_refreshes_case_status_of_changed_sample(base_store: Store):
+    """Test that the case status of a sample is refreshed when a change of the sample is committed"""
+
+    # GIVEN a summarized case with a sample that is not received
+    family = add_family(base_store)
+    sample = add_sample(base_store)
+    base_store.relate_sample(family, sample, "unknown")
+    base_store.commit()
+    assert base_store.CaseStatus.query.get(family.id).samples_received == 0
+
+    # WHEN the sample is received
+    sample.received_at = datetime.now()
+    base_store.commit()
+
+    # THEN the case status should be refreshed
+    assert base_store.CaseStatus.query.get(family.id).samples_received == 1
+    assert base_store.cases()[0]["samples_received"] == 1
+
+
+def test_commit_refreshes_case_status_of_moved_link(base_store: Store):
+    """Test that the case status of both cases is refreshed when a link is moved"""
+
+    # GIVEN two summarized cases, one with a sample
+    family = add_family(base_store)
+    other_family = add_family(base_store, family_id="other_family")
+    link = base_store.relate_sample(family, add_sample(base_store), "unknown")
+    base_store.commit()
+    assert base_store.CaseStatus.query.get(family.id).total_samples == 1
+
+    # WHEN the link is moved to the other case
+    link.family = other_family
+    base_store.commit()
+
+    # THEN the case status of both cases should be refreshed
+    assert base_store.CaseStatus.query.get(family.id).total_samples == 0
+    assert base_store.CaseStatus.query.get(other_family.id).total_samples == 1
+    cases = {case["internal_id"]: case for case in base_store.cases()}
+    assert cases[other_family.internal_id]["total_samples"] == 1
+
+
+def test_rollback_forgets_changed_cases(base_store: Store):
+    """Test that the changes of a rolled back transaction are not summarized"""
+
+    # GIVEN a summarized case and a rolled back link to a new sample
+    family = add_family(base_store)
+    base_store.relate_sample(family, add_sample(base_store), "unknown")
+    base_store.flush()
+    base_store.rollback()
+
+    # WHEN committing another change
+    base_store.commit()
+
+    # THEN the case status should be left as it was
+    assert base_store.CaseStatus.query.get(family.id).total_samples == 0
+
+
+def test_refresh_samples_case_status(base_store: Store):
+    """Test that refreshing the samples summarizes their cases"""
+
+    # GIVEN a case with a sample that was received without touching the sample record
+    family = add_family(base_store)
+    sample = add_sample(base_store)
+    base_store.relate_sample(family, sample, "unknown")
+    base_store.commit()
+    base_store.session.execute(models.Sample.__table__.update().values(received_at=datetime.now()))
+
+    # WHEN refreshing the case status of the sample
+    base_store.refresh_samples_case_status([sample.id])
+
+    # THEN the case status should be updated
+    assert base_store.CaseStatus.query.get(family.id).samples_received == 1
+
+
+def test_rebuild_case_status(base_store: Store):
+    """Test that rebuilding summarizes every case"""
+
+    # GIVEN two cases, one without samples
+    family = add_family(base_store)
+    add_family(base_store, family_id="other_family")
+    sample = add_sample(base_store, sequenced=True)
+    base_store.relate_sample(family, sample, "unknown")
+    add_flowcell(base_store, sample=sample, status="ondisk")
+
+    # WHEN rebuilding the case status table
+    nr_cases = base_store.rebuild_case_status()
+
+    # THEN both cases should be summarized
+    assert nr_cases == 2
+    case_status = base_store.CaseStatus.query.get(family.id)
+    assert case_status.samples_sequenced == 1
+    assert case_status.flowcells_on_disk == 1
+    assert case_status.flowcell_statuses == "ondisk"
+
+
 def add_family(
     disk_store,
     family_id="family_test",
@@ -0,0 +1,44 @@
+"""Tests for the query plans of the status queries"""
+import pytest
+
+from cg.store import Store
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "samples_to_recieve",
+        "samples_to_prepare",
+        "samples_to_sequence",
+        "samples_to_deliver",
+        "samples_not_delivered",
+        "samples_not_invoiced",
+        "cases",
+        "analyses_to_upload",
+        "analyses_to_deliver",
+    ],
+)
+def test_status_query_uses_index(base_store: Store, name):
+    """Test that the indexed status queries do not scan their tables"""
+
+    # GIVEN a status query that has an index matching its filters
+    query = base_store.status_queries()[name]
+
+    # WHEN explaining the query
+    tables = base_store.full_scans(query)
+
+    # THEN no table should be fully scanned
+    assert tables == []
+
+
+def test_full_scans(base_store: Store):
+    """Test that a query without a matching index is reported as a full scan"""
+
+    # GIVEN a query filtering on a column without an index
+    query = base_store.Sample.query.filter(base_store.Sample.reads > 0)
+
+    # WHEN explaining the query
+    tables = base_store.full_scans(query)
+
+    # THEN the sample table should be reported
+    assert tables == ["sample"]
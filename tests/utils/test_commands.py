@@ -1,11 +1,16 @@
 """
 Tests for command module
 """
-from subprocess import CalledProcessError
+import asyncio
+import concurrent.futures
+import os
+import time
+from subprocess import CalledProcessError, TimeoutExpired
 
 import pytest
 
-from cg.utils import Process
+from cg.utils import CommandPool, Process
+from cg.utils.commands import run_sync
 
 
 def test_process():
@@ -95,3 +100,135 @@ def test_iter_stderr_lines_no_output(ls_process):
     for i, line in enumerate(process.stderr_lines(), 1):
         assert line == ""
     assert i == 1
+
+
+def test_process_run_command_metrics(ls_process):
+    # GIVEN a proces with 'ls' as binary
+    process = ls_process
+    # WHEN running the command
+    process.run_command()
+    # THEN assert the wall time, cpu time and peak memory of the call are captured
+    result = process.result
+    assert result.command == ["ls"]
+    assert result.returncode == 0
+    assert result.wall_time > 0
+    assert result.cpu_time >= 0
+    assert result.max_rss > 0
+
+
+def test_process_run_command_timeout():
+    # GIVEN a process that runs longer than the timeout
+    process = Process(binary="sleep")
+    # WHEN running the command with a timeout
+    start = time.monotonic()
+    with pytest.raises(TimeoutExpired):
+        # THEN assert the process is killed and an exception is raised
+        process.run_command(["10"], timeout=0.2)
+    assert time.monotonic() - start < 5
+
+
+def test_timeout_does_not_kill_exited_process(monkeypatch):
+    # GIVEN a process that exits at once while a child of it keeps the output open
+    process = Process(binary="sh")
+    killed = []
+    kill = os.kill
+
+    def record_kill(pid, signal):
+        killed.append(pid)
+        kill(pid, signal)
+
+    monkeypatch.setattr(os, "kill", record_kill)
+    # WHEN the output is not closed within the timeout
+    with pytest.raises(TimeoutExpired):
+        process.run_command(["-c", "sleep 1 & exit 0"], timeout=0.3)
+    # THEN assert the reaped process is not signalled, its pid may belong to another process
+    assert killed == []
+
+
+def test_timeout_does_not_wait_for_default_executor():
+    # GIVEN an event loop where the default executor is busy
+    process = Process(binary="echo")
+
+    async def run_with_busy_default_executor():
+        loop = asyncio.get_event_loop()
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=1))
+        busy = loop.run_in_executor(None, time.sleep, 1)
+        result = await process.run_command_async(["hello"], timeout=0.5)
+        await busy
+        return result
+
+    # WHEN running a command with a timeout
+    result = run_sync(run_with_busy_default_executor())
+    # THEN assert the command is not timed out while the default executor is busy
+    assert result.stdout == "hello"
+
+
+def test_run_command_in_running_loop():
+    # GIVEN a process
+    process = Process(binary="echo")
+
+    async def run_in_loop():
+        process.run_command(["hello"])
+
+    # WHEN running the command synchronously in a running event loop
+    with pytest.raises(RuntimeError, match="running event loop"):
+        # THEN assert a clear error is raised
+        run_sync(run_in_loop())
+
+
+def test_iter_command_lines():
+    # GIVEN a process that prints a line before it has finished
+    process = Process(binary="sh")
+    script = "echo first; sleep 0.5; echo second"
+
+    async def first_line_time():
+        start = time.monotonic()
+        async for line in process.iter_command_lines(["-c", script]):
+            if line == "first":
+                elapsed = time.monotonic() - start
+        return elapsed
+
+    # WHEN iterating the lines of stdout
+    elapsed = run_sync(first_line_time())
+    # THEN assert the first line came before the process finished
+    assert elapsed < 0.5
+    assert process.result.returncode == 0
+    assert process.result.stdout == ""
+
+
+def test_iter_command_lines_error():
+    # GIVEN a process that fails after printing a line
+    process = Process(binary="sh")
+
+    async def lines():
+        return [line async for line in process.iter_command_lines(["-c", "echo out; exit 3"])]
+
+    # WHEN iterating the lines of stdout
+    with pytest.raises(CalledProcessError) as error:
+        run_sync(lines())
+    # THEN assert the exit code is raised after the lines
+    assert error.value.returncode == 3
+
+
+def test_command_pool_bounds_concurrency():
+    # GIVEN four commands that take 0.3 seconds and a pool running two at a time
+    pool = CommandPool(max_concurrent=2)
+    calls = [(Process(binary="sleep"), ["0.3"]) for _ in range(4)]
+    # WHEN running all commands
+    start = time.monotonic()
+    results = pool.run_all(calls)
+    elapsed = time.monotonic() - start
+    # THEN assert they ran in two rounds
+    assert [result.returncode for result in results] == [0, 0, 0, 0]
+    assert 0.6 <= elapsed < 1.2
+
+
+def test_command_pool_returns_errors_in_order():
+    # GIVEN a failing and a successful command
+    pool = CommandPool()
+    calls = [(Process(binary="false"), None), (Process(binary="echo"), ["hello"])]
+    # WHEN running all commands
+    results = pool.run_all(calls)
+    # THEN assert the error takes the place of the failed result
+    assert isinstance(results[0], CalledProcessError)
+    assert results[1].stdout == "hello"
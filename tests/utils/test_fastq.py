@@ -0,0 +1,218 @@
+"""Tests for parsing and indexing FASTQ headers"""
+import gzip
+import os
+
+import pytest
+
+from cg.store import Store
+from cg.utils.fastq import (
+    UNKNOWN_HEADER,
+    FastqAPI,
+    FastqHeaderInfo,
+    FastqIndex,
+    fastq_link_files,
+    parse_header_lines,
+)
+
+HEADER = "@EAS139:136:FC706VJ:2:2104:15343:197393 1:Y:18:ATCACG\n"
+
+
+class CountingGzip:
+    """Open gzip files and count how many times"""
+
+    def __init__(self):
+        self.opened = []
+
+    def open(self, path):
+        self.opened.append(path)
+        return gzip.open(path)
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("@HWUSI-EAS100R:6:73:941:1973#0/1\n", ("6", "XXXXXX", "1")),
+        ("@EAS139:136:FC706VJ:2:2104:15343:197393 1:Y:18:ATCACG\n", ("2", "FC706VJ", "1")),
+        ("@ST-E00201:173:HCLCGALXX:1:2106:22516:34834/2\n", ("1", "HCLCGALXX", "2")),
+        ("@A00621:130:HFWJMDSXX:4:1101:1000:1000 2:N:0:GATCAG+ACGTGA\n", ("4", "HFWJMDSXX", "2")),
+        (
+            "@A00621:130:HFWJMDSXX:3:1101:1000:1000:ACGTACGT 1:N:0:GATCAG+ACGTGA\n",
+            ("3", "HFWJMDSXX", "1"),
+        ),
+        ("@NB501093:451:HK7NVBGXC:1:11101:10000:1000 2:N:0:1\n", ("1", "HK7NVBGXC", "2")),
+        ("not a header\n", (None, None, None)),
+    ],
+)
+def test_parse_header_lines(line, expected):
+    # GIVEN a FASTQ header line in one of the Illumina formats
+
+    # WHEN parsing the line
+    records = parse_header_lines([line])
+
+    # THEN the lane, flowcell and read number should be parsed
+    assert records == [FastqHeaderInfo(*expected)]
+    assert FastqAPI.parse_header(line) == dict(zip(("lane", "flowcell", "readnumber"), expected))
+
+
+def test_parse_header_lines_shares_records():
+    # GIVEN many header lines of reads from the same lane
+    lines = [f"@EAS139:136:FC706VJ:2:2104:{x}:197393 1:Y:18:ATCACG" for x in range(3)]
+
+    # WHEN parsing the lines in one batch
+    records = parse_header_lines(lines + ["garbage"])
+
+    # THEN the equal headers should be parsed into one record
+    assert records[0] is records[1] is records[2]
+    assert records[3] == UNKNOWN_HEADER
+
+
+def test_fastq_link_files():
+    # GIVEN FASTQ files from a HiSeq X run and an undetermined file with their headers
+    paths = [
+        "/fastq/1_171015_HHKVCALXX-l2t11_ACC1A1_S1_L002_R1_001.fastq.gz",
+        "/fastq/1_Undetermined_L001_R2_001.fastq.gz",
+    ]
+    headers = [
+        {"lane": "2", "flowcell": "HHKVCALXX", "readnumber": "1"},
+        {"lane": "1", "flowcell": "HHKVCALXX", "readnumber": "2"},
+    ]
+
+    # WHEN building the data to link the files by
+    files = fastq_link_files(paths, headers)
+
+    # THEN the flowcell should include the tile and undetermined files should be recognized
+    assert files == [
+        {
+            "path": paths[0],
+            "lane": 2,
+            "flowcell": "HHKVCALXX-11",
+            "read": 1,
+            "undetermined": False,
+        },
+        {"path": paths[1], "lane": 1, "flowcell": "HHKVCALXX", "read": 2, "undetermined": True},
+    ]
+
+
+def write_fastq(path, header: str = HEADER) -> str:
+    with gzip.open(str(path), "wt") as handle:
+        handle.write(f"{header}ACGT\n+\nIIII\n")
+    return str(path)
+
+
+@pytest.fixture(name="fastq_file")
+def fixture_fastq_file(tmpdir) -> str:
+    """Return the path of a gzipped FASTQ file"""
+    return write_fastq(tmpdir.join("sample_R1.fastq.gz"))
+
+
+def test_headers_are_read_once(store: Store, fastq_file):
+    # GIVEN a FASTQ file that is not indexed
+    gzipper = CountingGzip()
+
+    # WHEN fetching the headers twice
+    first = FastqIndex(store, gzipper=gzipper).headers([fastq_file])
+    second = FastqIndex(store, gzipper=gzipper).headers([fastq_file])
+
+    # THEN the header should be parsed from the file
+    assert first[fastq_file] == {"lane": "2", "flowcell": "FC706VJ", "readnumber": "1"}
+    # THEN the file should only be opened the first time
+    assert second == first
+    assert gzipper.opened == [fastq_file]
+    assert store.fastq_headers([fastq_file])[fastq_file].flowcell == "FC706VJ"
+
+
+def test_changed_file_is_read_again(store: Store, fastq_file):
+    # GIVEN an indexed FASTQ file
+    gzipper = CountingGzip()
+    FastqIndex(store, gzipper=gzipper).headers([fastq_file])
+
+    # WHEN the file is replaced with one from another flowcell
+    write_fastq(fastq_file, HEADER.replace("FC706VJ", "HABCDEF"))
+    stat = os.stat(fastq_file)
+    os.utime(fastq_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    headers = FastqIndex(store, gzipper=gzipper).headers([fastq_file])
+
+    # THEN the header should be read again and the index updated
+    assert headers[fastq_file]["flowcell"] == "HABCDEF"
+    assert gzipper.opened == [fastq_file, fastq_file]
+    assert len(store.fastq_headers([fastq_file])) == 1
+
+
+def test_long_path_is_indexed(store: Store, tmpdir):
+    # GIVEN a FASTQ file with a path longer than a unique index of a string column
+    fastq_dir = tmpdir.mkdir("a" * 200).mkdir("b" * 200)
+    long_file = write_fastq(fastq_dir.join("sample_R1.fastq.gz"))
+    assert len(long_file) > 400
+
+    # WHEN indexing the file
+    FastqIndex(store).add([long_file])
+
+    # THEN the header should be found by the whole path
+    record = store.fastq_headers([long_file])[long_file]
+    assert record.path == long_file
+    assert record.path_hash == store.FastqHeader.hash_path(long_file)
+
+
+def test_add_skips_unreadable_files(store: Store, fastq_file, tmpdir):
+    # GIVEN a FASTQ file and a file that is not gzipped
+    broken_file = tmpdir.join("broken_R1.fastq.gz")
+    broken_file.write("not gzipped")
+
+    # WHEN indexing the files
+    FastqIndex(store).add([fastq_file, str(broken_file)])
+
+    # THEN only the readable file should be indexed
+    assert list(store.fastq_headers([fastq_file, str(broken_file)])) == [fastq_file]
+
+
+def test_concurrently_indexed_file_keeps_pending_changes(store: Store, fastq_file):
+    # GIVEN a pending change in the session and a file indexed by another process while it is read
+    customer_group = store.add_customer_group("pending_group", "pending group")
+    store.add(customer_group)
+
+    def parse_header(line: str) -> dict:
+        store.add(store.add_fastq_header(os.path.abspath(fastq_file), 1, 1))
+        store.flush()
+        return FastqAPI.parse_header(line)
+
+    # WHEN indexing the file without committing
+    headers = FastqIndex(store, parse_header=parse_header, commit=False).headers([fastq_file])
+
+    # THEN the header should be returned and the pending change kept for the caller to commit
+    assert headers[fastq_file]["flowcell"] == "FC706VJ"
+    store.commit()
+    assert store.customer_group("pending_group")
+    # THEN the header stored by the other process should be updated with the file
+    assert store.fastq_headers([fastq_file])[fastq_file].size == os.stat(fastq_file).st_size
+
+
+def test_concurrent_index_keeps_the_other_headers_of_the_batch(store: Store, fastq_file, tmpdir):
+    # GIVEN an indexed file that changed on disk, a new file and a file indexed by another process
+    FastqIndex(store).headers([fastq_file])
+    write_fastq(fastq_file, HEADER.replace("FC706VJ", "HABCDEF"))
+    stat = os.stat(fastq_file)
+    os.utime(fastq_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    new_file = write_fastq(tmpdir.join("new_R1.fastq.gz"))
+    concurrent_file = write_fastq(tmpdir.join("concurrent_R1.fastq.gz"))
+
+    def parse_header(line: str) -> dict:
+        if not store.fastq_headers([concurrent_file]):
+            store.add(store.add_fastq_header(concurrent_file, 1, 1))
+            store.flush()
+        return FastqAPI.parse_header(line)
+
+    # WHEN indexing the files together
+    paths = [fastq_file, new_file, concurrent_file]
+    headers = FastqIndex(store, parse_header=parse_header).headers(paths)
+
+    # THEN the header of the changed file should be the one on disk
+    assert headers[fastq_file]["flowcell"] == "HABCDEF"
+    # THEN every header of the batch should be stored
+    store.session.expire_all()
+    stored = store.fastq_headers(paths)
+    assert {path: record.flowcell for path, record in stored.items()} == {
+        fastq_file: "HABCDEF",
+        new_file: "FC706VJ",
+        concurrent_file: "FC706VJ",
+    }
+    assert stored[concurrent_file].size == os.stat(concurrent_file).st_size